@@ -5,7 +5,7 @@ Homemade Food Marketplace API
 
 import os
 import sys
-from flask import Flask, jsonify, request, send_from_directory
+from flask import Flask, Response, jsonify, request, send_from_directory
 from flask_cors import CORS
 from datetime import datetime
 from dotenv import load_dotenv
@@ -26,6 +26,13 @@ app.config['SECRET_KEY'] = os.getenv('SECRET_KEY', 'potluck-secret-key-change-in
 # Enable CORS for all routes
 CORS(app, origins=['*'])
 
+# Create any tables added since the database was built
+try:
+    from config.database import DatabaseConnection
+    DatabaseConnection.ensure_schema()
+except Exception as e:
+    print(f"⚠️ Warning: Could not verify database schema: {e}")
+
 # Import and register route blueprints
 try:
     from routes.auth import bp as auth_bp
@@ -67,6 +74,55 @@ except Exception as e:
     print(f"⚠️ Warning: Could not register consumer routes: {e}")
     print("⚠️ Consumer endpoints will not be available")
 
+try:
+    from routes.admin import bp as admin_bp
+    app.register_blueprint(admin_bp, url_prefix='/api/admin')
+    print("✅ Admin routes registered successfully")
+except Exception as e:
+    print(f"⚠️ Warning: Could not register admin routes: {e}")
+
+# Per-request timing and sampled profiles (summarized at /api/admin/profiles/*)
+try:
+    from middleware import logging as request_logging
+    if request_logging.PROFILING_ENABLED:
+        request_logging.init_app(app)
+        print(f"✅ Request profiling enabled (sampling {request_logging.PROFILE_SAMPLE_RATE:.0%})")
+except Exception as e:
+    print(f"⚠️ Warning: Could not enable request profiling: {e}")
+
+# Request counters and latency histograms, scraped at /metrics
+try:
+    from utils import metrics
+    metrics.init_app(app)
+    print("✅ Metrics enabled at /metrics")
+except Exception as e:
+    print(f"⚠️ Warning: Could not enable metrics: {e}")
+
+# Serve real-time order/job events over Socket.IO at /socket.io
+try:
+    import events
+    events.init_app(app)
+    print("✅ Real-time events enabled at /socket.io")
+except Exception as e:
+    print(f"⚠️ Warning: Could not enable real-time events: {e}")
+    print("⚠️ Dashboards will fall back to polling (see /api/realtime)")
+
+def start_background_jobs():
+    """Start periodic background jobs (market stats, ...) in this process"""
+    if os.getenv('BACKGROUND_TASKS', 'true').lower() != 'true':
+        return
+    try:
+        from tasks import scheduler
+        scheduler.start()
+        print("✅ Background scheduler started")
+    except Exception as e:
+        print(f"⚠️ Warning: Could not start background scheduler: {e}")
+
+# Under gunicorn.conf.py this module may be imported in the master, and threads
+# don't survive fork, so each worker starts the jobs from post_worker_init instead
+if os.getenv('BACKGROUND_TASKS_POST_FORK', 'false').lower() != 'true':
+    start_background_jobs()
+
 # Note: Service area check is now handled by the routes/auth.py blueprint
 
 # Note: Signup is now handled by the routes/auth.py blueprint
@@ -96,28 +152,56 @@ def favicon():
 
 @app.route('/api/health')
 def health_check():
-    """API health check endpoint"""
+    """API health check endpoint (status mirrors the cached readiness result)"""
+    from utils.health import readiness_probe
+    status = readiness_probe.get()['status']
     return jsonify({
-        'status': 'healthy',
+        'status': {'ok': 'healthy', 'degraded': 'degraded'}.get(status, 'unhealthy'),
         'timestamp': datetime.utcnow().isoformat(),
         'service': 'Potluck API',
         'version': '1.0.0',
-        'message': 'Application is running successfully'
+        'message': 'Details at /api/health/ready'
     })
 
+@app.route('/api/health/live')
+def liveness_check():
+    """Liveness probe: restart the worker only if this stops answering"""
+    from utils.health import liveness
+    return jsonify(liveness())
+
+@app.route('/api/health/ready')
+def readiness_check():
+    """Readiness probe: 503 takes this worker out of rotation"""
+    from utils.health import readiness_probe
+    result = readiness_probe.get()
+    return jsonify(result), 503 if result['status'] == 'fail' else 200
+
+@app.route('/api/realtime')
+def realtime_config():
+    """Whether dashboards should connect to /socket.io or poll, and how often"""
+    try:
+        import events
+        return jsonify(events.realtime_config())
+    except Exception as e:
+        return jsonify({'enabled': False, 'reason': str(e), 'poll_seconds': 30})
+
+@app.route('/metrics')
+def prometheus_metrics():
+    """Prometheus scrape endpoint, merged across gunicorn workers"""
+    from utils.metrics import render_latest, CONTENT_TYPE
+    return Response(render_latest(), content_type=CONTENT_TYPE)
+
 @app.route('/api/stats')
 def platform_stats():
-    """Get platform statistics"""
-    return jsonify({
-        'success': True,
-        'data': {
-            'users': {'total': 0},
-            'active_dishes': 0,
-            'total_orders': 0,
-            'orders_today': 0
-        },
-        'message': 'Basic stats endpoint - database not yet configured'
-    })
+    """Get platform statistics (materialized counters, one small table read)"""
+    try:
+        from config.database import DatabaseConnection
+        from services.platform_stats import platform_counters
+        with DatabaseConnection.get_db() as conn:
+            stats = platform_counters.snapshot(conn)
+        return jsonify({'success': True, 'data': stats})
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
 
 @app.route('/api/test')
 def test():
@@ -3,22 +3,71 @@ Database configuration and connection utilities
 """
 
 import os
+import re
 import sqlite3
 from contextlib import contextmanager
 from typing import Dict, List, Optional, Any
 import json
 
-# Database path
-DB_PATH = os.path.join(os.path.dirname(__file__), '..', 'potluck.db')
+# Database path (POTLUCK_DB_PATH points benchmarks and tests at a scratch copy)
+DB_PATH = os.getenv('POTLUCK_DB_PATH') or os.path.join(os.path.dirname(__file__), '..', 'potluck.db')
+SCHEMA_PATH = os.path.join(os.path.dirname(__file__), '..', '..', 'database', 'schema.sql')
+
+# Stamped in PRAGMA user_version by ensure_schema once schema.sql and MIGRATIONS are applied;
+# bump whenever schema.sql changes (2: market stats, coverage, job board, dispatch, outbox, counters, health)
+SCHEMA_VERSION = 2
 print(f"Database path: {DB_PATH}")
+
+# Called with every new connection
+CONNECTION_HOOKS = []
+
+# Called with the SQL of every statement run (benchmarks, profiling and metrics count queries here)
+TRACE_HOOKS = []
+
+# Connection class for every connection (request profiling swaps in a timed subclass)
+CONNECTION_FACTORY = sqlite3.Connection
+
+
+def _supersede_duplicate_pending_offers(conn: sqlite3.Connection):
+    """idx_delivery_offers_one_pending is UNIQUE: keep only the newest pending offer per order"""
+    if conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'delivery_offers'").fetchone():
+        conn.execute("""
+            UPDATE delivery_offers SET status = 'superseded'
+            WHERE status = 'pending' AND id NOT IN (
+                SELECT MAX(id) FROM delivery_offers WHERE status = 'pending' GROUP BY order_id
+            )
+        """)
+
+
+# Data fixes schema.sql can't express, keyed by the version that needs them; run before schema.sql
+MIGRATIONS = {
+    2: _supersede_duplicate_pending_offers,
+}
+
+
+def _trace_statement(statement: str):
+    for hook in TRACE_HOOKS:
+        hook(statement)
+
+
 class DatabaseConnection:
     """Database connection manager"""
     
+    @staticmethod
+    def connect() -> sqlite3.Connection:
+        """Open a raw connection to DB_PATH; every module should connect through here"""
+        conn = sqlite3.connect(DB_PATH, factory=CONNECTION_FACTORY)
+        for hook in CONNECTION_HOOKS:
+            hook(conn)
+        if TRACE_HOOKS:
+            conn.set_trace_callback(_trace_statement)
+        return conn
+    
     @staticmethod
     @contextmanager
     def get_db():
         """Get database connection with context manager"""
-        conn = sqlite3.connect(DB_PATH)
+        conn = DatabaseConnection.connect()
         conn.row_factory = DatabaseConnection.dict_factory
         conn.execute("PRAGMA foreign_keys = ON")  # Enable foreign key constraints
         try:
@@ -26,6 +75,38 @@ class DatabaseConnection:
         finally:
             conn.close()
     
+    @staticmethod
+    def ensure_schema() -> bool:
+        """
+        Create any tables/indexes missing from an existing database
+        schema.sql only uses IF NOT EXISTS, so this is safe on every startup.
+        SCHEMA_VERSION is stamped only when every table and index it declares exists.
+        """
+        if not os.path.exists(SCHEMA_PATH):
+            return False
+        
+        with open(SCHEMA_PATH, 'r') as f:
+            schema = f.read()
+        expected = set(re.findall(r'CREATE (?:UNIQUE )?(?:TABLE|INDEX) IF NOT EXISTS (\w+)', schema))
+        
+        with DatabaseConnection.get_db() as conn:
+            version = conn.execute("PRAGMA user_version").fetchone()['user_version']
+            for target in sorted(MIGRATIONS):
+                if version < target:
+                    MIGRATIONS[target](conn)
+            conn.commit()
+            conn.executescript(schema)
+            
+            existing = {row['name'] for row in conn.execute("SELECT name FROM sqlite_master")}
+            missing = expected - existing
+            if missing:
+                print(f"⚠️ Schema not fully applied, missing: {', '.join(sorted(missing))}")
+                return False
+            if version < SCHEMA_VERSION:
+                conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+                conn.commit()
+        return True
+    
     @staticmethod
     def dict_factory(cursor, row):
         """Convert database rows to dictionaries"""
@@ -112,10 +193,16 @@ class DatabaseHelper:
     @staticmethod
     def create_user(user_data: Dict) -> int:
         """Create new user"""
+        from services.platform_stats import platform_counters
         columns = ', '.join(user_data.keys())
         placeholders = ', '.join(['?' for _ in user_data])
         query = f"INSERT INTO users ({columns}) VALUES ({placeholders})"
-        return DatabaseConnection.execute_insert(query, tuple(user_data.values()))
+        with DatabaseConnection.get_db() as conn:
+            cursor = conn.cursor()
+            cursor.execute(query, tuple(user_data.values()))
+            platform_counters.user_created(cursor, user_data.get('user_type'))
+            conn.commit()
+            return cursor.lastrowid
     
     @staticmethod
     def update_user(user_id: int, updates: Dict) -> bool:
@@ -1 +1,194 @@
-# WebSocket events for real-time 
+"""
+WebSocket events for real-time
+Socket.IO server pushing order and job updates to dashboards
+
+Rooms:
+    user:{id}     every socket of one user (order status for consumer/chef/agent)
+    cell:{gh}     delivery agents whose position is in or next to geohash cell gh
+
+Clients connect with auth={'token': <JWT>} (or ?token=) and may send
+'update_location' {latitude, longitude} to move between cell rooms.
+
+Deployment: a socket lives in one process, so Socket.IO is only served
+where that works (see socketio_unsupported_reason):
+    - one process (flask dev server, or gunicorn with one async worker), or
+    - several eventlet/gevent workers with SOCKETIO_MESSAGE_QUEUE (e.g.
+      redis://...) so an event published in one worker reaches sockets held
+      by another, AND a load balancer with sticky sessions, since
+      Engine.IO long-polling must keep hitting the worker holding its session
+Sync workers are refused: each long-poll would hold a whole worker.
+
+The default gunicorn.conf.py setup (4 sync workers) therefore serves NO
+sockets. Dashboards ask GET /api/realtime first (realtime_config) and,
+while sockets are off, re-run their handlers every REALTIME_POLL_SECONDS
+instead of connecting; publish() is a no-op. To turn real-time on, run
+    GUNICORN_WORKER_CLASS=eventlet WEB_CONCURRENCY=1
+or several eventlet workers with SOCKETIO_MESSAGE_QUEUE and sticky sessions.
+SOCKETIO_ENABLED=false turns it off explicitly.
+"""
+
+import os
+from typing import Iterable, Optional
+
+import socketio
+
+from utils import geohash
+from utils.auth_utils import AuthUtils
+
+# 'threading' works under the plain gunicorn/Flask servers; 'eventlet' under eventlet workers
+SOCKETIO_ASYNC_MODE = os.getenv('SOCKETIO_ASYNC_MODE', 'threading')
+SOCKETIO_MESSAGE_QUEUE = os.getenv('SOCKETIO_MESSAGE_QUEUE', '')
+SOCKETIO_ENABLED = os.getenv('SOCKETIO_ENABLED', 'true').lower() == 'true'
+
+# How often dashboards refresh on their own while Socket.IO is off
+REALTIME_POLL_SECONDS = int(os.getenv('REALTIME_POLL_SECONDS', '30'))
+
+# ~4.9km cells, matching the delivery job board
+CELL_PRECISION = 5
+
+# Why init_app did not mount Socket.IO (None once it has)
+_disabled_reason: Optional[str] = 'Socket.IO was not initialized'
+
+_client_manager = None
+if SOCKETIO_MESSAGE_QUEUE:
+    if SOCKETIO_MESSAGE_QUEUE.startswith('redis'):
+        _client_manager = socketio.RedisManager(SOCKETIO_MESSAGE_QUEUE)
+    else:
+        _client_manager = socketio.KombuManager(SOCKETIO_MESSAGE_QUEUE)
+
+sio = socketio.Server(
+    async_mode=SOCKETIO_ASYNC_MODE,
+    cors_allowed_origins='*',
+    client_manager=_client_manager
+)
+
+
+def user_room(user_id: int) -> str:
+    return f'user:{user_id}'
+
+
+def cell_room(cell: str) -> str:
+    return f'cell:{cell}'
+
+
+def _join_cells(sid: str, latitude: float, longitude: float):
+    """Move a socket into the cell rooms around a position"""
+    session = sio.get_session(sid)
+    for room in session.get('cells', []):
+        sio.leave_room(sid, room)
+
+    rooms = [cell_room(cell) for cell in geohash.neighbors(geohash.encode(latitude, longitude, CELL_PRECISION))]
+    for room in rooms:
+        sio.enter_room(sid, room)
+    session['cells'] = rooms
+    sio.save_session(sid, session)
+
+
+@sio.event
+def connect(sid, environ, auth):
+    """Authenticate with the JWT and join the user's rooms"""
+    token = (auth or {}).get('token')
+    if not token:
+        from urllib.parse import parse_qs
+        token = (parse_qs(environ.get('QUERY_STRING', '')).get('token') or [None])[0]
+
+    payload = AuthUtils.verify_token(token) if token else None
+    if not payload:
+        raise socketio.exceptions.ConnectionRefusedError('Invalid or expired token')
+
+    sio.save_session(sid, {'user_id': payload['user_id'], 'user_type': payload.get('user_type'), 'cells': []})
+    sio.enter_room(sid, user_room(payload['user_id']))
+
+    if payload.get('user_type') == 'delivery':
+        from config.database import DatabaseConnection
+        agent = DatabaseConnection.execute_one(
+            "SELECT latitude, longitude FROM users WHERE id = ?", (payload['user_id'],)
+        )
+        if agent and agent['latitude'] is not None and agent['longitude'] is not None:
+            _join_cells(sid, agent['latitude'], agent['longitude'])
+
+
+@sio.event
+def update_location(sid, data):
+    """Delivery agents re-subscribe to the cells around their new position"""
+    session = sio.get_session(sid)
+    if session.get('user_type') != 'delivery':
+        return {'success': False, 'error': 'Only delivery agents subscribe to cells'}
+    try:
+        _join_cells(sid, float(data['latitude']), float(data['longitude']))
+    except (KeyError, TypeError, ValueError):
+        return {'success': False, 'error': 'latitude and longitude are required'}
+    return {'success': True}
+
+
+def publish(event: str, data: dict, user_ids: Iterable[Optional[int]] = (), cells: Iterable[str] = ()):
+    """
+    Push an event to users and/or geo cells
+    Never raises: a failed push must not fail the request that caused it
+    """
+    try:
+        for user_id in {u for u in user_ids if u}:
+            sio.emit(event, data, room=user_room(user_id))
+        for cell in {c for c in cells if c}:
+            sio.emit(event, data, room=cell_room(cell))
+    except Exception as e:
+        print(f"⚠️ Socket publish failed for {event}: {e}")
+
+
+def publish_order_update(order_id: int, status: str, consumer_id: int = None, chef_id: int = None,
+                         agent_id: int = None, **extra):
+    """Order status changed: tell everyone on the order"""
+    publish('order_updated', {'order_id': order_id, 'status': status, **extra},
+            user_ids=(consumer_id, chef_id, agent_id))
+
+
+def publish_job_available(order_id: int, latitude: float, longitude: float, status: str):
+    """A delivery job opened or changed near a kitchen: tell agents in that cell"""
+    if latitude is None or longitude is None:
+        return
+    publish('job_available', {'order_id': order_id, 'status': status},
+            cells=(geohash.encode(latitude, longitude, CELL_PRECISION),))
+
+
+def publish_job_taken(order_id: int, latitude: float, longitude: float):
+    """A job was claimed: agents nearby drop it from their boards"""
+    if latitude is None or longitude is None:
+        return
+    publish('job_taken', {'order_id': order_id},
+            cells=(geohash.encode(latitude, longitude, CELL_PRECISION),))
+
+
+def socketio_unsupported_reason() -> Optional[str]:
+    """Why Socket.IO can't work in this deployment, or None if it can"""
+    if not SOCKETIO_ENABLED:
+        return 'SOCKETIO_ENABLED is false'
+
+    # Set by gunicorn.conf.py; unset under the single-process dev server
+    worker_class = os.getenv('GUNICORN_WORKER_CLASS')
+    workers = int(os.getenv('WEB_CONCURRENCY', '1')) if worker_class else 1
+    if worker_class in ('sync', 'gthread'):
+        return f"{worker_class} workers would each be held by a long-poll; use GUNICORN_WORKER_CLASS=eventlet"
+    if workers > 1 and not SOCKETIO_MESSAGE_QUEUE:
+        return f"{workers} workers need SOCKETIO_MESSAGE_QUEUE (and sticky sessions) to share sockets"
+    return None
+
+
+def realtime_config() -> dict:
+    """What dashboards need to know before connecting (served at /api/realtime)"""
+    return {
+        'enabled': _disabled_reason is None,
+        'reason': _disabled_reason,
+        'poll_seconds': REALTIME_POLL_SECONDS
+    }
+
+
+def init_app(app):
+    """Serve Socket.IO at /socket.io in front of the Flask app, where the deployment supports it"""
+    global _disabled_reason
+    reason = socketio_unsupported_reason()
+    if reason:
+        _disabled_reason = reason
+        raise RuntimeError(f"Socket.IO disabled: {reason}")
+    app.wsgi_app = socketio.WSGIApp(sio, app.wsgi_app)
+    _disabled_reason = None
+    return app
@@ -0,0 +1,91 @@
+"""
+gunicorn settings for Potluck
+Run from the backend directory:
+
+    gunicorn -c gunicorn.conf.py app:app
+
+With sync/gthread workers the app is imported once in the master
+(preload_app), warmed up (warmup.py), and its objects frozen out of the
+garbage collector before forking, so workers share those pages
+copy-on-write; eventlet/gevent workers import and warm it themselves. Threads don't
+survive fork, so the scheduler starts in each worker after boot; shared
+jobs run only in the worker holding the scheduler lock (tasks.py).
+
+GUNICORN_WORKER_CLASS=eventlet (or gevent, which must be installed
+separately) serves the I/O-bound AI and geolocation routes from many
+green threads per worker; the default 'sync' handles one request per
+worker at a time ('gthread' with GUNICORN_THREADS > 1 sits in between).
+Socket.IO needs an async worker class, plus SOCKETIO_MESSAGE_QUEUE and
+sticky sessions when there is more than one worker (see events.py). The
+default sync workers keep it off and dashboards refresh on a timer every
+REALTIME_POLL_SECONDS; for live pushes on a single instance run
+GUNICORN_WORKER_CLASS=eventlet WEB_CONCURRENCY=1.
+"""
+
+import gc
+import os
+import shutil
+
+bind = f"0.0.0.0:{os.getenv('PORT', '5000')}"
+workers = int(os.getenv('WEB_CONCURRENCY', '4'))
+worker_class = os.getenv('GUNICORN_WORKER_CLASS', 'sync')
+threads = int(os.getenv('GUNICORN_THREADS', '1'))
+worker_connections = int(os.getenv('GUNICORN_WORKER_CONNECTIONS', '100'))
+timeout = int(os.getenv('GUNICORN_TIMEOUT', '120'))
+
+# Green-thread workers patch the stdlib when they boot, so the app must be imported
+# after that, in the worker; patching the master instead breaks its signal handling
+GREEN_WORKER_CLASSES = ('eventlet', 'gevent')
+preload_app = (os.getenv('GUNICORN_PRELOAD', 'true').lower() == 'true'
+               and worker_class not in GREEN_WORKER_CLASSES)
+
+# events.py serves Socket.IO only when the worker setup can (async workers; a message queue if several)
+os.environ['GUNICORN_WORKER_CLASS'] = worker_class
+os.environ['WEB_CONCURRENCY'] = str(workers)
+
+# Socket.IO has to use the same concurrency model as the workers
+if worker_class in GREEN_WORKER_CLASSES:
+    os.environ.setdefault('SOCKETIO_ASYNC_MODE', worker_class)
+
+# Workers share metrics through per-process files (utils/metrics.py reads this at import)
+os.environ.setdefault('METRICS_DIR', '/tmp/potluck-metrics')
+
+# app.py leaves the scheduler to post_worker_init
+os.environ['BACKGROUND_TASKS_POST_FORK'] = 'true'
+
+# Freed objects would leave holes in shared pages; no collections until warm-up is frozen (when_ready)
+if preload_app:
+    gc.disable()
+
+
+def on_starting(server):
+    """Start each boot with an empty metrics directory (dead workers' counters are summed)"""
+    metrics_dir = os.environ['METRICS_DIR']
+    shutil.rmtree(metrics_dir, ignore_errors=True)
+    os.makedirs(metrics_dir, exist_ok=True)
+
+
+def when_ready(server):
+    """Fill read-mostly caches in the master before the first fork, then collect normally again"""
+    if preload_app:
+        from warmup import warm_up
+        warm_up()
+        # Frozen objects are never collected, so the master and its workers can run the GC again
+        gc.freeze()
+        gc.enable()
+
+
+def pre_fork(server, worker):
+    """Move everything alive now to the permanent generation so worker GCs never write to it"""
+    if preload_app:
+        gc.freeze()
+
+
+def post_worker_init(worker):
+    """Per-worker startup once the app is loaded"""
+    if not preload_app:
+        from warmup import warm_up
+        warm_up()
+
+    import app
+    app.start_background_jobs()
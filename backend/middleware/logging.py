@@ -1 +1,423 @@
-# Request logging 
+"""
+Request logging and profiling for Potluck
+WSGI middleware that records wall time, DB time and query count,
+external-API time and response size for every request, runs cProfile
+on a sampled fraction of them, and appends the records to rotating
+JSON-lines files (one per process) that the admin endpoints summarize
+"""
+
+import os
+import re
+import glob
+import json
+import time
+import heapq
+import random
+import pstats
+import cProfile
+import threading
+import logging
+import logging.handlers
+import sqlite3
+from contextlib import contextmanager
+from collections import defaultdict
+from typing import Dict, List, Optional
+
+# Off unless asked for; when on, record every request and cProfile this fraction of them (0 turns sampling off)
+PROFILING_ENABLED = os.getenv('PROFILING_ENABLED', 'false').lower() == 'true'
+PROFILE_SAMPLE_RATE = float(os.getenv('PROFILE_SAMPLE_RATE', '0.01'))
+
+# Rotating store per process: PROFILE_BACKUPS old files of PROFILE_MAX_BYTES each are kept
+PROFILE_DIR = os.getenv('PROFILE_DIR') or os.path.join(os.path.dirname(__file__), '..', 'profiles')
+PROFILE_MAX_BYTES = int(os.getenv('PROFILE_MAX_BYTES', str(5 * 1024 * 1024)))
+PROFILE_BACKUPS = int(os.getenv('PROFILE_BACKUPS', '3'))
+
+# Functions kept per sampled profile (highest self time)
+PROFILE_TOP_FUNCTIONS = 30
+
+# Static files, the socket transport and health probes aren't worth a record each
+SKIP_PREFIXES = ('/socket.io', '/api/health', '/css/', '/js/', '/images/', '/favicon')
+
+# Built-in entries embed an object address; drop it so profiles aggregate across processes
+_ADDRESS = re.compile(r' at 0x[0-9a-f]+')
+
+# requests-<pid>.jsonl is the live file, requests-<pid>.jsonl.N the N-th oldest rotation
+_PROFILE_FILE = re.compile(r'requests-(\d+)\.jsonl(?:\.(\d+))?$')
+
+_local = threading.local()
+
+# cProfile can't profile two threads at once, so one sampled request at a time
+_profile_lock = threading.Lock()
+
+
+def _current() -> Optional[Dict]:
+    """Record for the request running on this thread, if any"""
+    return getattr(_local, 'record', None)
+
+
+def _add_db_time(started: float):
+    record = _current()
+    if record is not None:
+        record['db_ms'] += (time.perf_counter() - started) * 1000
+
+
+@contextmanager
+def track_external(service: str):
+    """Time a call to an outside API (LLM, geocoding, ...) against the current request"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record = _current()
+        if record is not None:
+            elapsed = (time.perf_counter() - started) * 1000
+            record['external_ms'] += elapsed
+            record['external'][service] = record['external'].get(service, 0.0) + elapsed
+
+
+class TimedCursor(sqlite3.Cursor):
+    """Cursor that charges statement and fetch time to the current request"""
+
+    def execute(self, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return super().execute(*args, **kwargs)
+        finally:
+            _add_db_time(started)
+
+    def executemany(self, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return super().executemany(*args, **kwargs)
+        finally:
+            _add_db_time(started)
+
+    def fetchone(self):
+        started = time.perf_counter()
+        try:
+            return super().fetchone()
+        finally:
+            _add_db_time(started)
+
+    def fetchmany(self, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return super().fetchmany(*args, **kwargs)
+        finally:
+            _add_db_time(started)
+
+    def fetchall(self):
+        started = time.perf_counter()
+        try:
+            return super().fetchall()
+        finally:
+            _add_db_time(started)
+
+
+class TimedConnection(sqlite3.Connection):
+    """Connection whose cursors, shortcuts and commits are timed"""
+
+    def cursor(self, factory=TimedCursor):
+        return super().cursor(factory)
+
+    def execute(self, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return super().execute(*args, **kwargs)
+        finally:
+            _add_db_time(started)
+
+    def executemany(self, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return super().executemany(*args, **kwargs)
+        finally:
+            _add_db_time(started)
+
+    def executescript(self, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return super().executescript(*args, **kwargs)
+        finally:
+            _add_db_time(started)
+
+    def commit(self):
+        started = time.perf_counter()
+        try:
+            return super().commit()
+        finally:
+            _add_db_time(started)
+
+
+def _count_query(statement):
+    record = _current()
+    if record is not None:
+        record['db_queries'] += 1
+
+
+def _reversed_lines(path: str, block_size: int = 64 * 1024):
+    """Non-empty lines of a file, last first, reading it backwards in blocks"""
+    with open(path, 'rb') as f:
+        position = f.seek(0, os.SEEK_END)
+        tail = b''
+        while position > 0:
+            step = min(block_size, position)
+            position -= step
+            f.seek(position)
+            lines = (f.read(step) + tail).split(b'\n')
+            # The first piece may be the end of a line that starts in the previous block
+            tail = lines.pop(0)
+            for line in reversed(lines):
+                if line.strip():
+                    yield line
+        if tail.strip():
+            yield tail
+
+
+class ProfileStore:
+    """
+    Rotating JSON-lines files of request records
+    Rotation renames files under the writer, which is only safe with a single
+    writer, so each process appends to its own requests-<pid>.jsonl
+    """
+
+    def __init__(self, directory: str = PROFILE_DIR):
+        self.directory = directory
+        self._logger = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    @property
+    def path(self) -> str:
+        """This process's file"""
+        return os.path.join(self.directory, f"requests-{os.getpid()}.jsonl")
+
+    def _get_logger(self):
+        with self._lock:
+            # A forked worker must not keep writing through its parent's handler
+            if self._logger is None or self._pid != os.getpid():
+                os.makedirs(self.directory, exist_ok=True)
+                handler = logging.handlers.RotatingFileHandler(
+                    self.path, maxBytes=PROFILE_MAX_BYTES, backupCount=PROFILE_BACKUPS
+                )
+                handler.setFormatter(logging.Formatter('%(message)s'))
+                logger = logging.getLogger('potluck.profile')
+                logger.setLevel(logging.INFO)
+                logger.propagate = False
+                for old in list(logger.handlers):
+                    logger.removeHandler(old)
+                    old.close()
+                logger.addHandler(handler)
+                self._logger, self._pid = logger, os.getpid()
+            return self._logger
+
+    def write(self, record: Dict):
+        try:
+            self._get_logger().info(json.dumps(record, default=str))
+        except Exception as e:
+            print(f"⚠️ Could not write request profile: {e}")
+
+    def _files_by_process(self) -> List[List[str]]:
+        """Each process's files, newest first (live file, then .1, .2, ...)"""
+        files = defaultdict(list)
+        for path in glob.glob(os.path.join(self.directory, 'requests-*.jsonl*')):
+            match = _PROFILE_FILE.search(path)
+            if match:
+                files[match.group(1)].append((int(match.group(2) or 0), path))
+        return [[path for _, path in sorted(paths)] for paths in files.values()]
+
+    @staticmethod
+    def _newest_first(paths: List[str]):
+        """One process's records from its last line backwards"""
+        for path in paths:
+            try:
+                for line in _reversed_lines(path):
+                    try:
+                        yield json.loads(line)
+                    except ValueError:
+                        continue
+            except OSError:
+                # Rotated away between listing and opening
+                continue
+
+    def read(self, limit: int = None, since: float = None) -> List[Dict]:
+        """
+        Records from every process's current and rotated files, newest first
+        Files are read backwards and merged, so only the records returned are parsed
+        """
+        streams = [self._newest_first(paths) for paths in self._files_by_process()]
+        records = []
+        for record in heapq.merge(*streams, key=lambda record: record.get('timestamp', 0), reverse=True):
+            if since is not None and record.get('timestamp', 0) < since:
+                break
+            records.append(record)
+            if limit and len(records) >= limit:
+                break
+        return records
+
+
+profile_store = ProfileStore()
+
+
+def _top_functions(profiler: cProfile.Profile) -> List[Dict]:
+    stats = pstats.Stats(profiler).stats
+    rows = sorted(stats.items(), key=lambda item: item[1][2], reverse=True)[:PROFILE_TOP_FUNCTIONS]
+    return [
+        {
+            'function': f"{os.path.basename(filename)}:{line}({_ADDRESS.sub('', name)})",
+            'calls': total_calls,
+            'self_ms': round(self_time * 1000, 3),
+            'cumulative_ms': round(cumulative * 1000, 3)
+        }
+        for (filename, line, name), (_, total_calls, self_time, cumulative, _) in rows
+    ]
+
+
+class ClosingIterator:
+    """Wraps the response body to count bytes and finish the record on close()"""
+
+    def __init__(self, body, finish):
+        self._body = body
+        self._finish = finish
+        self.size = 0
+
+    def __iter__(self):
+        for chunk in self._body:
+            self.size += len(chunk)
+            yield chunk
+
+    def close(self):
+        try:
+            if hasattr(self._body, 'close'):
+                self._body.close()
+        finally:
+            self._finish(self.size)
+
+
+class ProfilingMiddleware:
+    """Per-request timing around a WSGI app, with sampled cProfile"""
+
+    def __init__(self, wsgi_app, store: ProfileStore = profile_store, sample_rate: float = PROFILE_SAMPLE_RATE):
+        self.wsgi_app = wsgi_app
+        self.store = store
+        self.sample_rate = sample_rate
+
+    def __call__(self, environ, start_response):
+        path = environ.get('PATH_INFO', '')
+        if path.startswith(SKIP_PREFIXES) or path == '/':
+            return self.wsgi_app(environ, start_response)
+
+        record = {
+            'timestamp': time.time(),
+            'method': environ.get('REQUEST_METHOD'),
+            'path': path,
+            'route': None,
+            'status': None,
+            'wall_ms': 0.0,
+            'db_ms': 0.0,
+            'db_queries': 0,
+            'external_ms': 0.0,
+            'external': {},
+            'response_bytes': 0
+        }
+        profiler = None
+        if random.random() < self.sample_rate and _profile_lock.acquire(blocking=False):
+            profiler = cProfile.Profile()
+
+        def capture_status(status, headers, exc_info=None):
+            record['status'] = int(status.split(' ', 1)[0])
+            return start_response(status, headers, exc_info)
+
+        started = time.perf_counter()
+        _local.record = record
+        if profiler:
+            profiler.enable()
+        try:
+            body = self.wsgi_app(environ, capture_status)
+        except Exception:
+            _local.record = None
+            if profiler:
+                profiler.disable()
+                _profile_lock.release()
+            raise
+
+        def finish(size):
+            if profiler:
+                profiler.disable()
+                _profile_lock.release()
+            _local.record = None
+            record['wall_ms'] = round((time.perf_counter() - started) * 1000, 3)
+            record['db_ms'] = round(record['db_ms'], 3)
+            record['external_ms'] = round(record['external_ms'], 3)
+            record['response_bytes'] = size
+            if profiler:
+                record['profile'] = _top_functions(profiler)
+            self.store.write(record)
+
+        return ClosingIterator(body, finish)
+
+
+def _tag_route():
+    """Group records by URL rule rather than raw path"""
+    from flask import request
+    record = _current()
+    if record is not None and request.url_rule is not None:
+        record['route'] = request.url_rule.rule
+
+
+def init_app(app):
+    """Wrap the Flask app and time every SQLite connection it opens"""
+    import config.database as database
+    database.CONNECTION_FACTORY = TimedConnection
+    database.TRACE_HOOKS.append(_count_query)
+    app.before_request(_tag_route)
+    app.wsgi_app = ProfilingMiddleware(app.wsgi_app)
+
+
+def _percentile(values: List[float], pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct))]
+
+
+def slowest_routes(records: List[Dict], limit: int = 10) -> List[Dict]:
+    """Routes ranked by p95 wall time"""
+    by_route = defaultdict(list)
+    for record in records:
+        by_route[f"{record['method']} {record.get('route') or record['path']}"].append(record)
+
+    summary = []
+    for route, group in by_route.items():
+        wall = [r['wall_ms'] for r in group]
+        summary.append({
+            'route': route,
+            'requests': len(group),
+            'p50_ms': round(_percentile(wall, 0.5), 1),
+            'p95_ms': round(_percentile(wall, 0.95), 1),
+            'max_ms': round(max(wall), 1),
+            'avg_db_ms': round(sum(r['db_ms'] for r in group) / len(group), 1),
+            'avg_db_queries': round(sum(r['db_queries'] for r in group) / len(group), 1),
+            'avg_external_ms': round(sum(r['external_ms'] for r in group) / len(group), 1),
+            'avg_response_bytes': int(sum(r['response_bytes'] for r in group) / len(group)),
+            'errors': sum(1 for r in group if (r['status'] or 0) >= 500)
+        })
+    summary.sort(key=lambda row: row['p95_ms'], reverse=True)
+    return summary[:limit]
+
+
+def hottest_functions(records: List[Dict], limit: int = 20) -> List[Dict]:
+    """Self time summed over every sampled profile"""
+    totals = defaultdict(lambda: {'calls': 0, 'self_ms': 0.0, 'cumulative_ms': 0.0, 'samples': 0})
+    for record in records:
+        for row in record.get('profile') or []:
+            total = totals[row['function']]
+            total['calls'] += row['calls']
+            total['self_ms'] += row['self_ms']
+            total['cumulative_ms'] += row['cumulative_ms']
+            total['samples'] += 1
+
+    ranked = sorted(totals.items(), key=lambda item: item[1]['self_ms'], reverse=True)[:limit]
+    return [
+        {'function': function, 'calls': t['calls'], 'samples': t['samples'],
+         'self_ms': round(t['self_ms'], 1), 'cumulative_ms': round(t['cumulative_ms'], 1)}
+        for function, t in ranked
+    ]
@@ -1 +1,32 @@
-# Role-based access control 
+"""
+Role-based access control for Potluck
+Admin/operator endpoints are guarded by a shared ADMIN_TOKEN rather
+than a user role; with no token configured they are switched off
+"""
+
+import os
+import hmac
+from functools import wraps
+from flask import request, jsonify
+
+ADMIN_TOKEN = os.getenv('ADMIN_TOKEN', '')
+
+
+def require_admin(f):
+    """Decorator requiring the admin token (X-Admin-Token or Bearer header)"""
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        if not ADMIN_TOKEN:
+            return jsonify({'success': False, 'error': 'Admin endpoints are disabled'}), 404
+
+        token = request.headers.get('X-Admin-Token', '')
+        auth_header = request.headers.get('Authorization', '')
+        if not token and auth_header.startswith('Bearer '):
+            token = auth_header.split(' ', 1)[1]
+
+        if not token or not hmac.compare_digest(token, ADMIN_TOKEN):
+            return jsonify({'success': False, 'error': 'Admin token required'}), 403
+
+        return f(*args, **kwargs)
+
+    return decorated_function
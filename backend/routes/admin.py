@@ -1 +1,66 @@
-# Admin routes 
+"""
+Admin routes for Potluck
+Operator views over the request profiles written by middleware/logging.py
+"""
+
+from flask import Blueprint, jsonify, request
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from middleware.rbac import require_admin
+from middleware.logging import profile_store, slowest_routes, hottest_functions, PROFILE_SAMPLE_RATE
+
+bp = Blueprint('admin', __name__)
+
+# Most recent records considered by the profile summaries
+MAX_PROFILE_RECORDS = 50000
+
+
+@bp.route('/profiles/routes', methods=['GET'])
+@require_admin
+def profile_routes():
+    """Top-N slowest routes by p95 wall time (?limit=10&since=<epoch seconds>)"""
+    try:
+        limit = request.args.get('limit', 10, type=int)
+        since = request.args.get('since', 0, type=float)
+        records = profile_store.read(MAX_PROFILE_RECORDS, since=since)
+        return jsonify({
+            'success': True,
+            'requests': len(records),
+            'routes': slowest_routes(records, limit)
+        })
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@bp.route('/profiles/functions', methods=['GET'])
+@require_admin
+def profile_functions():
+    """Top-N functions by self time across sampled profiles (?limit=20&route=/api/chef/orders)"""
+    try:
+        limit = request.args.get('limit', 20, type=int)
+        route = request.args.get('route')
+        records = [
+            r for r in profile_store.read(MAX_PROFILE_RECORDS)
+            if r.get('profile') and (not route or route in (r.get('route'), r['path']))
+        ]
+        return jsonify({
+            'success': True,
+            'sample_rate': PROFILE_SAMPLE_RATE,
+            'sampled_requests': len(records),
+            'functions': hottest_functions(records, limit)
+        })
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@bp.route('/profiles/recent', methods=['GET'])
+@require_admin
+def recent_profiles():
+    """Latest raw request records (?limit=50)"""
+    try:
+        limit = min(request.args.get('limit', 50, type=int), 1000)
+        return jsonify({'success': True, 'records': profile_store.read(limit)})
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
@@ -15,6 +15,7 @@ from utils.auth_utils import AuthUtils, SessionManager, validate_password_streng
 from utils.location import location_service
 from utils.geolocation import geolocation_service
 from utils.ai_translator import ai_translator
+from utils import coverage
 
 # Simple in-memory rate limiting (in production, use Redis)
 rate_limit_store = defaultdict(list)
@@ -63,73 +64,76 @@ def validate_location():
             })
         
         # For CONSUMERS and DELIVERY AGENTS: Check if chefs exist in the area
-        # Query database to find chefs in the area
+        # using the precomputed coverage map (one key lookup)
         try:
-            # Get chefs in this city/state
-            with DatabaseConnection.get_db() as conn:
-                cursor = conn.cursor()
-                cursor.execute("""
-                    SELECT id, full_name, city, state, latitude, longitude, chef_specialties
+            coords = None
+            if data.get('latitude') is not None and data.get('longitude') is not None:
+                coords = (float(data['latitude']), float(data['longitude']))
+            elif zip_code:
+                zip_coords = location_service.get_coordinates_from_zip(zip_code)
+                if zip_coords:
+                    coords = zip_coords[:2]
+            
+            if coords:
+                area = coverage.lookup(*coords)
+                chef_count = area['chef_count']
+                local_chefs = coverage.get_chefs(area['nearest_chef_ids'])
+            else:
+                # Unknown zip: fall back to chefs registered in the same city
+                local_chefs = DatabaseConnection.execute_query("""
+                    SELECT id, full_name, city, state, chef_specialties
                     FROM users 
                     WHERE user_type = 'chef' 
                     AND is_active = 1
                     AND city = ? AND state = ?
                 """, (city, state))
-                local_chefs = cursor.fetchall()
+                chef_count = len(local_chefs)
+            
+            def chef_summary(chefs):
+                return [{
+                    'name': chef['full_name'],
+                    'city': chef['city'],
+                    'state': chef['state'],
+                    'specialties': chef.get('chef_specialties', '[]'),
+                    **({'distance_km': chef['distance_km']} if 'distance_km' in chef else {})
+                } for chef in chefs[:3]]
+            
+            if not chef_count:
+                if user_type == 'delivery':
+                    # DELIVERY AGENTS: Can signup and add service areas even without chefs
+                    # They can add service areas from their dashboard later
+                    return jsonify({
+                        'valid': True,
+                        'message': 'Location validated. You can add service areas from your dashboard after registration.',
+                        'user_type': 'delivery',
+                        'note': 'No chefs in this area yet, but you can still register and add service areas for future opportunities.'
+                    })
                 
-                # If no exact match, find nearest chefs
-                if not local_chefs:
-                    cursor.execute("""
-                        SELECT id, full_name, city, state, latitude, longitude, chef_specialties
-                        FROM users 
-                        WHERE user_type = 'chef' 
-                        AND is_active = 1
-                        LIMIT 5
-                    """)
-                    nearest_chefs = cursor.fetchall()
-                    
-                    if user_type == 'delivery':
-                        # DELIVERY AGENTS: Can signup and add service areas even without chefs
-                        # They can add service areas from their dashboard later
-                        return jsonify({
-                            'valid': True,
-                            'message': 'Location validated. You can add service areas from your dashboard after registration.',
-                            'user_type': 'delivery',
-                            'note': 'No chefs in this area yet, but you can still register and add service areas for future opportunities.'
-                        })
-                    else:
-                        # CONSUMERS: Can signup but show nearest chefs
-                        if nearest_chefs:
-                            chef_list = [{
-                                'name': chef['full_name'],
-                                'city': chef['city'],
-                                'state': chef['state'],
-                                'specialties': chef.get('chef_specialties', '[]')
-                            } for chef in nearest_chefs[:3]]
-                            
-                            return jsonify({
-                                'valid': True,
-                                'message': f'No chefs in {city}, {state} yet. Here are nearby chefs.',
-                                'warning': 'Delivery may not be available. You might need to pickup your order.',
-                                'nearest_chefs': chef_list,
-                                'has_local_chefs': False
-                            })
-                        else:
-                            return jsonify({
-                                'valid': True,
-                                'message': 'You can signup, but no chefs are available yet in your area.',
-                                'warning': 'Be the first to encourage chefs in your area!',
-                                'has_local_chefs': False
-                            })
-                else:
-                    # Chefs exist in the area
-                    chef_count = len(local_chefs)
+                # CONSUMERS: Can signup but show nearest chefs
+                nearest_chefs = coverage.nearest_chefs_outside(*coords) if coords else []
+                if nearest_chefs:
                     return jsonify({
                         'valid': True,
-                        'message': f'Great! {chef_count} chef(s) are serving in {city}, {state}.',
-                        'has_local_chefs': True,
-                        'chef_count': chef_count
+                        'message': f'No chefs in {city}, {state} yet. Here are nearby chefs.',
+                        'warning': 'Delivery may not be available. You might need to pickup your order.',
+                        'nearest_chefs': chef_summary(nearest_chefs),
+                        'has_local_chefs': False
                     })
+                return jsonify({
+                    'valid': True,
+                    'message': 'You can signup, but no chefs are available yet in your area.',
+                    'warning': 'Be the first to encourage chefs in your area!',
+                    'has_local_chefs': False
+                })
+            
+            # Chefs exist in the area
+            return jsonify({
+                'valid': True,
+                'message': f'Great! {chef_count} chef(s) are serving in {city}, {state}.',
+                'has_local_chefs': True,
+                'chef_count': chef_count,
+                'nearest_chefs': chef_summary(local_chefs)
+            })
                     
         except Exception as db_error:
             print(f"Database error in location validation: {db_error}")
@@ -272,21 +276,30 @@ def check_service_area():
         if not zip_code:
             return jsonify({'success': False, 'error': 'Zip code required'}), 400
         
-        # Get location info for the zip code
-        location_info = location_service.get_local_market_info(zip_code)
-        
-        if not location_info.get('coordinates'):
+        coords = location_service.get_coordinates_from_zip(zip_code)
+        if not coords:
             return jsonify({
                 'success': False,
                 'serviceable': False,
                 'message': 'Service not available in your area yet. We currently serve Dallas, Mumbai, and Mexico City areas.'
             })
         
+        area = coverage.lookup(coords[0], coords[1])
+        if not area['chef_count']:
+            return jsonify({
+                'success': True,
+                'serviceable': False,
+                'message': f'No chefs serve {coords[2]}, {coords[3]} (ZIP: {zip_code}) yet.',
+                'location': f"{coords[2]}, {coords[3]}"
+            })
+        
         return jsonify({
             'success': True,
             'serviceable': True,
-            'message': f'Great! We serve {location_info["city"]}, {location_info["state"]} area (ZIP: {zip_code})',
-            'location': location_info['location']
+            'message': f'Great! We serve {coords[2]}, {coords[3]} area (ZIP: {zip_code})',
+            'location': f"{coords[2]}, {coords[3]}",
+            'chef_count': area['chef_count'],
+            'nearest_chef_distance_km': area['nearest_distance_km']
         })
         
     except Exception as e:
@@ -362,6 +375,7 @@ def signup():
             return jsonify({'success': False, 'error': 'Error processing password'}), 500
         
         # Create user data
+        zip_coords = location_service.get_coordinates_from_zip(data['zip_code'])
         
         user_data = {
             'email': data['email'],
@@ -373,8 +387,9 @@ def signup():
             'city': data.get('city', 'Dallas'),
             'state': data.get('state', 'TX'),
             'address': data.get('address', ''),
-            'latitude': 32.7767,
-            'longitude': -96.7970
+            # Unknown location stays NULL rather than pinning the user to a default city
+            'latitude': data.get('latitude') or (zip_coords[0] if zip_coords else None),
+            'longitude': data.get('longitude') or (zip_coords[1] if zip_coords else None)
         }
         
         print(f"👤 User data prepared: {user_data['email']}")
@@ -403,6 +418,10 @@ def signup():
             print("❌ User ID is None/False")
             return jsonify({'success': False, 'error': 'Failed to create user account'}), 500
         
+        # New chefs extend the coverage map around them
+        if data['user_type'] == 'chef' and user_data['latitude'] is not None and user_data['longitude'] is not None:
+            coverage.chef_changed(user_data['latitude'], user_data['longitude'])
+        
         # Generate session token
         print("🎟️ Generating session token...")
         try:
@@ -10,57 +10,18 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from config.database import DatabaseHelper, DatabaseConnection
 from middleware.auth import require_auth, require_role
-from utils.price_advisor import PriceAdvisor
+from utils.price_advisor import price_advisor
+from utils.location import location_service, get_currency_for_location
+from utils import coverage
+from services.job_board import job_board, OPEN_STATUSES
+from services.platform_stats import platform_counters
+from services.dispatch_service import DISPATCH_ENABLED
+from services import notification_service
+import events
 import json
 from datetime import datetime
 
 bp = Blueprint('chef', __name__)
-price_advisor = PriceAdvisor()
-
-
-def get_currency_for_location(city, state):
-    """Get currency info based on location"""
-    city_lower = (city or '').lower()
-    state_upper = (state or '').upper()
-    
-    # India
-    if state_upper in ['MH', 'DL', 'KA', 'TN', 'GJ', 'RJ', 'UP', 'WB', 'AP', 'TS']:
-        return {
-            'code': 'INR',
-            'symbol': '₹',
-            'name': 'Indian Rupee'
-        }
-    
-    # Mexico
-    if state_upper in ['CDMX', 'JAL', 'NL', 'BCN', 'QRO', 'PUE']:
-        return {
-            'code': 'MXN',
-            'symbol': '$',
-            'name': 'Mexican Peso'
-        }
-    
-    # Canada
-    if state_upper in ['ON', 'QC', 'BC', 'AB']:
-        return {
-            'code': 'CAD',
-            'symbol': '$',
-            'name': 'Canadian Dollar'
-        }
-    
-    # UK (if we add it)
-    if 'london' in city_lower or 'manchester' in city_lower:
-        return {
-            'code': 'GBP',
-            'symbol': '£',
-            'name': 'British Pound'
-        }
-    
-    # Default: USD (USA and others)
-    return {
-        'code': 'USD',
-        'symbol': '$',
-        'name': 'US Dollar'
-    }
 
 
 @bp.route('/dashboard', methods=['GET'])
@@ -221,6 +182,7 @@ def add_dish(current_user_id):
             cursor = conn.cursor()
             cursor.execute("SELECT city, state, total_dishes_sold, chef_rating FROM users WHERE id = ?", (current_user_id,))
             chef = cursor.fetchone()
+            currency_info = get_currency_for_location(chef['city'], chef['state'])
             
             dish_data = {
                 'name': data['name'],
@@ -228,8 +190,8 @@ def add_dish(current_user_id):
                 'ingredients': data.get('ingredients', []),
                 'portion_size': data['portion_size'],
                 'location': f"{chef['city']}, {chef['state']}",
-                'currency': 'USD',
-                'currency_symbol': '$',
+                'currency': currency_info['code'],
+                'currency_symbol': currency_info['symbol'],
                 'chef_experience': 'intermediate' if (chef['total_dishes_sold'] or 0) > 10 else 'new'
             }
             
@@ -314,8 +276,9 @@ def add_dish(current_user_id):
                 data.get('preparation_time', 30),
                 data.get('is_available', 1)
             ))
-            conn.commit()
             dish_id = cursor.lastrowid
+            platform_counters.bump(cursor, {'active_dishes': 1 if data.get('is_available', 1) else 0})
+            conn.commit()
             
             return jsonify({
                 'success': True,
@@ -341,7 +304,7 @@ def update_dish(current_user_id, dish_id):
         # Verify dish belongs to chef
         with DatabaseConnection.get_db() as conn:
             cursor = conn.cursor()
-            cursor.execute("SELECT chef_id FROM dishes WHERE id = ?", (dish_id,))
+            cursor.execute("SELECT chef_id, is_available = 1 AS was_active FROM dishes WHERE id = ?", (dish_id,))
             dish = cursor.fetchone()
             
             if not dish:
@@ -382,6 +345,9 @@ def update_dish(current_user_id, dish_id):
             
             query = f"UPDATE dishes SET {', '.join(updates)} WHERE id = ?"
             cursor.execute(query, tuple(params))
+            if 'is_available' in data:
+                cursor.execute("SELECT is_available = 1 AS active FROM dishes WHERE id = ?", (dish_id,))
+                platform_counters.bump(cursor, {'active_dishes': cursor.fetchone()['active'] - dish['was_active']})
             conn.commit()
             
             return jsonify({
@@ -406,7 +372,7 @@ def delete_dish(current_user_id, dish_id):
             cursor = conn.cursor()
             
             # Verify dish belongs to chef
-            cursor.execute("SELECT chef_id FROM dishes WHERE id = ?", (dish_id,))
+            cursor.execute("SELECT chef_id, is_available = 1 AS was_active FROM dishes WHERE id = ?", (dish_id,))
             dish = cursor.fetchone()
             
             if not dish:
@@ -417,6 +383,7 @@ def delete_dish(current_user_id, dish_id):
             
             # Soft delete (just mark as unavailable) or hard delete
             cursor.execute("DELETE FROM dishes WHERE id = ?", (dish_id,))
+            platform_counters.bump(cursor, {'active_dishes': -dish['was_active']})
             conn.commit()
             
             return jsonify({
@@ -445,6 +412,7 @@ def get_price_suggestion(current_user_id):
             
             if not chef:
                 return jsonify({'success': False, 'error': 'Chef not found'}), 404
+            currency_info = get_currency_for_location(chef['city'], chef['state'])
             
             # Prepare dish data for AI
             dish_data = {
@@ -453,8 +421,8 @@ def get_price_suggestion(current_user_id):
                 'ingredients': data.get('ingredients', []),
                 'portion_size': data.get('portion_size', ''),
                 'location': f"{chef['city']}, {chef['state']}",
-                'currency': 'USD',
-                'currency_symbol': '$',
+                'currency': currency_info['code'],
+                'currency_symbol': currency_info['symbol'],
                 'chef_experience': 'intermediate'  # Can be dynamic based on chef stats
             }
             
@@ -496,6 +464,78 @@ def get_price_suggestion(current_user_id):
         return jsonify({'success': False, 'error': str(e)}), 500
 
 
+@bp.route('/market-analysis', methods=['GET'])
+@require_auth
+@require_role('chef')
+def get_market_analysis(current_user_id):
+    """Get market analysis for a cuisine in the chef's city"""
+    try:
+        cuisine = request.args.get('cuisine', '').strip()
+        if not cuisine:
+            return jsonify({'success': False, 'error': 'cuisine is required'}), 400
+        
+        chef = DatabaseHelper.get_user_by_id(current_user_id)
+        if not chef:
+            return jsonify({'success': False, 'error': 'Chef not found'}), 404
+        
+        location = f"{chef['city']}, {chef['state']}"
+        analysis = price_advisor.get_market_analysis(location, cuisine)
+        
+        return jsonify({
+            'success': True,
+            'data': {
+                'location': location,
+                'cuisine': cuisine,
+                'analysis': analysis
+            }
+        })
+        
+    except Exception as e:
+        print(f"Market analysis error: {e}")
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+
+@bp.route('/status', methods=['PUT'])
+@require_auth
+@require_role('chef')
+def update_chef_status(current_user_id):
+    """Update chef availability and/or kitchen location"""
+    try:
+        data = request.get_json() or {}
+        chef = DatabaseHelper.get_user_by_id(current_user_id)
+        if not chef:
+            return jsonify({'success': False, 'error': 'Chef not found'}), 404
+        
+        updates = {}
+        if 'is_available' in data:
+            updates['is_available'] = 1 if data['is_available'] else 0
+        
+        if data.get('zip_code'):
+            coords = location_service.get_coordinates_from_zip(data['zip_code'])
+            if not coords:
+                return jsonify({'success': False, 'error': 'Unknown zip code'}), 400
+            updates.update({'zip_code': data['zip_code'], 'latitude': coords[0], 'longitude': coords[1],
+                            'city': coords[2], 'state': coords[3]})
+        if data.get('latitude') is not None and data.get('longitude') is not None:
+            updates.update({'latitude': float(data['latitude']), 'longitude': float(data['longitude'])})
+        
+        if not updates:
+            return jsonify({'success': False, 'error': 'Nothing to update'}), 400
+        
+        DatabaseHelper.update_user(current_user_id, updates)
+        
+        # Refresh coverage around both the old and the new kitchen location
+        previous = (chef['latitude'], chef['longitude'])
+        coverage.chef_changed(updates.get('latitude', chef['latitude']),
+                              updates.get('longitude', chef['longitude']), previous)
+        
+        return jsonify({'success': True, 'message': 'Status updated successfully'})
+        
+    except Exception as e:
+        print(f"Chef status update error: {e}")
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+
 @bp.route('/orders', methods=['GET'])
 @require_auth
 @require_role('chef')
@@ -612,12 +652,27 @@ def update_order_status(current_user_id, order_id):
                 VALUES (?, ?, ?, ?)
             """, (order_id, new_status, current_user_id, data.get('notes', '')))
             
+            # Keep the delivery job board and platform totals in step with the order
+            job_board.sync_order(cursor, order_id)
+            platform_counters.order_status_changed(cursor, order['order_status'], new_status, order['total_amount'])
+            
             # If order is accepted with ETA, notify nearby delivery agents
-            if new_status == 'accepted' and eta_minutes and order['delivery_type'] == 'delivery':
+            # (with dispatch enabled, agents get targeted offers instead)
+            if (new_status == 'accepted' and eta_minutes and order['delivery_type'] == 'delivery'
+                    and not DISPATCH_ENABLED):
                 notify_nearby_delivery_agents(cursor, order, eta_minutes)
             
             conn.commit()
             
+            # Push the change to the order's participants and to agents near the kitchen
+            events.publish_order_update(order_id, new_status, order['consumer_id'], order['chef_id'],
+                                        order['delivery_agent_id'], expected_ready_time=expected_ready_time)
+            if order['delivery_type'] == 'delivery' and order['delivery_agent_id'] is None:
+                if new_status in OPEN_STATUSES:
+                    events.publish_job_available(order_id, order['chef_lat'], order['chef_lon'], new_status)
+                elif new_status == 'cancelled':
+                    events.publish_job_taken(order_id, order['chef_lat'], order['chef_lon'])
+            
             return jsonify({
                 'success': True,
                 'message': f'Order status updated to {new_status}'
@@ -631,83 +686,21 @@ def update_order_status(current_user_id, order_id):
 
 
 def notify_nearby_delivery_agents(cursor, order, eta_minutes):
-    """Notify nearby delivery agents about new delivery job"""
-    try:
-        from datetime import datetime
-        from math import radians, sin, cos, sqrt, atan2
-        
-        # Get chef location
-        chef_lat = order['chef_lat']
-        chef_lon = order['chef_lon']
-        consumer_lat = order['consumer_lat']
-        consumer_lon = order['consumer_lon']
-        
-        if not all([chef_lat, chef_lon, consumer_lat, consumer_lon]):
-            print("Missing location data for distance calculation")
-            return
-        
-        # Calculate distance between chef and consumer (Haversine formula)
-        def calculate_distance(lat1, lon1, lat2, lon2):
-            R = 3959  # Earth's radius in miles
-            lat1, lon1, lat2, lon2 = map(radians, [lat1, lon1, lat2, lon2])
-            dlat = lat2 - lat1
-            dlon = lon2 - lon1
-            a = sin(dlat/2)**2 + cos(lat1) * cos(lat2) * sin(dlon/2)**2
-            c = 2 * atan2(sqrt(a), sqrt(1-a))
-            return R * c
-        
-        delivery_distance = calculate_distance(chef_lat, chef_lon, consumer_lat, consumer_lon)
-        
-        # Find active delivery agents in the same area (within 10 miles of chef)
-        cursor.execute("""
-            SELECT id, full_name, latitude, longitude
-            FROM users
-            WHERE user_type = 'delivery'
-            AND is_active = 1
-            AND latitude IS NOT NULL
-            AND longitude IS NOT NULL
-        """)
-        
-        delivery_agents = cursor.fetchall()
-        
-        # Calculate base delivery fee (simple calculation)
-        base_fee = 3.99
-        distance_fee = delivery_distance * 0.50  # $0.50 per mile
-        estimated_earnings = round(base_fee + distance_fee, 2)
-        
-        notified_count = 0
-        for da in delivery_agents:
-            da_distance = calculate_distance(chef_lat, chef_lon, da['latitude'], da['longitude'])
-            
-            # Only notify DAs within 10 miles of the chef
-            if da_distance <= 10:
-                message = (
-                    f"🚗 New delivery job available!\n"
-                    f"Order: {order['order_number']}\n"
-                    f"Chef: {order['chef_name']} ({round(da_distance, 1)} miles from you)\n"
-                    f"Customer: {round(delivery_distance, 1)} miles from chef\n"
-                    f"Ready in: ~{eta_minutes} minutes\n"
-                    f"Estimated earnings: ${estimated_earnings}"
-                )
-                
-                cursor.execute("""
-                    INSERT INTO notifications (user_id, title, message, type, created_at)
-                    VALUES (?, ?, ?, ?, ?)
-                """, (
-                    da['id'],
-                    '🚗 New Delivery Job Available',
-                    message,
-                    'delivery_job',
-                    datetime.now().isoformat()
-                ))
-                notified_count += 1
-        
-        print(f"✅ Notified {notified_count} nearby delivery agents about order {order['order_number']}")
-        
-    except Exception as e:
-        print(f"Error notifying delivery agents: {e}")
-        import traceback
-        traceback.print_exc()
+    """Queue a 'new delivery job' event; the outbox dispatcher fans it out to nearby agents"""
+    if not all([order['chef_lat'], order['chef_lon'], order['consumer_lat'], order['consumer_lon']]):
+        print("Missing location data for distance calculation")
+        return
+    
+    notification_service.enqueue(cursor, 'delivery_job_available', {
+        'order_id': order['id'],
+        'order_number': order['order_number'],
+        'chef_name': order['chef_name'],
+        'chef_lat': order['chef_lat'],
+        'chef_lon': order['chef_lon'],
+        'consumer_lat': order['consumer_lat'],
+        'consumer_lon': order['consumer_lon'],
+        'eta_minutes': eta_minutes
+    })
 
 
 @bp.route('/feedback', methods=['GET'])
@@ -14,15 +14,15 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from middleware.auth import require_auth, require_role
 from config.database import DatabaseConnection
+from services.eta_service import eta_service
+from services.platform_stats import platform_counters
+from utils.location import LocationService
 
 bp = Blueprint('consumer', __name__)
 
 def get_db_connection():
     """Helper function to get database connection"""
-    import sqlite3
-    import os
-    db_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'potluck.db')
-    conn = sqlite3.connect(db_path)
+    conn = DatabaseConnection.connect()
     conn.row_factory = sqlite3.Row
     return conn
 
@@ -70,8 +70,26 @@ def get_dishes(user_id):
         cursor.execute('SELECT latitude, longitude, zip_code FROM users WHERE id = ?', (user_id,))
         user_location = cursor.fetchone()
         
+        # ?radius_km= limits the list to chefs within reach of the consumer
+        nearby = None
+        radius_km = request.args.get('radius_km', type=float)
+        if radius_km and user_location:
+            coords = None
+            if user_location['latitude'] is not None and user_location['longitude'] is not None:
+                coords = (user_location['latitude'], user_location['longitude'])
+            elif user_location['zip_code']:
+                zip_coords = LocationService.get_coordinates_from_zip(user_location['zip_code'])
+                coords = zip_coords[:2] if zip_coords else None
+            if coords:
+                nearby = {chef['chef_id']: chef['distance']
+                          for chef in LocationService.chefs_near(cursor, coords[0], coords[1], radius_km)}
+        
+        chef_filter = ''
+        if nearby is not None:
+            chef_filter = f"AND u.id IN ({','.join('?' * len(nearby)) or 'NULL'})"
+        
         # Get all active dishes with chef info
-        cursor.execute('''
+        cursor.execute(f'''
             SELECT 
                 d.id, d.name, d.description, d.price, d.cuisine_type, d.meal_type,
                 d.ingredients, d.allergens, d.dietary_tags, d.spice_level,
@@ -82,16 +100,18 @@ def get_dishes(user_id):
                 u.chef_bio, u.chef_specialties
             FROM dishes d
             JOIN users u ON d.chef_id = u.id
-            WHERE d.is_available = 1 AND u.is_available = 1 AND u.is_active = 1
+            WHERE d.is_available = 1 AND u.is_available = 1 AND u.is_active = 1 {chef_filter}
             ORDER BY d.rating DESC, d.total_orders DESC
-        ''')
+        ''', list(nearby or ()))
         
         dishes = []
         for row in cursor.fetchall():
             dish = dict(row)
             
             # Calculate distance if user location available
-            if user_location and user_location['latitude'] and dish['latitude']:
+            if nearby is not None:
+                dish['distance'] = round(nearby[dish['chef_id']] / 1.609, 1)  # km -> miles
+            elif user_location and user_location['latitude'] and dish['latitude']:
                 # Simple distance calculation (in real app, use proper geospatial functions)
                 lat_diff = abs(user_location['latitude'] - dish['latitude'])
                 lon_diff = abs(user_location['longitude'] - dish['longitude'])
@@ -187,6 +207,11 @@ def get_orders(user_id):
         
         conn.close()
         
+        # Live ETAs come from the shared cache (refreshed on location updates)
+        etas = eta_service.for_orders(orders)
+        for order in orders:
+            order['eta'] = etas.get(order['id'])
+        
         return jsonify({
             'success': True,
             'orders': orders
@@ -250,6 +275,7 @@ def create_order(user_id):
         ))
         
         order_id = cursor.lastrowid
+        platform_counters.order_placed(cursor, float(data['total_amount']))
         
         # Create notification for chef
         cursor.execute('''
@@ -394,6 +420,7 @@ def cancel_order(user_id, order_id):
                     cancellation_reason = 'Cancelled by customer'
                 WHERE id = ?
             ''', (order_id,))
+            platform_counters.order_status_changed(cursor, 'pending', 'cancelled', order['total_amount'])
             
             # Create notification for chef
             cursor.execute('''
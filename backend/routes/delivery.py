@@ -8,14 +8,19 @@ import sqlite3
 import os
 import base64
 from datetime import datetime, timedelta
-from middleware.auth import require_auth
+from middleware.auth import require_auth, require_role
+from services.job_board import job_board, distance_miles, DEFAULT_AGENT_RADIUS_KM
+from services.dispatch_service import dispatch_service
+from services.route_planner import RoutePlanner, CARRIED_STATUSES
+from services.location_service import location_buffer, parse_points, drop_foreign_orders
+import events
 
 bp = Blueprint('delivery', __name__)
 
 def get_db_connection():
     """Get database connection"""
-    db_path = os.path.join(os.path.dirname(__file__), '..', 'potluck.db')
-    conn = sqlite3.connect(db_path)
+    from config.database import DatabaseConnection
+    conn = DatabaseConnection.connect()
     conn.row_factory = sqlite3.Row
     return conn
 
@@ -133,13 +138,10 @@ def service_areas(user_id):
 def available_jobs(user_id):
     """Get available delivery jobs (orders that have been accepted by chef)"""
     try:
-        from datetime import datetime
-        from math import radians, sin, cos, sqrt, atan2
-        
         conn = get_db_connection()
         
         # Get delivery agent location
-        da_cursor = conn.execute('SELECT latitude, longitude, zip_code FROM users WHERE id = ?', (user_id,))
+        da_cursor = conn.execute('SELECT latitude, longitude, zip_code, delivery_radius FROM users WHERE id = ?', (user_id,))
         da_info = da_cursor.fetchone()
         
         if not da_info or not da_info['latitude'] or not da_info['longitude']:
@@ -160,46 +162,43 @@ def available_jobs(user_id):
             conn.close()
             return jsonify({'jobs': [], 'message': 'Please add service areas first'})
         
-        # Get available jobs - orders that are accepted/preparing/ready but not yet assigned
-        cursor = conn.execute('''
-            SELECT o.id, o.order_number, o.delivery_address, o.total_amount,
-                   o.delivery_latitude, o.delivery_longitude, o.expected_ready_time,
-                   o.order_status,
-                   c.full_name as chef_name, c.address as chef_address,
-                   c.latitude as chef_latitude, c.longitude as chef_longitude,
-                   c.zip_code as chef_zip,
-                   consumer.full_name as consumer_name,
-                   consumer.latitude as consumer_lat, consumer.longitude as consumer_lon,
-                   consumer.zip_code as consumer_zip
-            FROM orders o
-            JOIN users c ON o.chef_id = c.id
-            JOIN users consumer ON o.consumer_id = consumer.id
-            WHERE o.order_status IN ('accepted', 'preparing', 'ready')
-            AND o.delivery_agent_id IS NULL
-            AND o.delivery_type = 'delivery'
-            AND consumer.zip_code IN ({})
-            ORDER BY o.order_placed_at ASC
-            LIMIT 20
-        '''.format(','.join('?' * len(service_zips))), service_zips)
-        
-        # Helper function to calculate distance (Haversine)
-        def calculate_distance(lat1, lon1, lat2, lon2):
-            R = 3959  # Earth's radius in miles
-            lat1, lon1, lat2, lon2 = map(radians, [lat1, lon1, lat2, lon2])
-            dlat = lat2 - lat1
-            dlon = lon2 - lon1
-            a = sin(dlat/2)**2 + cos(lat1) * cos(lat2) * sin(dlon/2)**2
-            c = 2 * atan2(sqrt(a), sqrt(1-a))
-            return R * c
+        # Open jobs near the agent or dropping into their service areas, from the job index
+        sort = request.args.get('sort', 'oldest')
+        limit = min(int(request.args.get('limit', 20)), 100)
+        open_jobs = job_board.find_jobs(
+            conn, da_lat, da_lon, da_info['delivery_radius'] or DEFAULT_AGENT_RADIUS_KM,
+            service_zips, sort=sort, limit=limit
+        )
+        
+        # Details for the page of jobs being returned
+        details = {}
+        if open_jobs:
+            cursor = conn.execute('''
+                SELECT o.id, o.order_number, o.delivery_address, o.total_amount,
+                       o.expected_ready_time, o.order_status,
+                       c.full_name as chef_name, c.address as chef_address,
+                       consumer.full_name as consumer_name
+                FROM orders o
+                JOIN users c ON o.chef_id = c.id
+                JOIN users consumer ON o.consumer_id = consumer.id
+                WHERE o.id IN ({})
+            '''.format(','.join('?' * len(open_jobs))), [job['order_id'] for job in open_jobs])
+            details = {row['id']: row for row in cursor.fetchall()}
         
         jobs = []
-        for row in cursor.fetchall():
+        for job in open_jobs:
+            row = details.get(job['order_id'])
+            if not row:
+                continue
+            
             # Calculate distances
-            da_to_chef_distance = calculate_distance(da_lat, da_lon, row['chef_latitude'], row['chef_longitude'])
-            chef_to_consumer_distance = calculate_distance(
-                row['chef_latitude'], row['chef_longitude'],
-                row['consumer_lat'], row['consumer_lon']
-            )
+            da_to_chef_distance = job['agent_distance']
+            chef_to_consumer_distance = 0.0
+            if job['drop_latitude'] is not None and job['drop_longitude'] is not None:
+                chef_to_consumer_distance = distance_miles(
+                    job['pickup_latitude'], job['pickup_longitude'],
+                    job['drop_latitude'], job['drop_longitude']
+                )
             
             # Calculate estimated earnings
             base_fee = 3.99
@@ -224,10 +223,10 @@ def available_jobs(user_id):
                 'order_number': row['order_number'],
                 'pickup_address': row['chef_address'],
                 'delivery_address': row['delivery_address'],
-                'pickup_latitude': row['chef_latitude'],
-                'pickup_longitude': row['chef_longitude'],
-                'delivery_latitude': row['delivery_latitude'],
-                'delivery_longitude': row['delivery_longitude'],
+                'pickup_latitude': job['pickup_latitude'],
+                'pickup_longitude': job['pickup_longitude'],
+                'delivery_latitude': job['drop_latitude'],
+                'delivery_longitude': job['drop_longitude'],
                 'chef_name': row['chef_name'],
                 'consumer_name': row['consumer_name'],
                 'estimated_earnings': estimated_earnings,
@@ -294,7 +293,7 @@ def update_order_status(user_id, order_id):
             return jsonify({'error': 'Invalid status'}), 400
         
         conn = get_db_connection()
-        cursor = conn.execute('SELECT delivery_agent_id, order_status FROM orders WHERE id = ?', (order_id,))
+        cursor = conn.execute('SELECT delivery_agent_id, order_status, consumer_id, chef_id FROM orders WHERE id = ?', (order_id,))
         order = cursor.fetchone()
         if not order:
             conn.close()
@@ -338,6 +337,8 @@ def update_order_status(user_id, order_id):
         
         conn.commit()
         conn.close()
+        
+        events.publish_order_update(order_id, new_status, order['consumer_id'], order['chef_id'], user_id)
         return jsonify({'success': True, 'message': 'Order status updated', 'status': new_status})
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -437,67 +438,114 @@ def update_status(user_id):
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@bp.route('/location', methods=['POST'])
+@require_auth
+@require_role('delivery')
+def report_location(user_id):
+    """
+    Ingest GPS points from the agent app
+    Body: {"points": [{"latitude", "longitude", "timestamp", "order_id"?, "status"?}, ...]}
+    Points are buffered and written to delivery_tracking in batches; points
+    tagged with an order not assigned to the caller are rejected
+    """
+    try:
+        points, rejected = parse_points(request.get_json(silent=True) or {})
+        points, foreign = drop_foreign_orders(user_id, points)
+        rejected += foreign
+        if not points:
+            return jsonify({'error': 'No valid location points', 'rejected': rejected}), 400
+
+        kept = location_buffer.add(user_id, points)
+        return jsonify({'success': True, 'accepted': len(points), 'kept': kept, 'rejected': rejected}), 202
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @bp.route('/accept-job/<int:order_id>', methods=['POST'])
 @require_auth
 def accept_job(user_id, order_id):
-    """Accept a delivery job"""
+    """Accept a delivery job (first agent wins; later accepts get 409)"""
     try:
         conn = get_db_connection()
         
-        # Check if order exists and is available
-        cursor = conn.execute('''
-            SELECT id, order_status, delivery_agent_id, chef_id, consumer_id
-            FROM orders 
-            WHERE id = ? AND delivery_type = 'delivery'
-        ''', (order_id,))
-        order = cursor.fetchone()
-        
-        if not order:
-            conn.close()
-            return jsonify({'success': False, 'error': 'Order not found'}), 404
-        
-        if order['delivery_agent_id'] is not None:
-            conn.close()
-            return jsonify({'success': False, 'error': 'Order already assigned'}), 400
-        
-        if order['order_status'] not in ['accepted', 'preparing', 'ready']:
+        # Claim the order with one conditional UPDATE under the write lock,
+        # so two agents accepting together can't both pass the check
+        conn.isolation_level = None
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            claimed = conn.execute('''
+                UPDATE orders 
+                SET delivery_agent_id = ?
+                WHERE id = ? AND delivery_type = 'delivery'
+                AND delivery_agent_id IS NULL
+                AND order_status IN ('accepted', 'preparing', 'ready')
+            ''', (user_id, order_id)).rowcount
+            
+            order = conn.execute('''
+                SELECT o.id, o.order_status, o.delivery_agent_id, o.chef_id, o.consumer_id,
+                       c.latitude as chef_latitude, c.longitude as chef_longitude
+                FROM orders o
+                JOIN users c ON o.chef_id = c.id
+                WHERE o.id = ? AND o.delivery_type = 'delivery'
+            ''', (order_id,)).fetchone()
+            
+            if not claimed:
+                conn.execute('ROLLBACK')
+                conn.close()
+                if not order:
+                    return jsonify({'success': False, 'error': 'Order not found'}), 404
+                if order['delivery_agent_id'] == user_id:
+                    return jsonify({'success': True, 'message': 'Job already accepted by you'})
+                if order['delivery_agent_id'] is not None:
+                    return jsonify({'success': False, 'error': 'Order already taken by another delivery agent',
+                                    'already_taken': True}), 409
+                return jsonify({'success': False, 'error': 'Order not available for pickup'}), 400
+            
+            job_board.remove(conn, order_id)
+            
+            # Close out dispatch offers for this order
+            conn.execute('''
+                UPDATE delivery_offers
+                SET status = CASE WHEN agent_id = ? THEN 'accepted' ELSE 'superseded' END
+                WHERE order_id = ? AND status = 'pending'
+            ''', (user_id, order_id))
+            
+            # Create notification for chef
+            conn.execute('''
+                INSERT INTO notifications (user_id, type, title, message, related_id)
+                VALUES (?, ?, ?, ?, ?)
+            ''', (
+                order['chef_id'],
+                'delivery_assigned',
+                'Delivery Agent Assigned',
+                f'A delivery agent has been assigned to order #{order_id}',
+                order_id
+            ))
+            
+            # Create notification for consumer
+            conn.execute('''
+                INSERT INTO notifications (user_id, type, title, message, related_id)
+                VALUES (?, ?, ?, ?, ?)
+            ''', (
+                order['consumer_id'],
+                'delivery_assigned',
+                'Delivery Agent On The Way',
+                f'Your order #{order_id} has been assigned to a delivery agent',
+                order_id
+            ))
+            
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
             conn.close()
-            return jsonify({'success': False, 'error': 'Order not available for pickup'}), 400
-        
-        # Assign delivery agent to order
-        conn.execute('''
-            UPDATE orders 
-            SET delivery_agent_id = ?
-            WHERE id = ?
-        ''', (user_id, order_id))
-        
-        # Create notification for chef
-        conn.execute('''
-            INSERT INTO notifications (user_id, type, title, message, related_id)
-            VALUES (?, ?, ?, ?, ?)
-        ''', (
-            order['chef_id'],
-            'delivery_assigned',
-            'Delivery Agent Assigned',
-            f'A delivery agent has been assigned to order #{order_id}',
-            order_id
-        ))
-        
-        # Create notification for consumer
-        conn.execute('''
-            INSERT INTO notifications (user_id, type, title, message, related_id)
-            VALUES (?, ?, ?, ?, ?)
-        ''', (
-            order['consumer_id'],
-            'delivery_assigned',
-            'Delivery Agent On The Way',
-            f'Your order #{order_id} has been assigned to a delivery agent',
-            order_id
-        ))
+            raise
         
-        conn.commit()
         conn.close()
         
+        events.publish_order_update(order_id, order['order_status'], order['consumer_id'], order['chef_id'],
+                                    user_id, delivery_assigned=True)
+        events.publish_job_taken(order_id, order['chef_latitude'], order['chef_longitude'])
+        
         return jsonify({
             'success': True,
             'message': 'Job accepted successfully'
@@ -509,6 +557,84 @@ def accept_job(user_id, order_id):
         traceback.print_exc()
         return jsonify({'success': False, 'error': str(e)}), 500
 
+@bp.route('/offers')
+@require_auth
+def get_offers(user_id):
+    """Pending dispatch offers for this delivery agent"""
+    try:
+        return jsonify({'offers': dispatch_service.get_offers(user_id)})
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@bp.route('/offers/<int:offer_id>/decline', methods=['POST'])
+@require_auth
+def decline_offer(user_id, offer_id):
+    """Decline a dispatch offer so it goes to another agent"""
+    try:
+        if not dispatch_service.decline(user_id, offer_id):
+            return jsonify({'success': False, 'error': 'Offer not found'}), 404
+        return jsonify({'success': True, 'message': 'Offer declined'})
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@bp.route('/route-plan')
+@require_auth
+def route_plan(user_id):
+    """Batch this agent's active orders into multi-stop routes"""
+    try:
+        conn = get_db_connection()
+        agent = conn.execute(
+            'SELECT latitude, longitude, vehicle_type FROM users WHERE id = ?', (user_id,)
+        ).fetchone()
+        
+        if not agent or agent['latitude'] is None or agent['longitude'] is None:
+            conn.close()
+            return jsonify({'batches': [], 'message': 'Please update your location first'})
+        
+        cursor = conn.execute('''
+            SELECT o.id, o.chef_id, o.order_status, o.expected_ready_time,
+                   o.delivery_latitude, o.delivery_longitude,
+                   c.latitude as chef_latitude, c.longitude as chef_longitude,
+                   consumer.latitude as consumer_lat, consumer.longitude as consumer_lon
+            FROM orders o
+            JOIN users c ON o.chef_id = c.id
+            JOIN users consumer ON o.consumer_id = consumer.id
+            WHERE o.delivery_agent_id = ?
+            AND o.order_status NOT IN ('delivered', 'cancelled')
+        ''', (user_id,))
+        
+        now = datetime.now()
+        orders = []
+        for row in cursor.fetchall():
+            drop_lat = row['delivery_latitude'] if row['delivery_latitude'] is not None else row['consumer_lat']
+            drop_lon = row['delivery_longitude'] if row['delivery_longitude'] is not None else row['consumer_lon']
+            if None in (row['chef_latitude'], row['chef_longitude'], drop_lat, drop_lon):
+                continue
+            
+            ready_in = 0.0
+            if row['expected_ready_time']:
+                try:
+                    ready_in = max(0.0, (datetime.fromisoformat(row['expected_ready_time']) - now).total_seconds() / 60)
+                except ValueError:
+                    pass
+            
+            orders.append({
+                'id': row['id'],
+                'chef_id': row['chef_id'],
+                'pickup': (row['chef_latitude'], row['chef_longitude']),
+                'drop': (drop_lat, drop_lon),
+                'ready_in': ready_in,
+                'picked_up': row['order_status'] in CARRIED_STATUSES
+            })
+        conn.close()
+        
+        planner = RoutePlanner.for_vehicle(agent['vehicle_type'])
+        return jsonify(planner.plan((agent['latitude'], agent['longitude']), orders))
+        
+    except Exception as e:
+        print(f"Route plan error: {e}")
+        return jsonify({'error': str(e)}), 500
+
 @bp.route('/active-orders')
 @require_auth
 def active_orders(user_id):
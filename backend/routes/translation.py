@@ -5,6 +5,7 @@ Provides real-time AI translation services
 
 from flask import Blueprint, request, jsonify
 from utils.ai_translator import ai_translator
+from utils.llm_client import llm_client
 
 bp = Blueprint('translation', __name__)
 
@@ -79,5 +80,6 @@ def health_check():
     return jsonify({
         'success': True,
         'ai_available': ai_translator.has_api_key,
+        'llm': llm_client.stats(),
         'service': 'AI Translation Service'
     })
@@ -0,0 +1,281 @@
+"""
+Dispatch engine for Potluck
+Periodically matches open delivery jobs to online agents in one batch
+(greedy with regret on pickup ETA) and writes the offers atomically
+"""
+
+import os
+import heapq
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, List, Tuple
+
+from config.database import DatabaseConnection
+from services.job_board import distance_miles
+from utils import geohash
+
+# Off by default; agents keep pulling jobs from the job board either way
+DISPATCH_ENABLED = os.getenv('DISPATCH_ENABLED', 'false').lower() == 'true'
+DISPATCH_INTERVAL_SECONDS = int(os.getenv('DISPATCH_INTERVAL_SECONDS', '30'))
+
+# Offers an agent hasn't answered by then go back into the pool
+OFFER_TTL_SECONDS = int(os.getenv('DISPATCH_OFFER_TTL_SECONDS', '120'))
+
+# Agents further than this from the kitchen are never offered the job
+MAX_PICKUP_MILES = float(os.getenv('DISPATCH_MAX_PICKUP_MILES', '10'))
+
+# Only a job's cheapest candidates enter the solver, keeping it near J x K instead of J x P
+MAX_AGENTS_PER_JOB = int(os.getenv('DISPATCH_MAX_AGENTS_PER_JOB', '8'))
+
+# ~4.9km cells for finding the agents within reach of a pickup
+AGENT_CELL_PRECISION = 5
+
+# Average city speed per vehicle type (mph)
+VEHICLE_SPEED_MPH = {'bike': 9.0, 'bicycle': 9.0, 'scooter': 15.0, 'car': 18.0}
+DEFAULT_SPEED_MPH = 12.0
+
+# Minutes an agent idles at the kitchen cost less than minutes food sits waiting
+IDLE_WEIGHT = 0.3
+LATE_WEIGHT = 1.0
+
+DISPATCH_STATUSES = ('ready', 'preparing')
+
+
+def pickup_cost(travel_minutes: float, ready_in_minutes: float) -> float:
+    """Travel time plus penalties for arriving early (agent idles) or late (food waits)"""
+    early = max(0.0, ready_in_minutes - travel_minutes)
+    late = max(0.0, travel_minutes - ready_in_minutes)
+    return travel_minutes + IDLE_WEIGHT * early + LATE_WEIGHT * late
+
+
+def assign_with_regret(costs: Dict[Tuple[int, int], float]) -> List[Tuple[int, int, float]]:
+    """
+    Greedy-with-regret assignment on a sparse cost matrix {(job, agent): cost}
+    Each round fixes the job that would lose the most by not getting its best agent
+    Returns [(job, agent, cost)], each job and agent used at most once
+    """
+    options = {}
+    for (job, agent), cost in costs.items():
+        options.setdefault(job, []).append((cost, agent))
+    for job_options in options.values():
+        # Cheapest last, so dropping taken agents from the front of the queue is O(1)
+        job_options.sort(reverse=True)
+
+    rank = {job: index for index, job in enumerate(options)}
+    version = dict.fromkeys(options, 0)
+    watchers = defaultdict(set)  # agent -> jobs whose two cheapest options include it
+    taken_agents = set()
+    heap = []
+
+    def push(job):
+        """Prune taken agents from the job's two cheapest options and queue its current regret"""
+        job_options = options[job]
+        while job_options and job_options[-1][1] in taken_agents:
+            job_options.pop()
+        while len(job_options) > 1 and job_options[-2][1] in taken_agents:
+            del job_options[-2]
+        if not job_options:
+            del options[job]
+            return
+        best = job_options[-1]
+        regret = job_options[-2][0] - best[0] if len(job_options) > 1 else float('inf')
+        version[job] += 1
+        for _, agent in job_options[-2:]:
+            watchers[agent].add(job)
+        # Largest regret first; cheaper best option, then the earlier job, breaks ties
+        heapq.heappush(heap, (-regret, best[0], rank[job], job, version[job]))
+
+    for job in list(options):
+        push(job)
+
+    assignments = []
+    while heap:
+        _, cost, _, job, job_version = heapq.heappop(heap)
+        if job not in options or job_version != version[job]:
+            continue
+        agent = options.pop(job)[-1][1]
+        assignments.append((job, agent, cost))
+        taken_agents.add(agent)
+        # Only jobs that had this agent among their two cheapest options change regret
+        for other in watchers.pop(agent, ()):
+            if other in options:
+                push(other)
+
+    return assignments
+
+
+class DispatchService:
+    """One dispatch round: load jobs and agents, solve, write offers"""
+
+    def _load(self, conn, now: datetime):
+        # Offers past their expiry no longer hold a job or an agent
+        live = now.isoformat()
+        jobs = conn.execute(f"""
+            SELECT j.order_id, j.pickup_latitude, j.pickup_longitude, j.ready_at
+            FROM open_jobs j
+            WHERE j.status IN ({','.join('?' * len(DISPATCH_STATUSES))})
+              AND j.pickup_latitude IS NOT NULL
+              AND NOT EXISTS (
+                  SELECT 1 FROM delivery_offers f
+                  WHERE f.order_id = j.order_id AND f.status = 'pending' AND f.expires_at >= ?
+              )
+        """, (*DISPATCH_STATUSES, live)).fetchall()
+
+        agents = conn.execute("""
+            SELECT u.id, u.latitude, u.longitude, u.vehicle_type
+            FROM users u
+            WHERE u.user_type = 'delivery' AND u.is_active = 1 AND u.current_status = 'online'
+              AND u.latitude IS NOT NULL AND u.longitude IS NOT NULL
+              AND NOT EXISTS (
+                  SELECT 1 FROM delivery_offers f
+                  WHERE f.agent_id = u.id AND f.status = 'pending' AND f.expires_at >= ?
+              )
+        """, (live,)).fetchall()
+
+        # Only declines for the jobs being dispatched now, not every one ever made
+        declined = {(row['order_id'], row['agent_id']) for row in conn.execute(f"""
+            SELECT f.order_id, f.agent_id
+            FROM delivery_offers f
+            JOIN open_jobs j ON j.order_id = f.order_id
+            WHERE f.status = 'declined' AND j.status IN ({','.join('?' * len(DISPATCH_STATUSES))})
+        """, DISPATCH_STATUSES).fetchall()}
+
+        return jobs, agents, declined
+
+    def build_costs(self, now, jobs, agents, declined) -> Dict:
+        """
+        Sparse (job, agent) -> (cost, pickup_miles, travel_minutes) for feasible pairs
+        Agents are bucketed by geohash cell so each job only measures the ones in reach,
+        and only its MAX_AGENTS_PER_JOB cheapest pairs are kept
+        """
+        cells = defaultdict(list)
+        for agent in agents:
+            cells[geohash.encode(agent['latitude'], agent['longitude'], AGENT_CELL_PRECISION)].append(agent)
+
+        matrix = {}
+        for job in jobs:
+            ready_in = 0.0
+            if job['ready_at']:
+                try:
+                    ready_in = max(0.0, (datetime.fromisoformat(job['ready_at']) - now).total_seconds() / 60)
+                except ValueError:
+                    pass
+
+            candidates = []
+            for cell in geohash.cells_within(job['pickup_latitude'], job['pickup_longitude'],
+                                             MAX_PICKUP_MILES * 1.609, AGENT_CELL_PRECISION):
+                for agent in cells.get(cell, ()):
+                    if (job['order_id'], agent['id']) in declined:
+                        continue
+                    miles = distance_miles(agent['latitude'], agent['longitude'],
+                                           job['pickup_latitude'], job['pickup_longitude'])
+                    if miles > MAX_PICKUP_MILES:
+                        continue
+                    speed = VEHICLE_SPEED_MPH.get((agent['vehicle_type'] or '').lower(), DEFAULT_SPEED_MPH)
+                    travel = miles / speed * 60
+                    candidates.append((pickup_cost(travel, ready_in), miles, travel, agent['id']))
+
+            for cost, miles, travel, agent_id in heapq.nsmallest(MAX_AGENTS_PER_JOB, candidates):
+                matrix[(job['order_id'], agent_id)] = (cost, miles, travel)
+        return matrix
+
+    def run_round(self) -> int:
+        """Solve on a snapshot, then expire stale offers and write the batch; returns offers made"""
+        now = datetime.now()
+        # Plain reads: accepts and GPS flushes keep writing while the batch is solved
+        with DatabaseConnection.get_db() as conn:
+            jobs, agents, declined = self._load(conn, now)
+        matrix = self.build_costs(now, jobs, agents, declined)
+        assignments = assign_with_regret({pair: values[0] for pair, values in matrix.items()})
+
+        with DatabaseConnection.get_db() as conn:
+            # Short write: only the expiry, the re-check and the inserts hold the lock
+            conn.isolation_level = None
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.execute(
+                    "UPDATE delivery_offers SET status = 'expired' WHERE status = 'pending' AND expires_at < ?",
+                    (now.isoformat(),)
+                )
+                assignments = self._still_valid(conn, assignments)
+
+                expires_at = (now + timedelta(seconds=OFFER_TTL_SECONDS)).isoformat()
+                conn.executemany("""
+                    INSERT INTO delivery_offers
+                        (order_id, agent_id, cost, pickup_distance, pickup_eta_minutes, status, created_at, expires_at)
+                    VALUES (?, ?, ?, ?, ?, 'pending', ?, ?)
+                """, [
+                    (job, agent, round(cost, 2), round(matrix[(job, agent)][1], 2),
+                     round(matrix[(job, agent)][2], 1), now.isoformat(), expires_at)
+                    for job, agent, cost in assignments
+                ])
+
+                # One notification per offer instead of one per nearby agent
+                conn.executemany("""
+                    INSERT INTO notifications (user_id, type, title, message, related_id)
+                    VALUES (?, 'delivery_offer', ?, ?, ?)
+                """, [
+                    (agent, '🚗 Delivery Offer',
+                     f"Order #{job} is {round(matrix[(job, agent)][1], 1)} miles away. "
+                     f"Accept within {OFFER_TTL_SECONDS // 60} minutes.", job)
+                    for job, agent, _ in assignments
+                ])
+
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+
+        return len(assignments)
+
+    @staticmethod
+    def _still_valid(conn, assignments: List[Tuple[int, int, float]]) -> List[Tuple[int, int, float]]:
+        """Drop pairs whose job was taken or offered, or whose agent went offline or got an offer, since the snapshot"""
+        if not assignments:
+            return []
+        job_ids = [job for job, _, _ in assignments]
+        agent_ids = [agent for _, agent, _ in assignments]
+
+        open_jobs = {row['order_id'] for row in conn.execute(f"""
+            SELECT j.order_id FROM open_jobs j
+            WHERE j.order_id IN ({','.join('?' * len(job_ids))})
+              AND j.status IN ({','.join('?' * len(DISPATCH_STATUSES))})
+              AND NOT EXISTS (
+                  SELECT 1 FROM delivery_offers f WHERE f.order_id = j.order_id AND f.status = 'pending'
+              )
+        """, (*job_ids, *DISPATCH_STATUSES)).fetchall()}
+
+        free_agents = {row['id'] for row in conn.execute(f"""
+            SELECT u.id FROM users u
+            WHERE u.id IN ({','.join('?' * len(agent_ids))})
+              AND u.user_type = 'delivery' AND u.is_active = 1 AND u.current_status = 'online'
+              AND NOT EXISTS (
+                  SELECT 1 FROM delivery_offers f WHERE f.agent_id = u.id AND f.status = 'pending'
+              )
+        """, agent_ids).fetchall()}
+
+        return [(job, agent, cost) for job, agent, cost in assignments
+                if job in open_jobs and agent in free_agents]
+
+    def get_offers(self, agent_id: int) -> List[Dict]:
+        """Pending, unexpired offers for an agent"""
+        return DatabaseConnection.execute_query("""
+            SELECT f.id, f.order_id, f.pickup_distance, f.pickup_eta_minutes, f.expires_at,
+                   o.order_number, o.delivery_address, o.total_amount, o.order_status,
+                   c.full_name AS chef_name, c.address AS pickup_address
+            FROM delivery_offers f
+            JOIN orders o ON o.id = f.order_id
+            JOIN users c ON c.id = o.chef_id
+            WHERE f.agent_id = ? AND f.status = 'pending' AND f.expires_at >= ?
+            ORDER BY f.created_at
+        """, (agent_id, datetime.now().isoformat()))
+
+    def decline(self, agent_id: int, offer_id: int) -> bool:
+        """Decline an offer; the order is re-offered to someone else next round"""
+        return DatabaseConnection.execute_update(
+            "UPDATE delivery_offers SET status = 'declined' WHERE id = ? AND agent_id = ? AND status = 'pending'",
+            (offer_id, agent_id)
+        ) > 0
+
+
+dispatch_service = DispatchService()
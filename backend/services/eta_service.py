@@ -0,0 +1,223 @@
+"""
+Live ETAs for in-flight orders
+One pass loads every active order with its kitchen, drop-off, agent
+and latest delivery_tracking point, estimates ready and arrival times,
+and caches the result; location flushes and a periodic job refresh it
+"""
+
+import os
+import json
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional
+
+from config.database import DatabaseConnection
+from services.job_board import distance_miles
+from services.dispatch_service import VEHICLE_SPEED_MPH, DEFAULT_SPEED_MPH
+from services.route_planner import STOP_SERVICE_MINUTES
+
+# Full refresh interval, and the age after which a read recomputes an entry
+ETA_REFRESH_INTERVAL = float(os.getenv('ETA_REFRESH_INTERVAL', '30'))
+ETA_MAX_AGE_SECONDS = float(os.getenv('ETA_MAX_AGE_SECONDS', '120'))
+
+# A tracking point older than this no longer says where the agent is
+ETA_TRACKING_MAX_AGE_SECONDS = float(os.getenv('ETA_TRACKING_MAX_AGE_SECONDS', '300'))
+
+# Orders that still have an arrival ahead of them
+ETA_STATUSES = ('pending', 'accepted', 'preparing', 'ready', 'picked_up', 'out_for_delivery')
+
+# Time for the chef to see a new order, and for an unassigned job to find an agent
+ACCEPT_BUFFER_MINUTES = 5.0
+ASSIGN_BUFFER_MINUTES = 5.0
+
+DEFAULT_PREP_MINUTES = 30
+
+
+def _parse(value) -> Optional[datetime]:
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(str(value))
+    except ValueError:
+        return None
+
+
+def _travel_minutes(start, end, speed_mph: float) -> Optional[float]:
+    if None in (start[0], start[1], end[0], end[1]):
+        return None
+    return distance_miles(start[0], start[1], end[0], end[1]) / speed_mph * 60
+
+
+class EtaService:
+    """Compute and cache ready/arrival estimates for active orders"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._cache: Dict[int, Dict] = {}
+
+    def _load(self, conn, order_ids: Optional[List[int]]):
+        where = f"o.order_status IN ({','.join('?' * len(ETA_STATUSES))})"
+        params = list(ETA_STATUSES)
+        if order_ids is not None:
+            where += f" AND o.id IN ({','.join('?' * len(order_ids))})"
+            params += order_ids
+
+        orders = conn.execute(f"""
+            SELECT o.id, o.order_status, o.delivery_type, o.items, o.delivery_agent_id,
+                   o.order_placed_at, o.expected_ready_time, o.picked_up_at,
+                   COALESCE(o.delivery_latitude, consumer.latitude) AS drop_lat,
+                   COALESCE(o.delivery_longitude, consumer.longitude) AS drop_lon,
+                   chef.latitude AS chef_lat, chef.longitude AS chef_lon,
+                   chef.preparation_time AS chef_prep,
+                   agent.vehicle_type, agent.latitude AS agent_lat, agent.longitude AS agent_lon,
+                   t.current_latitude AS track_lat, t.current_longitude AS track_lon,
+                   t.updated_at AS tracked_at
+            FROM orders o
+            JOIN users chef ON chef.id = o.chef_id
+            JOIN users consumer ON consumer.id = o.consumer_id
+            LEFT JOIN users agent ON agent.id = o.delivery_agent_id
+            LEFT JOIN delivery_tracking t ON t.id = (
+                SELECT MAX(id) FROM delivery_tracking WHERE order_id = o.id
+            )
+            WHERE {where}
+        """, params).fetchall()
+
+        # Dish prep times for every order in the pass, in one query
+        dish_ids = set()
+        for order in orders:
+            order['items'] = json.loads(order['items']) if order['items'] else []
+            dish_ids.update(item.get('dish_id') for item in order['items'])
+        dish_ids.discard(None)
+        prep_times = {}
+        if dish_ids:
+            prep_times = {row['id']: row['preparation_time'] for row in conn.execute(
+                f"SELECT id, preparation_time FROM dishes WHERE id IN ({','.join('?' * len(dish_ids))})",
+                list(dish_ids)
+            ).fetchall()}
+        return orders, prep_times
+
+    @staticmethod
+    def estimate(order: Dict, prep_times: Dict[int, int], now: datetime, utc_now: datetime) -> Dict:
+        """Ready and arrival estimate for one loaded order row"""
+        status = order['order_status']
+
+        # Dishes cook in parallel: the slowest one sets the prep time
+        prep = max((prep_times.get(item.get('dish_id')) or 0 for item in order['items']), default=0)
+        prep = prep or order['chef_prep'] or DEFAULT_PREP_MINUTES
+
+        if status in ('ready', 'picked_up', 'out_for_delivery'):
+            ready_in = 0.0
+        elif _parse(order['expected_ready_time']):
+            ready_in = max(0.0, (_parse(order['expected_ready_time']) - now).total_seconds() / 60)
+        else:
+            # order_placed_at is stored in local time
+            placed = _parse(order['order_placed_at']) or now
+            elapsed = max(0.0, (now - placed).total_seconds() / 60)
+            buffer = ACCEPT_BUFFER_MINUTES if status == 'pending' else 0.0
+            ready_in = max(0.0, buffer + prep - elapsed)
+
+        eta = {
+            'order_id': order['id'],
+            'order_status': status,
+            'ready_in_minutes': round(ready_in, 1),
+            'ready_at': (now + timedelta(minutes=ready_in)).isoformat(),
+            'arrival_in_minutes': None,
+            'arrival_at': None,
+            'source': 'prep'
+        }
+        if order['delivery_type'] != 'delivery':
+            return eta
+
+        speed = VEHICLE_SPEED_MPH.get((order['vehicle_type'] or '').lower(), DEFAULT_SPEED_MPH)
+        kitchen = (order['chef_lat'], order['chef_lon'])
+        drop = (order['drop_lat'], order['drop_lon'])
+        agent = (order['track_lat'], order['track_lon'])
+        source = 'tracking'
+        # delivery_tracking.updated_at is UTC
+        tracked_at = _parse(order['tracked_at'])
+        if tracked_at is None or (utc_now - tracked_at).total_seconds() > ETA_TRACKING_MAX_AGE_SECONDS:
+            agent = (None, None)
+        if agent[0] is None:
+            agent, source = (order['agent_lat'], order['agent_lon']), 'agent_profile'
+
+        to_drop = _travel_minutes(kitchen, drop, speed)
+        if status in ('picked_up', 'out_for_delivery'):
+            if agent[0] is None:
+                arrival, source = to_drop, 'estimate'
+            else:
+                arrival = _travel_minutes(agent, drop, speed)
+        elif order['delivery_agent_id'] is None or agent[0] is None:
+            # No agent position yet: assume one turns up while the food is cooking
+            arrival = None if to_drop is None else \
+                max(ready_in, ASSIGN_BUFFER_MINUTES) + STOP_SERVICE_MINUTES + to_drop
+            source = 'estimate'
+        else:
+            to_kitchen = _travel_minutes(agent, kitchen, speed)
+            arrival = None if None in (to_kitchen, to_drop) else \
+                max(to_kitchen, ready_in) + STOP_SERVICE_MINUTES + to_drop
+
+        if arrival is not None:
+            eta.update({
+                'arrival_in_minutes': round(arrival, 1),
+                'arrival_at': (now + timedelta(minutes=arrival)).isoformat(),
+                'source': source
+            })
+        return eta
+
+    def refresh(self, order_ids: Optional[Iterable[int]] = None) -> int:
+        """Recompute ETAs for the given orders (all active orders if None); returns entries cached"""
+        ids = None if order_ids is None else list({int(i) for i in order_ids})
+        if ids == []:
+            return 0
+
+        with DatabaseConnection.get_db() as conn:
+            orders, prep_times = self._load(conn, ids)
+
+        now, utc_now = datetime.now(), datetime.utcnow()
+        computed = {order['id']: {**self.estimate(order, prep_times, now, utc_now), 'computed_at': now}
+                    for order in orders}
+
+        with self._lock:
+            if ids is None:
+                self._cache = computed
+            else:
+                for order_id in ids:
+                    self._cache.pop(order_id, None)
+                self._cache.update(computed)
+        return len(computed)
+
+    def cached(self, order_id: int) -> Optional[Dict]:
+        """Last computed ETA for an order, without recomputing"""
+        with self._lock:
+            eta = self._cache.get(order_id)
+        return {k: v for k, v in eta.items() if k != 'computed_at'} if eta else None
+
+    def for_orders(self, orders: List[Dict]) -> Dict[int, Dict]:
+        """
+        Cached ETAs for order rows (need 'id' and 'order_status')
+        Missing, stale or status-changed entries are recomputed together
+        """
+        now = datetime.now()
+        max_age = timedelta(seconds=ETA_MAX_AGE_SECONDS)
+        with self._lock:
+            cached = {order['id']: self._cache.get(order['id']) for order in orders}
+        missing = [
+            order['id'] for order in orders
+            if order['order_status'] in ETA_STATUSES and (
+                cached[order['id']] is None
+                or cached[order['id']]['order_status'] != order['order_status']
+                or now - cached[order['id']]['computed_at'] > max_age
+            )
+        ]
+        if missing:
+            self.refresh(missing)
+            with self._lock:
+                cached.update({order_id: self._cache.get(order_id) for order_id in missing})
+
+        return {
+            order['id']: {k: v for k, v in cached[order['id']].items() if k != 'computed_at'}
+            for order in orders
+            if order['order_status'] in ETA_STATUSES and cached.get(order['id'])
+        }
+
+eta_service = EtaService()
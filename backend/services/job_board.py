@@ -0,0 +1,157 @@
+"""
+Delivery job board for Potluck
+Keeps an open_jobs index in step with order status so agents can
+query unassigned deliveries by pickup cell instead of scanning orders
+"""
+
+import math
+from typing import Dict, List
+
+from utils import geohash
+
+# Orders an agent may still claim
+OPEN_STATUSES = ('accepted', 'preparing', 'ready')
+
+# ~4.9km cells for the pickup index
+JOB_CELL_PRECISION = 5
+
+# Fallback search radius (km) when the agent has no delivery_radius set
+DEFAULT_AGENT_RADIUS_KM = 5
+
+
+def distance_miles(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Haversine distance in miles (the unit the delivery screens use)"""
+    lat1, lon1, lat2, lon2 = map(math.radians, [lat1, lon1, lat2, lon2])
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 3959 * 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
+
+
+class JobBoard:
+    """Maintain and query the open_jobs index"""
+
+    def sync_order(self, cursor, order_id: int):
+        """
+        Insert, update or drop an order's open_jobs row to match the order
+        Call inside the transaction that changes the order
+        """
+        cursor.execute("""
+            SELECT o.id, o.order_status, o.delivery_type, o.delivery_agent_id,
+                   o.expected_ready_time, o.order_placed_at,
+                   o.delivery_latitude, o.delivery_longitude,
+                   chef.latitude AS chef_lat, chef.longitude AS chef_lon,
+                   consumer.latitude AS consumer_lat, consumer.longitude AS consumer_lon,
+                   consumer.zip_code AS consumer_zip
+            FROM orders o
+            JOIN users chef ON o.chef_id = chef.id
+            JOIN users consumer ON o.consumer_id = consumer.id
+            WHERE o.id = ?
+        """, (order_id,))
+        order = cursor.fetchone()
+
+        if (not order or order['order_status'] not in OPEN_STATUSES
+                or order['delivery_type'] != 'delivery' or order['delivery_agent_id'] is not None):
+            cursor.execute("DELETE FROM open_jobs WHERE order_id = ?", (order_id,))
+            return
+
+        cursor.execute("""
+            INSERT OR REPLACE INTO open_jobs (
+                order_id, status, pickup_cell, pickup_latitude, pickup_longitude,
+                drop_latitude, drop_longitude, drop_zip, ready_at, placed_at
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, self._index_row(order))
+
+    def remove(self, cursor, order_id: int):
+        """Drop an order from the board (assigned, cancelled, delivered)"""
+        cursor.execute("DELETE FROM open_jobs WHERE order_id = ?", (order_id,))
+
+    @staticmethod
+    def _index_row(order) -> tuple:
+        pickup_cell = ''
+        if order['chef_lat'] is not None and order['chef_lon'] is not None:
+            pickup_cell = geohash.encode(order['chef_lat'], order['chef_lon'], JOB_CELL_PRECISION)
+        return (
+            order['id'], order['order_status'], pickup_cell,
+            order['chef_lat'], order['chef_lon'],
+            order['delivery_latitude'] if order['delivery_latitude'] is not None else order['consumer_lat'],
+            order['delivery_longitude'] if order['delivery_longitude'] is not None else order['consumer_lon'],
+            order['consumer_zip'], order['expected_ready_time'], order['order_placed_at']
+        )
+
+    def rebuild(self, conn) -> int:
+        """Reconcile the whole index with orders; returns the number of open jobs"""
+        # Read and replace under the write lock so an order change can't land in between and be lost
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            count = self._rebuild(conn.cursor())
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        return count
+
+    def _rebuild(self, cursor) -> int:
+        cursor.execute(f"""
+            SELECT o.id, o.order_status, o.expected_ready_time, o.order_placed_at,
+                   o.delivery_latitude, o.delivery_longitude,
+                   chef.latitude AS chef_lat, chef.longitude AS chef_lon,
+                   consumer.latitude AS consumer_lat, consumer.longitude AS consumer_lon,
+                   consumer.zip_code AS consumer_zip
+            FROM orders o
+            JOIN users chef ON o.chef_id = chef.id
+            JOIN users consumer ON o.consumer_id = consumer.id
+            WHERE o.order_status IN ({','.join('?' * len(OPEN_STATUSES))})
+              AND o.delivery_type = 'delivery'
+              AND o.delivery_agent_id IS NULL
+        """, OPEN_STATUSES)
+        rows = [self._index_row(order) for order in cursor.fetchall()]
+
+        cursor.execute("DELETE FROM open_jobs")
+        cursor.executemany("""
+            INSERT INTO open_jobs (
+                order_id, status, pickup_cell, pickup_latitude, pickup_longitude,
+                drop_latitude, drop_longitude, drop_zip, ready_at, placed_at
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, rows)
+        return len(rows)
+
+    def find_jobs(self, conn, latitude: float, longitude: float, radius_km: float,
+                  service_zips: List[str], statuses: tuple = OPEN_STATUSES,
+                  sort: str = 'oldest', limit: int = 20) -> List[Dict]:
+        """
+        Open jobs an agent can see: pickups in cells near the agent,
+        plus any job dropping into one of the agent's service zips.
+        sort='oldest' (placed first) or 'distance' (agent to pickup)
+        """
+        cells = geohash.cells_within(latitude, longitude, radius_km, JOB_CELL_PRECISION)
+        status_placeholders = ','.join('?' * len(statuses))
+        zip_placeholders = ','.join('?' * len(service_zips)) or 'NULL'
+
+        cursor = conn.execute(f"""
+            SELECT * FROM open_jobs
+            WHERE pickup_cell IN ({','.join('?' * len(cells))}) AND status IN ({status_placeholders})
+            UNION
+            SELECT * FROM open_jobs
+            WHERE drop_zip IN ({zip_placeholders}) AND status IN ({status_placeholders})
+        """, (*cells, *statuses, *service_zips, *statuses))
+
+        radius_miles = radius_km / 1.609
+        jobs = []
+        for row in cursor.fetchall():
+            job = dict(row)
+            if job['pickup_latitude'] is None or job['pickup_longitude'] is None:
+                continue
+            job['agent_distance'] = distance_miles(latitude, longitude,
+                                                   job['pickup_latitude'], job['pickup_longitude'])
+            # Cell matches are approximate; service-zip matches ignore the radius
+            if job['agent_distance'] > radius_miles and job['drop_zip'] not in service_zips:
+                continue
+            jobs.append(job)
+
+        if sort == 'distance':
+            jobs.sort(key=lambda j: j['agent_distance'])
+        else:
+            jobs.sort(key=lambda j: j['placed_at'] or '')
+        return jobs[:limit]
+
+
+job_board = JobBoard()
@@ -0,0 +1,302 @@
+"""
+Delivery agent location ingestion for Potluck
+Agents post batches of GPS points; points are buffered in memory per
+agent, thinned, and written to delivery_tracking in one executemany
+transaction per flush so SQLite sees a few writes per interval no
+matter how many agents are reporting
+"""
+
+import os
+import math
+import atexit
+import time
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from config.database import DatabaseConnection
+from events import publish as publish_event
+from services.eta_service import eta_service
+
+# Seconds between flushes (run on the background scheduler)
+LOCATION_FLUSH_INTERVAL = float(os.getenv('LOCATION_FLUSH_INTERVAL', '3'))
+
+# A point is kept only if the agent moved this far or this long passed since the last kept one
+MIN_POINT_DISTANCE_M = float(os.getenv('LOCATION_MIN_DISTANCE_M', '15'))
+MIN_POINT_INTERVAL_SECONDS = float(os.getenv('LOCATION_MIN_INTERVAL_SECONDS', '10'))
+
+# Bound memory if flushes fall behind; oldest points are dropped first
+MAX_BUFFERED_POINTS_PER_AGENT = int(os.getenv('LOCATION_MAX_BUFFERED_POINTS', '120'))
+MAX_POINTS_PER_REQUEST = 500
+
+# Points older than this (or from the future) are rejected at ingest
+MAX_POINT_AGE_SECONDS = 15 * 60
+
+# Retention: full resolution for a day, one point per order-minute after that, deleted after 30 days
+FULL_RESOLUTION_HOURS = int(os.getenv('LOCATION_FULL_RESOLUTION_HOURS', '24'))
+RETENTION_DAYS = int(os.getenv('LOCATION_RETENTION_DAYS', '30'))
+
+TRACKING_STATUSES = ('assigned', 'heading_to_pickup', 'at_pickup', 'heading_to_delivery',
+                     'near_delivery', 'delivered')
+
+# Orders whose tracking follows the agent
+ACTIVE_ORDER_STATUSES = ('accepted', 'preparing', 'ready', 'picked_up')
+
+# delivery_tracking.updated_at uses SQLite's CURRENT_TIMESTAMP format (UTC)
+TIMESTAMP_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+
+def _meters(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Equirectangular distance; plenty for points seconds apart"""
+    x = math.radians(lon2 - lon1) * math.cos(math.radians((lat1 + lat2) / 2))
+    y = math.radians(lat2 - lat1)
+    return 6371000 * math.hypot(x, y)
+
+
+def _parse_timestamp(value, now: float) -> Optional[float]:
+    """Epoch seconds/milliseconds or ISO string -> epoch seconds; missing means now"""
+    if value is None:
+        return now
+    if isinstance(value, (int, float)):
+        return value / 1000 if value > 1e11 else float(value)
+    try:
+        parsed = datetime.fromisoformat(str(value).replace('Z', '+00:00'))
+    except ValueError:
+        return None
+    return parsed.timestamp()
+
+
+def parse_points(data) -> Tuple[List[Dict], int]:
+    """
+    Validate a request body: {'points': [...]} or a single point
+    Returns (points sorted by time, number rejected)
+    """
+    raw = data.get('points') if isinstance(data, dict) and 'points' in data else [data]
+    if not isinstance(raw, list):
+        return [], 0
+
+    now = time.time()
+    points, rejected = [], 0
+    for item in raw[:MAX_POINTS_PER_REQUEST]:
+        try:
+            latitude, longitude = float(item['latitude']), float(item['longitude'])
+            timestamp = _parse_timestamp(item.get('timestamp'), now)
+            order_id = int(item['order_id']) if item.get('order_id') is not None else None
+        except (KeyError, TypeError, ValueError):
+            rejected += 1
+            continue
+        if (timestamp is None or not (-90 <= latitude <= 90 and -180 <= longitude <= 180)
+                or not (now - MAX_POINT_AGE_SECONDS <= timestamp <= now + 60)):
+            rejected += 1
+            continue
+
+        status = item.get('status')
+        points.append({
+            'latitude': latitude,
+            'longitude': longitude,
+            'timestamp': timestamp,
+            'order_id': order_id,
+            'status': status if status in TRACKING_STATUSES else None
+        })
+
+    rejected += max(0, len(raw) - MAX_POINTS_PER_REQUEST)
+    points.sort(key=lambda p: p['timestamp'])
+    return points, rejected
+
+
+def drop_foreign_orders(agent_id: int, points: List[Dict]) -> Tuple[List[Dict], int]:
+    """
+    Keep untagged points and points tagged with an order assigned to this agent
+    Returns (points kept, number dropped)
+    """
+    order_ids = {point['order_id'] for point in points if point['order_id'] is not None}
+    if not order_ids:
+        return points, 0
+
+    with DatabaseConnection.get_db() as conn:
+        own = {row['id'] for row in conn.execute(f"""
+            SELECT id FROM orders WHERE delivery_agent_id = ? AND id IN ({','.join('?' * len(order_ids))})
+        """, (agent_id, *order_ids)).fetchall()}
+
+    kept = [point for point in points if point['order_id'] is None or point['order_id'] in own]
+    return kept, len(points) - len(kept)
+
+
+class LocationBuffer:
+    """Per-process buffer of agent positions, drained by flush()"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending: Dict[int, List[Dict]] = {}
+        # Last point written per agent, so thinning carries across flushes
+        self._last_kept: Dict[int, Dict] = {}
+        self.stats = {'received': 0, 'kept': 0, 'written': 0, 'dropped': 0, 'flushes': 0}
+
+    def _keep(self, last: Optional[Dict], point: Dict) -> bool:
+        if last is None:
+            return True
+        if point['timestamp'] <= last['timestamp']:
+            return False
+        if point['status'] and point['status'] != last['status']:
+            return True
+        return (point['timestamp'] - last['timestamp'] >= MIN_POINT_INTERVAL_SECONDS or
+                _meters(last['latitude'], last['longitude'], point['latitude'], point['longitude'])
+                >= MIN_POINT_DISTANCE_M)
+
+    def add(self, agent_id: int, points: List[Dict]) -> int:
+        """Buffer an agent's points (sorted by time); returns how many were kept"""
+        kept = 0
+        with self._lock:
+            pending = self._pending.setdefault(agent_id, [])
+            last = pending[-1] if pending else self._last_kept.get(agent_id)
+            for point in points:
+                if self._keep(last, point):
+                    pending.append(point)
+                    last = point
+                    kept += 1
+
+            overflow = len(pending) - MAX_BUFFERED_POINTS_PER_AGENT
+            if overflow > 0:
+                del pending[:overflow]
+                self.stats['dropped'] += overflow
+
+            self.stats['received'] += len(points)
+            self.stats['kept'] += kept
+        return kept
+
+    def latest(self, agent_id: int) -> Optional[Dict]:
+        """Most recent known position for an agent (buffered or flushed)"""
+        with self._lock:
+            pending = self._pending.get(agent_id)
+            return pending[-1] if pending else self._last_kept.get(agent_id)
+
+    def pending(self) -> int:
+        """Points waiting for the next flush"""
+        with self._lock:
+            return sum(len(points) for points in self._pending.values())
+
+    def flush(self) -> int:
+        """Write everything buffered in one transaction; returns tracking rows written"""
+        with self._lock:
+            batch, self._pending = self._pending, {}
+        batch = {agent_id: points for agent_id, points in batch.items() if points}
+        if not batch:
+            return 0
+
+        try:
+            rows, moved = self._write(batch)
+        except Exception:
+            # Put the points back (newer arrivals stay after them) and retry next flush
+            with self._lock:
+                for agent_id, points in batch.items():
+                    merged = points + self._pending.get(agent_id, [])
+                    self._pending[agent_id] = merged[-MAX_BUFFERED_POINTS_PER_AGENT:]
+            raise
+
+        with self._lock:
+            for agent_id, points in batch.items():
+                self._last_kept[agent_id] = points[-1]
+            self.stats['written'] += rows
+            self.stats['flushes'] += 1
+
+        # Agents moved: recompute ETAs for their orders before pushing
+        eta_service.refresh(order_id for _, _, orders in moved for order_id in orders)
+        self._publish(moved)
+        return rows
+
+    def _write(self, batch: Dict[int, List[Dict]]):
+        agent_ids = list(batch)
+        with DatabaseConnection.get_db() as conn:
+            active = conn.execute(f"""
+                SELECT id, delivery_agent_id, consumer_id FROM orders
+                WHERE delivery_agent_id IN ({','.join('?' * len(agent_ids))})
+                  AND order_status IN ({','.join('?' * len(ACTIVE_ORDER_STATUSES))})
+            """, (*agent_ids, *ACTIVE_ORDER_STATUSES)).fetchall()
+
+            orders_by_agent: Dict[int, Dict[int, int]] = {}
+            for order in active:
+                orders_by_agent.setdefault(order['delivery_agent_id'], {})[order['id']] = order['consumer_id']
+
+            tracking_rows = []
+            positions = []
+            moved = []
+            for agent_id, points in batch.items():
+                orders = orders_by_agent.get(agent_id, {})
+                for point in points:
+                    stamp = datetime.utcfromtimestamp(point['timestamp']).strftime(TIMESTAMP_FORMAT)
+                    # A point tagged with one of the agent's orders tracks that order; untagged, all of them
+                    if point['order_id'] is None:
+                        targets = list(orders)
+                    elif point['order_id'] in orders:
+                        targets = [point['order_id']]
+                    else:
+                        targets = []  # That order is no longer active for this agent
+                    for order_id in targets:
+                        tracking_rows.append((order_id, agent_id, point['latitude'], point['longitude'],
+                                              point['status'], stamp))
+                last = points[-1]
+                positions.append((last['latitude'], last['longitude'], agent_id))
+                moved.append((agent_id, last, orders))
+
+            conn.executemany("""
+                INSERT INTO delivery_tracking
+                    (order_id, delivery_agent_id, current_latitude, current_longitude, status, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+            """, tracking_rows)
+
+            # Only the newest position per agent reaches users
+            conn.executemany("UPDATE users SET latitude = ?, longitude = ? WHERE id = ?", positions)
+            conn.commit()
+
+        return len(tracking_rows), moved
+
+    @staticmethod
+    def _publish(moved):
+        """Push each agent's newest position to the consumers waiting on their orders"""
+        for agent_id, point, orders in moved:
+            for order_id, consumer_id in orders.items():
+                publish_event('agent_location', {
+                    'order_id': order_id,
+                    'latitude': point['latitude'],
+                    'longitude': point['longitude'],
+                    'timestamp': point['timestamp'],
+                    'eta': eta_service.cached(order_id)
+                }, user_ids=(consumer_id,))
+
+
+def apply_retention(now: Optional[datetime] = None) -> Dict[str, int]:
+    """Thin old tracking rows to one per order-minute, then delete expired ones"""
+    now = now or datetime.utcnow()
+    thin_before = (now - timedelta(hours=FULL_RESOLUTION_HOURS)).strftime(TIMESTAMP_FORMAT)
+    delete_before = (now - timedelta(days=RETENTION_DAYS)).strftime(TIMESTAMP_FORMAT)
+
+    with DatabaseConnection.get_db() as conn:
+        deleted = conn.execute(
+            "DELETE FROM delivery_tracking WHERE updated_at < ?", (delete_before,)
+        ).rowcount
+        thinned = conn.execute("""
+            DELETE FROM delivery_tracking
+            WHERE updated_at < ?
+              AND id NOT IN (
+                  SELECT MAX(id) FROM delivery_tracking
+                  WHERE updated_at < ?
+                  GROUP BY order_id, delivery_agent_id, substr(updated_at, 1, 16)
+              )
+        """, (thin_before, thin_before)).rowcount
+        conn.commit()
+
+    return {'deleted': deleted, 'thinned': thinned}
+
+
+location_buffer = LocationBuffer()
+
+
+def _flush_at_exit():
+    """Don't lose the last few seconds of points on shutdown"""
+    try:
+        location_buffer.flush()
+    except Exception as e:
+        print(f"⚠️ Could not flush buffered locations: {e}")
+
+
+atexit.register(_flush_at_exit)
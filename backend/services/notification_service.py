@@ -0,0 +1,121 @@
+"""
+Notification outbox for Potluck
+Request handlers write one event row inside their own transaction;
+a background dispatcher expands events into per-recipient
+notifications with batched executemany writes
+"""
+
+import os
+import json
+from datetime import datetime
+from typing import Callable, Dict, List
+
+from config.database import DatabaseConnection
+from events import publish as publish_event
+from services.job_board import distance_miles
+from utils.location import LocationService
+
+# Events handled per dispatcher pass, and retries before an event is parked
+OUTBOX_BATCH_SIZE = int(os.getenv('NOTIFICATION_OUTBOX_BATCH_SIZE', '50'))
+OUTBOX_MAX_ATTEMPTS = 5
+
+# Agents within this many miles of the kitchen hear about a new job
+NEARBY_AGENT_MILES = 10
+
+
+def enqueue(cursor, event_type: str, payload: Dict):
+    """Record an event; call inside the transaction that caused it"""
+    cursor.execute(
+        "INSERT INTO notification_outbox (event_type, payload, status, created_at) VALUES (?, ?, 'pending', ?)",
+        (event_type, json.dumps(payload), datetime.now().isoformat())
+    )
+
+
+def _delivery_job_available(conn, payload: Dict) -> List[tuple]:
+    """One 'new job' notification per active agent near the kitchen"""
+    chef_lat, chef_lon = payload['chef_lat'], payload['chef_lon']
+    delivery_distance = distance_miles(chef_lat, chef_lon, payload['consumer_lat'], payload['consumer_lon'])
+
+    # Calculate base delivery fee (simple calculation)
+    estimated_earnings = round(3.99 + delivery_distance * 0.50, 2)
+
+    # Agents placed by their current position or by one of their service areas
+    agents = LocationService.agents_near(conn.cursor(), chef_lat, chef_lon, NEARBY_AGENT_MILES * 1.609)
+
+    now = datetime.now().isoformat()
+    rows = []
+    for agent in agents:
+        agent_distance = agent['distance_to_pickup'] / 1.609
+        message = (
+            f"🚗 New delivery job available!\n"
+            f"Order: {payload['order_number']}\n"
+            f"Chef: {payload['chef_name']} ({round(agent_distance, 1)} miles from you)\n"
+            f"Customer: {round(delivery_distance, 1)} miles from chef\n"
+            f"Ready in: ~{payload['eta_minutes']} minutes\n"
+            f"Estimated earnings: ${estimated_earnings}"
+        )
+        rows.append((agent['agent_id'], '🚗 New Delivery Job Available', message, 'delivery_job',
+                     payload['order_id'], now))
+    return rows
+
+
+# event_type -> handler(conn, payload) returning notification rows
+# (user_id, title, message, type, related_id, created_at)
+EVENT_HANDLERS: Dict[str, Callable] = {
+    'delivery_job_available': _delivery_job_available,
+}
+
+
+class NotificationDispatcher:
+    """Drain the outbox; each event commits its notifications and its own status together"""
+
+    def process_pending(self, limit: int = OUTBOX_BATCH_SIZE) -> int:
+        """Expand up to `limit` pending events; returns notifications written"""
+        written = 0
+        with DatabaseConnection.get_db() as conn:
+            events = conn.execute("""
+                SELECT id, event_type, payload, attempts FROM notification_outbox
+                WHERE status = 'pending'
+                ORDER BY id
+                LIMIT ?
+            """, (limit,)).fetchall()
+
+            for event in events:
+                try:
+                    # Claim under the write lock: another worker may have taken it since the SELECT
+                    conn.execute("BEGIN IMMEDIATE")
+                    claimed = conn.execute(
+                        "UPDATE notification_outbox SET status = 'done', processed_at = ? WHERE id = ? AND status = 'pending'",
+                        (datetime.now().isoformat(), event['id'])
+                    ).rowcount
+                    if not claimed:
+                        conn.rollback()
+                        continue
+
+                    handler = EVENT_HANDLERS[event['event_type']]
+                    rows = handler(conn, json.loads(event['payload']))
+                    conn.executemany("""
+                        INSERT INTO notifications (user_id, title, message, type, related_id, created_at)
+                        VALUES (?, ?, ?, ?, ?, ?)
+                    """, rows)
+                    conn.execute("UPDATE notification_outbox SET recipients = ? WHERE id = ?", (len(rows), event['id']))
+                    conn.commit()
+                    written += len(rows)
+
+                    for user_id, title, _, notification_type, related_id, _ in rows:
+                        publish_event('notification', {'title': title, 'type': notification_type,
+                                                       'related_id': related_id}, user_ids=(user_id,))
+                except Exception as e:
+                    conn.rollback()
+                    attempts = (event['attempts'] or 0) + 1
+                    conn.execute(
+                        "UPDATE notification_outbox SET attempts = ?, status = ?, error = ? WHERE id = ? AND status = 'pending'",
+                        (attempts, 'failed' if attempts >= OUTBOX_MAX_ATTEMPTS else 'pending', str(e), event['id'])
+                    )
+                    conn.commit()
+                    print(f"⚠️ Notification event {event['id']} failed: {e}")
+
+        return written
+
+
+notification_dispatcher = NotificationDispatcher()
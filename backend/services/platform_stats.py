@@ -0,0 +1,124 @@
+"""
+Platform-wide totals for Potluck
+platform_counters holds running totals that write paths bump inside
+their own transactions; a periodic full recount corrects any drift
+(seeders, manual edits, failed requests), so /api/stats is one small
+primary-key read
+"""
+
+import os
+from datetime import datetime, timedelta
+from typing import Dict
+
+# Seconds between full recounts
+PLATFORM_STATS_RECONCILE_INTERVAL = int(os.getenv('PLATFORM_STATS_RECONCILE_INTERVAL', '900'))
+
+# Per-day order counters kept after a recount
+DAILY_COUNTER_DAYS = 7
+
+USER_TYPES = ('consumer', 'chef', 'delivery')
+
+
+def _today() -> str:
+    """Orders are stamped with local time (datetime.now()), so days are local too"""
+    return datetime.now().strftime('%Y-%m-%d')
+
+
+class PlatformCounters:
+    """Incremental totals with a periodic reconcile"""
+
+    def bump(self, cursor, deltas: Dict[str, float]):
+        """
+        Add deltas to counters, e.g. bump(cursor, {'active_dishes': 1})
+        Call inside the transaction that makes the change
+        """
+        rows = [(name, delta) for name, delta in deltas.items() if delta]
+        if rows:
+            cursor.executemany("""
+                INSERT INTO platform_counters (name, value) VALUES (?, ?)
+                ON CONFLICT(name) DO UPDATE SET value = value + excluded.value, updated_at = CURRENT_TIMESTAMP
+            """, rows)
+
+    def user_created(self, cursor, user_type: str):
+        self.bump(cursor, {f'users:{user_type}': 1})
+
+    def order_placed(self, cursor, total_amount: float):
+        self.bump(cursor, {'orders': 1, f'orders:{_today()}': 1, 'gmv': total_amount or 0})
+
+    def order_status_changed(self, cursor, old_status: str, new_status: str, total_amount: float):
+        """Cancelled orders don't count towards GMV"""
+        if old_status != 'cancelled' and new_status == 'cancelled':
+            self.bump(cursor, {'gmv': -(total_amount or 0)})
+        elif old_status == 'cancelled' and new_status != 'cancelled':
+            self.bump(cursor, {'gmv': total_amount or 0})
+
+    def recount(self, conn) -> Dict[str, float]:
+        """Replace every counter with a full recount; returns how far each had drifted"""
+        today = _today()
+        oldest_day = (datetime.now() - timedelta(days=DAILY_COUNTER_DAYS - 1)).strftime('%Y-%m-%d')
+
+        # Recount and rewrite under one write lock so no bump lands in between
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            actual = {f'users:{user_type}': 0 for user_type in USER_TYPES}
+            for row in conn.execute("SELECT user_type, COUNT(*) AS count FROM users GROUP BY user_type"):
+                actual[f"users:{row['user_type']}"] = row['count']
+
+            actual['active_dishes'] = conn.execute(
+                "SELECT COUNT(*) AS count FROM dishes WHERE is_available = 1"
+            ).fetchone()['count']
+
+            totals = conn.execute("""
+                SELECT COUNT(*) AS orders,
+                       COALESCE(SUM(CASE WHEN order_status != 'cancelled' THEN total_amount END), 0) AS gmv
+                FROM orders
+            """).fetchone()
+            actual['orders'] = totals['orders']
+            actual['gmv'] = round(totals['gmv'], 2)
+
+            actual[f'orders:{today}'] = 0
+            for row in conn.execute("""
+                SELECT substr(order_placed_at, 1, 10) AS day, COUNT(*) AS count
+                FROM orders WHERE order_placed_at >= ?
+                GROUP BY day
+            """, (oldest_day,)):
+                if row['day'] <= today:
+                    actual[f"orders:{row['day']}"] = row['count']
+
+            current = {row['name']: row['value'] for row in conn.execute("SELECT name, value FROM platform_counters")}
+            conn.execute("DELETE FROM platform_counters")
+            conn.executemany(
+                "INSERT INTO platform_counters (name, value) VALUES (?, ?)", list(actual.items())
+            )
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+
+        if not current:
+            return {}  # First fill, nothing to drift from
+        return {
+            name: round(value - current.get(name, 0), 2)
+            for name, value in actual.items() if round(value - current.get(name, 0), 2)
+        }
+
+    def snapshot(self, conn) -> Dict:
+        """Totals for /api/stats; recounts first if the table has never been filled"""
+        counters = {row['name']: row['value'] for row in conn.execute("SELECT name, value FROM platform_counters")}
+        if 'orders' not in counters:
+            self.recount(conn)
+            return self.snapshot(conn)
+
+        users = {user_type: int(counters.get(f'users:{user_type}', 0)) for user_type in USER_TYPES}
+        updated_at = conn.execute("SELECT MAX(updated_at) AS updated_at FROM platform_counters").fetchone()
+        return {
+            'users': {'total': sum(users.values()), **users},
+            'active_dishes': int(counters.get('active_dishes', 0)),
+            'total_orders': int(counters.get('orders', 0)),
+            'orders_today': int(counters.get(f'orders:{_today()}', 0)),
+            'gmv': round(counters.get('gmv', 0), 2),
+            'updated_at': updated_at['updated_at']
+        }
+
+
+platform_counters = PlatformCounters()
@@ -0,0 +1,201 @@
+"""
+Multi-stop route planning for Potluck delivery agents
+Groups compatible orders into batches and orders each batch's stops
+with nearest-neighbor + 2-opt, keeping pickup before drop-off and
+never collecting food before it is ready
+"""
+
+import os
+import math
+from typing import Dict, List, Optional, Tuple
+
+from services.job_board import distance_miles
+from services.dispatch_service import VEHICLE_SPEED_MPH, DEFAULT_SPEED_MPH
+
+# Pickups this close (miles) count as one kitchen cluster
+PICKUP_CLUSTER_MILES = float(os.getenv('ROUTE_PICKUP_CLUSTER_MILES', '0.6'))
+
+# Drop-offs batch together when this close, or heading the same way
+DROP_CORRIDOR_MILES = float(os.getenv('ROUTE_DROP_CORRIDOR_MILES', '1.5'))
+DROP_CORRIDOR_DEGREES = float(os.getenv('ROUTE_DROP_CORRIDOR_DEGREES', '40'))
+
+MAX_BATCH_SIZE = int(os.getenv('ROUTE_MAX_BATCH_SIZE', '3'))
+
+# Minutes spent at each stop (handover, parking)
+STOP_SERVICE_MINUTES = 2.0
+
+# Order statuses where the food is already on board (no pickup stop)
+CARRIED_STATUSES = ('picked_up', 'out_for_delivery')
+
+
+def _bearing(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    lat1, lon1, lat2, lon2 = map(math.radians, [lat1, lon1, lat2, lon2])
+    y = math.sin(lon2 - lon1) * math.cos(lat2)
+    x = math.cos(lat1) * math.sin(lat2) - math.sin(lat1) * math.cos(lat2) * math.cos(lon2 - lon1)
+    return math.degrees(math.atan2(y, x)) % 360
+
+
+def compatible(a: Dict, b: Dict) -> bool:
+    """Whether two orders can share a trip"""
+    same_kitchen = a['chef_id'] == b['chef_id'] or distance_miles(*a['pickup'], *b['pickup']) <= PICKUP_CLUSTER_MILES
+    if not same_kitchen:
+        return False
+
+    if distance_miles(*a['drop'], *b['drop']) <= DROP_CORRIDOR_MILES:
+        return True
+    heading_gap = abs(_bearing(*a['pickup'], *a['drop']) - _bearing(*b['pickup'], *b['drop']))
+    return min(heading_gap, 360 - heading_gap) <= DROP_CORRIDOR_DEGREES
+
+
+def group_orders(orders: List[Dict]) -> List[List[Dict]]:
+    """
+    Greedy batching: orders already on board ride together,
+    the rest join the first compatible batch with room
+    """
+    carried = [order for order in orders if order.get('picked_up')]
+    batches = [carried] if carried else []
+
+    pending = sorted((o for o in orders if not o.get('picked_up')), key=lambda o: o.get('ready_in', 0))
+    for order in pending:
+        for batch in batches:
+            if batch is carried:
+                continue
+            if len(batch) < MAX_BATCH_SIZE and all(compatible(order, other) for other in batch):
+                batch.append(order)
+                break
+        else:
+            batches.append([order])
+    return batches
+
+
+class RoutePlanner:
+    """Sequence stops for one agent"""
+
+    def __init__(self, speed_mph: float = DEFAULT_SPEED_MPH):
+        self.speed_mph = speed_mph
+
+    @classmethod
+    def for_vehicle(cls, vehicle_type: Optional[str]) -> 'RoutePlanner':
+        return cls(VEHICLE_SPEED_MPH.get((vehicle_type or '').lower(), DEFAULT_SPEED_MPH))
+
+    def _travel(self, a: Tuple[float, float], b: Tuple[float, float]) -> float:
+        return distance_miles(a[0], a[1], b[0], b[1]) / self.speed_mph * 60
+
+    @staticmethod
+    def _stops(batch: List[Dict]) -> List[Dict]:
+        stops = []
+        for order in batch:
+            if not order.get('picked_up'):
+                stops.append({'type': 'pickup', 'order_id': order['id'], 'point': order['pickup'],
+                              'ready_in': order.get('ready_in', 0.0)})
+            stops.append({'type': 'drop', 'order_id': order['id'], 'point': order['drop']})
+        return stops
+
+    def simulate(self, start: Tuple[float, float], sequence: List[Dict], start_minutes: float = 0.0):
+        """
+        Walk a stop sequence; returns (cost, timeline, finish_minutes), with
+        cost inf if a drop comes before its pickup. Cost = finish time + sum of drop times,
+        so food isn't left riding around.
+        """
+        clock = start_minutes
+        position = start
+        collected = {stop['order_id'] for stop in sequence if stop['type'] == 'drop'} - \
+                    {stop['order_id'] for stop in sequence if stop['type'] == 'pickup'}
+        timeline = []
+        drop_total = 0.0
+
+        for stop in sequence:
+            if stop['type'] == 'drop' and stop['order_id'] not in collected:
+                return float('inf'), None, None
+            clock += self._travel(position, stop['point'])
+            wait = 0.0
+            if stop['type'] == 'pickup':
+                wait = max(0.0, stop['ready_in'] - clock)
+                collected.add(stop['order_id'])
+            clock += wait
+            timeline.append({**stop, 'arrive_minutes': round(clock - wait, 1), 'wait_minutes': round(wait, 1)})
+            clock += STOP_SERVICE_MINUTES
+            if stop['type'] == 'drop':
+                drop_total += clock
+            position = stop['point']
+
+        return clock + drop_total, timeline, clock
+
+    def _nearest_neighbor(self, start, stops, start_minutes) -> List[Dict]:
+        remaining = list(stops)
+        sequence = []
+        position, clock = start, start_minutes
+        picked = {stop['order_id'] for stop in stops if stop['type'] == 'drop'} - \
+                 {stop['order_id'] for stop in stops if stop['type'] == 'pickup'}
+
+        while remaining:
+            feasible = [s for s in remaining if s['type'] == 'pickup' or s['order_id'] in picked]
+
+            # Soonest available stop, counting time spent waiting for food
+            def available_at(stop):
+                arrive = clock + self._travel(position, stop['point'])
+                return max(arrive, stop.get('ready_in', 0.0)) if stop['type'] == 'pickup' else arrive
+
+            stop = min(feasible, key=available_at)
+            clock = available_at(stop) + STOP_SERVICE_MINUTES
+            position = stop['point']
+            if stop['type'] == 'pickup':
+                picked.add(stop['order_id'])
+            sequence.append(stop)
+            remaining.remove(stop)
+        return sequence
+
+    def plan_batch(self, start: Tuple[float, float], batch: List[Dict], start_minutes: float = 0.0):
+        """Best stop order for one batch; returns (cost, timeline, finish_minutes)"""
+        sequence = self._nearest_neighbor(start, self._stops(batch), start_minutes)
+        best_cost, _, _ = self.simulate(start, sequence, start_minutes)
+
+        # 2-opt: reverse segments while that keeps precedence and lowers cost
+        improved = True
+        while improved:
+            improved = False
+            for i in range(len(sequence) - 1):
+                for j in range(i + 1, len(sequence)):
+                    candidate = sequence[:i] + sequence[i:j + 1][::-1] + sequence[j + 1:]
+                    cost, _, _ = self.simulate(start, candidate, start_minutes)
+                    if cost < best_cost - 1e-9:
+                        sequence, best_cost, improved = candidate, cost, True
+
+        return self.simulate(start, sequence, start_minutes)
+
+    def plan(self, start: Tuple[float, float], orders: List[Dict]) -> Dict:
+        """
+        Batches run back to back from the agent's position
+        orders: [{id, chef_id, pickup: (lat, lon), drop: (lat, lon), ready_in, picked_up}]
+        """
+        batches = []
+        position, clock = start, 0.0
+        for batch in group_orders(orders):
+            _, timeline, finish = self.plan_batch(position, batch, clock)
+            batches.append({
+                'order_ids': [order['id'] for order in batch],
+                'stops': [{
+                    'type': stop['type'],
+                    'order_id': stop['order_id'],
+                    'latitude': stop['point'][0],
+                    'longitude': stop['point'][1],
+                    'arrive_minutes': stop['arrive_minutes'],
+                    'wait_minutes': stop['wait_minutes']
+                } for stop in timeline],
+                'finish_minutes': round(finish, 1)
+            })
+            if timeline:
+                position = timeline[-1]['point']
+            clock = finish
+
+        # Same orders one at a time, for comparison
+        unbatched_position, unbatched_clock = start, 0.0
+        for order in sorted(orders, key=lambda o: o.get('ready_in', 0)):
+            _, _, unbatched_clock = self.plan_batch(unbatched_position, [order], unbatched_clock)
+            unbatched_position = order['drop']
+
+        return {
+            'batches': batches,
+            'total_minutes': round(clock, 1),
+            'unbatched_minutes': round(unbatched_clock, 1)
+        }
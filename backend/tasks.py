@@ -1 +1,294 @@
-# Background tasks 
+"""
+Background and batch tasks for Potluck
+Run a batch job from the backend directory:
+
+    python tasks.py train-price-model
+    python tasks.py market-stats
+    python tasks.py coverage
+    python tasks.py open-jobs
+    python tasks.py dispatch
+    python tasks.py notifications
+    python tasks.py location-retention
+    python tasks.py platform-stats
+
+Periodic jobs run on the in-process scheduler started by app.py. Every
+worker runs the scheduler thread, but jobs that touch shared state run
+only in the worker holding SCHEDULER_LOCK_PATH; if it dies another
+worker takes the lock over. Per-process jobs (location-flush, and
+eta-refresh, which fills each worker's own ETA cache) run everywhere.
+Jobs on different scheduler threads never wait for each other, so the
+notification outbox keeps draining while the full-table rebuilds run.
+"""
+
+import os
+import sys
+import time
+import threading
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from config.database import DatabaseConnection, DB_PATH
+from services.dispatch_service import DISPATCH_ENABLED, DISPATCH_INTERVAL_SECONDS
+from services.eta_service import ETA_REFRESH_INTERVAL
+from services.location_service import LOCATION_FLUSH_INTERVAL
+from services.platform_stats import PLATFORM_STATS_RECONCILE_INTERVAL
+
+# Whichever process holds this lock runs the shared jobs (one per database)
+SCHEDULER_LOCK_PATH = os.getenv('SCHEDULER_LOCK_PATH') or f"{DB_PATH}.scheduler.lock"
+
+
+class BackgroundScheduler:
+    """Minimal interval scheduler; each named thread runs its own jobs on a daemon thread"""
+
+    def __init__(self, tick_seconds: float = 1.0, lock_path: str = SCHEDULER_LOCK_PATH):
+        self.tick_seconds = tick_seconds
+        self.lock_path = lock_path
+        self.jobs = {}
+        self.heartbeats = {}
+        self._lock = threading.Lock()
+        self._lead_lock = threading.Lock()
+        self._threads = {}
+        self._pid = None
+        self._leader_file = None
+        self._leader_file_pid = None
+        self._leader_pid = None
+
+    def add_job(self, name: str, interval_seconds: float, func, run_at_start: bool = False,
+                per_process: bool = False, thread: str = 'main'):
+        """
+        Register a function to run every interval_seconds
+        per_process: run in every worker, not just the leader
+        thread: scheduler thread it runs on; a slow job only delays jobs on its own thread
+        """
+        with self._lock:
+            self.jobs[name] = {
+                'func': func,
+                'interval': interval_seconds,
+                'next_run': time.time() + (0 if run_at_start else interval_seconds),
+                'per_process': per_process,
+                'thread': thread
+            }
+
+    def is_leader(self) -> bool:
+        """Whether this process runs the shared jobs"""
+        return self._leader_pid == os.getpid()
+
+    def _try_lead(self) -> bool:
+        """Hold (or try to take) the lock that makes this process run the shared jobs"""
+        if self.is_leader():
+            return True
+        try:
+            import fcntl
+        except ImportError:
+            self._leader_pid = os.getpid()  # No flock (Windows): the dev server is a single process anyway
+            return True
+
+        # Every scheduler thread asks; only one at a time may open and lock the file
+        with self._lead_lock:
+            if self.is_leader():
+                return True
+            # A lock inherited across fork belongs to the parent; open our own file
+            if self._leader_file_pid != os.getpid():
+                self._leader_file = open(self.lock_path, 'a')
+                self._leader_file_pid = os.getpid()
+            try:
+                fcntl.flock(self._leader_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                return False
+            self._leader_pid = os.getpid()
+        print(f"✅ Process {self._leader_pid} now runs the shared background jobs")
+        return True
+
+    def active_jobs(self) -> dict:
+        """Jobs this process runs right now"""
+        leader = self.is_leader()
+        return {name: job for name, job in list(self.jobs.items()) if leader or job['per_process']}
+
+    def start(self):
+        """Start one thread per job thread name (once per process; restarts any that died)"""
+        with self._lock:
+            if self._pid != os.getpid():
+                self._threads = {}  # Threads don't survive fork
+            self._pid = os.getpid()
+            for name in sorted({job['thread'] for job in self.jobs.values()} or {'main'}):
+                if name in self._threads and self._threads[name].is_alive():
+                    continue
+                self._threads[name] = threading.Thread(
+                    target=self._run, args=(name,), name=f"potluck-scheduler-{name}", daemon=True
+                )
+                self._threads[name].start()
+
+    def running(self) -> bool:
+        """Whether every scheduler thread is alive in this process"""
+        return self.started() and all(thread.is_alive() for thread in self._threads.values())
+
+    def started(self) -> bool:
+        """Whether start() ran in this process (threads may have died since)"""
+        return bool(self._threads and self._pid == os.getpid())
+
+    def run_job(self, name: str):
+        """Run a job now and record its heartbeat"""
+        job = self.jobs[name]
+        started = time.time()
+        error = None
+        try:
+            job['func']()
+        except Exception as e:
+            error = str(e)
+            print(f"⚠️ Background job {name} failed: {e}")
+        self.heartbeats[name] = {
+            'last_run': started,
+            'duration_ms': round((time.time() - started) * 1000, 1),
+            'error': error
+        }
+
+    def _run(self, thread: str):
+        while True:
+            leader = self._try_lead()
+            now = time.time()
+            for name, job in list(self.jobs.items()):
+                if job['thread'] != thread or not (leader or job['per_process']):
+                    continue
+                if now >= job['next_run']:
+                    job['next_run'] = now + job['interval']
+                    self.run_job(name)
+            time.sleep(self.tick_seconds)
+
+
+scheduler = BackgroundScheduler()
+
+
+def train_price_model():
+    """Fit the offline price model from dishes and orders and write it to disk"""
+    from utils.price_model import train_and_save, MODEL_PATH
+
+    with DatabaseConnection.get_db() as conn:
+        model = train_and_save(conn)
+
+    print(f"✅ Trained price model with {len(model.markets)} markets -> {MODEL_PATH}")
+    return model
+
+
+def refresh_market_stats():
+    """Recompute market_stats for every active (city, cuisine) pair"""
+    from utils.market_stats import compute_market_stats
+
+    count = compute_market_stats()
+    print(f"✅ Refreshed market stats for {count} markets")
+    return count
+
+
+def rebuild_coverage():
+    """Rebuild the chef coverage map from every available chef"""
+    from utils.coverage import rebuild_coverage as rebuild
+
+    count = rebuild()
+    print(f"✅ Rebuilt coverage map with {count} covered cells")
+    return count
+
+
+def rebuild_open_jobs():
+    """Reconcile the delivery job board with current orders"""
+    from services.job_board import job_board
+
+    with DatabaseConnection.get_db() as conn:
+        count = job_board.rebuild(conn)
+    print(f"✅ Rebuilt job board with {count} open jobs")
+    return count
+
+
+def run_dispatch():
+    """Run one dispatch round (offers open jobs to online agents)"""
+    from services.dispatch_service import dispatch_service
+
+    count = dispatch_service.run_round()
+    if count:
+        print(f"✅ Dispatched {count} delivery offers")
+    return count
+
+
+def drain_notification_outbox():
+    """Expand pending notification events into per-recipient notifications"""
+    from services.notification_service import notification_dispatcher
+
+    count = notification_dispatcher.process_pending()
+    if count:
+        print(f"✅ Delivered {count} notifications from the outbox")
+    return count
+
+
+def flush_locations():
+    """Write buffered agent GPS points to delivery_tracking"""
+    from services.location_service import location_buffer
+
+    return location_buffer.flush()
+
+
+def apply_location_retention():
+    """Thin and expire old delivery_tracking rows"""
+    from services.location_service import apply_retention
+
+    result = apply_retention()
+    print(f"✅ Location retention: thinned {result['thinned']}, deleted {result['deleted']} tracking rows")
+    return result
+
+
+def refresh_etas():
+    """Recompute cached ETAs for every in-flight order"""
+    from services.eta_service import eta_service
+
+    return eta_service.refresh()
+
+
+def reconcile_platform_stats():
+    """Recount the platform totals behind /api/stats and report any drift"""
+    from services.platform_stats import platform_counters
+
+    with DatabaseConnection.get_db() as conn:
+        drift = platform_counters.recount(conn)
+    if drift:
+        print(f"⚠️ Platform stats drifted: {drift}")
+    return drift
+
+
+# Batch jobs runnable from the command line
+BATCH_JOBS = {
+    'train-price-model': train_price_model,
+    'market-stats': refresh_market_stats,
+    'coverage': rebuild_coverage,
+    'open-jobs': rebuild_open_jobs,
+    'dispatch': run_dispatch,
+    'notifications': drain_notification_outbox,
+    'location-retention': apply_location_retention,
+    'platform-stats': reconcile_platform_stats,
+}
+
+# Periodic jobs (seconds between runs)
+MARKET_STATS_INTERVAL = int(os.getenv('MARKET_STATS_INTERVAL', '3600'))
+COVERAGE_REBUILD_INTERVAL = int(os.getenv('COVERAGE_REBUILD_INTERVAL', '3600'))
+OPEN_JOBS_RECONCILE_INTERVAL = int(os.getenv('OPEN_JOBS_RECONCILE_INTERVAL', '900'))
+NOTIFICATION_OUTBOX_INTERVAL = float(os.getenv('NOTIFICATION_OUTBOX_INTERVAL', '2'))
+LOCATION_RETENTION_INTERVAL = int(os.getenv('LOCATION_RETENTION_INTERVAL', '3600'))
+
+scheduler.add_job('market-stats', MARKET_STATS_INTERVAL, refresh_market_stats, run_at_start=True)
+scheduler.add_job('coverage', COVERAGE_REBUILD_INTERVAL, rebuild_coverage, run_at_start=True)
+scheduler.add_job('open-jobs', OPEN_JOBS_RECONCILE_INTERVAL, rebuild_open_jobs, run_at_start=True)
+# Its own thread: a market-stats or coverage rebuild must not hold up notifications
+scheduler.add_job('notifications', NOTIFICATION_OUTBOX_INTERVAL, drain_notification_outbox, run_at_start=True,
+                  thread='notifications')
+scheduler.add_job('location-retention', LOCATION_RETENTION_INTERVAL, apply_location_retention)
+scheduler.add_job('platform-stats', PLATFORM_STATS_RECONCILE_INTERVAL, reconcile_platform_stats, run_at_start=True)
+if DISPATCH_ENABLED:
+    scheduler.add_job('dispatch', DISPATCH_INTERVAL_SECONDS, run_dispatch)
+scheduler.add_job('location-flush', LOCATION_FLUSH_INTERVAL, flush_locations, per_process=True)
+# The ETA cache lives in each worker, so every worker refreshes its own
+scheduler.add_job('eta-refresh', ETA_REFRESH_INTERVAL, refresh_etas, run_at_start=True, per_process=True)
+
+
+if __name__ == '__main__':
+    if len(sys.argv) < 2 or sys.argv[1] not in BATCH_JOBS:
+        print(f"Usage: python tasks.py [{'|'.join(BATCH_JOBS)}]")
+        sys.exit(1)
+
+    DatabaseConnection.ensure_schema()
+    BATCH_JOBS[sys.argv[1]]()
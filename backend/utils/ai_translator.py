@@ -3,31 +3,25 @@ AI-Powered Real-time Translation Service
 Uses Anthropic Claude for high-quality translations
 """
 
-import anthropic
 import json
 from typing import Dict, Optional
-from dotenv import load_dotenv
 import os
 
-load_dotenv()
+from utils.llm_client import llm_client
+from utils.cache import TTLCache
+
+# UI strings repeat endlessly across users; keep their translations for a day
+translation_cache = TTLCache('translation', maxsize=int(os.getenv('TRANSLATION_CACHE_SIZE', '5000')), ttl=24 * 3600)
 
 class AITranslator:
     """AI-powered translation service using Anthropic Claude"""
     
     def __init__(self):
-        self.api_key = os.getenv('ANTHROPIC_API_KEY')
-        self.has_api_key = bool(self.api_key)
-        self.client = None
+        self.has_api_key = llm_client.available
+        self.client = llm_client if self.has_api_key else None
         
         if self.has_api_key:
-            try:
-                # Initialize Anthropic client
-                self.client = anthropic.Anthropic(api_key=self.api_key)
-                print("AI Translator initialized successfully")
-            except Exception as e:
-                print(f"Failed to initialize AI Translator: {e}")
-                self.has_api_key = False
-                self.client = None
+            print("AI Translator initialized successfully")
         else:
             print("No Anthropic API key found, using simple translation fallback")
     
@@ -36,6 +30,11 @@ class AITranslator:
         if not self.has_api_key or not self.client:
             return self._fallback_translation(text, target_language)
         
+        cache_key = (source_language, target_language, text)
+        cached = translation_cache.get(cache_key)
+        if cached is not None:
+            return cached
+        
         try:
             # Language code mapping
             language_codes = {
@@ -74,6 +73,7 @@ class AITranslator:
             )
             
             translated_text = response.content[0].text.strip()
+            translation_cache.set(cache_key, translated_text)
             return translated_text
             
         except Exception as e:
@@ -85,6 +85,16 @@ class AITranslator:
         if not self.has_api_key or not self.client:
             return {text: self._fallback_translation(text, target_language) for text in texts}
         
+        # Only texts we haven't translated before go to the LLM
+        cached = {}
+        for text in texts:
+            translation = translation_cache.get((source_language, target_language, text))
+            if translation is not None:
+                cached[text] = translation
+        texts = [text for text in texts if text not in cached]
+        if not texts:
+            return cached
+        
         try:
             language_codes = {
                 'en': 'English', 'es': 'Spanish', 'hi': 'Hindi', 'te': 'Telugu',
@@ -119,11 +129,13 @@ class AITranslator:
             )
             
             result = json.loads(response.content[0].text.strip())
-            return result
+            for text, translation in result.items():
+                translation_cache.set((source_language, target_language, text), translation)
+            return {**cached, **result}
             
         except Exception as e:
             print(f"Batch AI translation failed: {e}")
-            return {text: self._fallback_translation(text, target_language) for text in texts}
+            return {**cached, **{text: self._fallback_translation(text, target_language) for text in texts}}
     
     def _fallback_translation(self, text: str, target_language: str) -> str:
         """Simple fallback translation using basic language mappings"""
@@ -0,0 +1,73 @@
+"""
+In-process caches for Potluck
+Bounded LRU with per-entry TTL, safe to share between request threads
+"""
+
+import time
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Hashable
+
+# Every named cache, for stats/metrics endpoints
+cache_registry: Dict[str, 'TTLCache'] = {}
+
+
+class TTLCache:
+    """Least-recently-used cache whose entries also expire after a TTL"""
+
+    def __init__(self, name: str, maxsize: int = 1024, ttl: float = 3600):
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        cache_registry[name] = self
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Cached value, or default when missing or expired"""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+
+            value, expires_at = entry
+            if expires_at < time.monotonic():
+                del self._data[key]
+                self.misses += 1
+                return default
+
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any, ttl: float = None):
+        """Store a value; ttl overrides the cache default for this entry"""
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> Dict:
+        lookups = self.hits + self.misses
+        return {
+            'size': len(self._data),
+            'maxsize': self.maxsize,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_ratio': round(self.hits / lookups, 3) if lookups else 0.0
+        }
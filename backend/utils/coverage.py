@@ -0,0 +1,175 @@
+"""
+Chef coverage map for Potluck
+Precomputed geohash cell -> chef count and nearest chef ids,
+so location validation is a single key lookup
+"""
+
+import os
+import json
+import threading
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from config.database import DatabaseConnection
+from utils import geohash
+from utils.location import LocationService
+
+# ~4.9km cells; a cell is covered when a chef is within COVERAGE_RADIUS_KM of its center
+COVERAGE_PRECISION = int(os.getenv('COVERAGE_PRECISION', '5'))
+COVERAGE_RADIUS_KM = float(os.getenv('COVERAGE_RADIUS_KM', '10'))
+NEAREST_CHEFS_PER_CELL = 5
+
+_CHEF_FILTER = "user_type = 'chef' AND is_active = 1 AND is_available = 1 AND latitude IS NOT NULL"
+
+# Cell half-diagonal, so chefs near a cell edge still reach its center
+_CELL_SLACK_KM = sum(geohash.CELL_SIZE_KM.get(COVERAGE_PRECISION, (5.0, 5.0))) / 2
+
+
+def _cells_for(latitude: float, longitude: float) -> List[str]:
+    """Cells whose center may be within the coverage radius of a point"""
+    return geohash.cells_within(latitude, longitude, COVERAGE_RADIUS_KM + _CELL_SLACK_KM, COVERAGE_PRECISION)
+
+
+def _cell_row(cell: str, chefs: List[Tuple[float, int]], now: str) -> tuple:
+    chefs.sort()
+    nearest = chefs[:NEAREST_CHEFS_PER_CELL]
+    return (cell, len(chefs), json.dumps([chef_id for _, chef_id in nearest]), round(nearest[0][0], 2), now)
+
+
+def _write_cells(conn, cells: Iterable[str], rows: List[tuple]):
+    """Replace the given cells with rows (cells without a row are uncovered)"""
+    cursor = conn.cursor()
+    cursor.executemany("DELETE FROM coverage_cells WHERE cell = ?", [(cell,) for cell in cells])
+    cursor.executemany("""
+        INSERT INTO coverage_cells (cell, chef_count, nearest_chef_ids, nearest_distance_km, updated_at)
+        VALUES (?, ?, ?, ?, ?)
+    """, rows)
+    conn.commit()
+
+
+def rebuild_coverage() -> int:
+    """Recompute every covered cell from scratch; returns the number of cells"""
+    with DatabaseConnection.get_db() as conn:
+        chefs = conn.execute(f"SELECT id, latitude, longitude FROM users WHERE {_CHEF_FILTER}").fetchall()
+
+        covered = defaultdict(list)
+        for chef in chefs:
+            for cell in _cells_for(chef['latitude'], chef['longitude']):
+                center_lat, center_lon = geohash.decode(cell)
+                distance = LocationService.calculate_distance(
+                    center_lat, center_lon, chef['latitude'], chef['longitude']
+                )
+                if distance <= COVERAGE_RADIUS_KM:
+                    covered[cell].append((distance, chef['id']))
+
+        now = datetime.utcnow().isoformat()
+        rows = [_cell_row(cell, cell_chefs, now) for cell, cell_chefs in covered.items()]
+        conn.execute("DELETE FROM coverage_cells")
+        _write_cells(conn, [], rows)
+    return len(rows)
+
+
+def refresh_cells(cells: Iterable[str]) -> int:
+    """Recompute a set of cells from the chefs around each; returns cells covered"""
+    cells = set(cells)
+    now = datetime.utcnow().isoformat()
+    rows = []
+    with DatabaseConnection.get_db() as conn:
+        cursor = conn.cursor()
+        for cell in cells:
+            center_lat, center_lon = geohash.decode(cell)
+            min_lat, max_lat, min_lon, max_lon = LocationService.bounding_box(
+                center_lat, center_lon, COVERAGE_RADIUS_KM
+            )
+            cursor.execute(f"""
+                SELECT id, latitude, longitude FROM users
+                WHERE {_CHEF_FILTER}
+                  AND latitude BETWEEN ? AND ? AND longitude BETWEEN ? AND ?
+            """, (min_lat, max_lat, min_lon, max_lon))
+
+            chefs = []
+            for chef in cursor.fetchall():
+                distance = LocationService.calculate_distance(
+                    center_lat, center_lon, chef['latitude'], chef['longitude']
+                )
+                if distance <= COVERAGE_RADIUS_KM:
+                    chefs.append((distance, chef['id']))
+            if chefs:
+                rows.append(_cell_row(cell, chefs, now))
+
+        _write_cells(conn, cells, rows)
+    return len(rows)
+
+
+def chef_changed(latitude: Optional[float], longitude: Optional[float],
+                 previous: Optional[Tuple[float, float]] = None):
+    """
+    Refresh the cells around a chef's new (and previous) position on a daemon thread
+    Call after signup, a location change, or an availability change
+    """
+    cells = set()
+    for point in ((latitude, longitude), previous or (None, None)):
+        if point[0] is not None and point[1] is not None:
+            cells.update(_cells_for(point[0], point[1]))
+    if not cells:
+        return
+
+    def run():
+        try:
+            refresh_cells(cells)
+        except Exception as e:
+            print(f"⚠️ Coverage refresh failed: {e}")
+
+    threading.Thread(target=run, daemon=True).start()
+
+
+def lookup(latitude: float, longitude: float) -> Dict:
+    """Coverage for a point: chef_count and nearest chef ids (closest first)"""
+    cell = geohash.encode(latitude, longitude, COVERAGE_PRECISION)
+    row = DatabaseConnection.execute_one("SELECT * FROM coverage_cells WHERE cell = ?", (cell,))
+    if not row:
+        return {'cell': cell, 'chef_count': 0, 'nearest_chef_ids': [], 'nearest_distance_km': None}
+    return {
+        'cell': cell,
+        'chef_count': row['chef_count'],
+        'nearest_chef_ids': json.loads(row['nearest_chef_ids'] or '[]'),
+        'nearest_distance_km': row['nearest_distance_km']
+    }
+
+
+def nearest_chefs_outside(latitude: float, longitude: float, limit: int = 3) -> List[Dict]:
+    """
+    Closest chefs for an uncovered point, widening the search box until some are found
+    """
+    with DatabaseConnection.get_db() as conn:
+        cursor = conn.cursor()
+        for radius_km in (COVERAGE_RADIUS_KM * 5, COVERAGE_RADIUS_KM * 50, 20000):
+            min_lat, max_lat, min_lon, max_lon = LocationService.bounding_box(latitude, longitude, radius_km)
+            cursor.execute(f"""
+                SELECT id, full_name, city, state, latitude, longitude, chef_specialties
+                FROM users
+                WHERE {_CHEF_FILTER}
+                  AND latitude BETWEEN ? AND ? AND longitude BETWEEN ? AND ?
+            """, (min_lat, max_lat, min_lon, max_lon))
+            chefs = cursor.fetchall()
+            if chefs:
+                for chef in chefs:
+                    chef['distance_km'] = round(LocationService.calculate_distance(
+                        latitude, longitude, chef['latitude'], chef['longitude']
+                    ), 2)
+                return sorted(chefs, key=lambda c: c['distance_km'])[:limit]
+    return []
+
+
+def get_chefs(chef_ids: List[int]) -> List[Dict]:
+    """Public chef details for ids, in the given order"""
+    if not chef_ids:
+        return []
+    placeholders = ','.join('?' * len(chef_ids))
+    rows = DatabaseConnection.execute_query(
+        f"SELECT id, full_name, city, state, chef_specialties FROM users WHERE id IN ({placeholders})",
+        tuple(chef_ids)
+    )
+    by_id = {row['id']: row for row in rows}
+    return [by_id[chef_id] for chef_id in chef_ids if chef_id in by_id]
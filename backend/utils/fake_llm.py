@@ -0,0 +1,220 @@
+"""
+Local stand-in for the Anthropic messages API
+Deterministic replies for load tests of the price advisor and translators
+
+In-process:   LLM_BACKEND=fake
+Over HTTP:    python utils/fake_llm.py --port 8765 --latency-ms 200 --failure-rate 0.05
+              LLM_BASE_URL=http://127.0.0.1:8765 (with the default anthropic backend)
+"""
+
+import os
+import re
+import json
+import time
+import random
+import hashlib
+import argparse
+import threading
+from types import SimpleNamespace
+from typing import Dict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def _stable_number(text: str, low: float, high: float) -> float:
+    """Deterministic number in [low, high) derived from text"""
+    digest = int(hashlib.sha256(text.encode('utf-8')).hexdigest()[:8], 16)
+    return round(low + (digest / 0xFFFFFFFF) * (high - low), 2)
+
+
+def _quoted(prompt: str, label: str) -> str:
+    """Text inside quotes after a label, e.g. 'Text to translate: "..."'"""
+    match = re.search(label + r'\s*"(.*?)"', prompt, re.S)
+    return match.group(1) if match else ''
+
+
+def fake_reply(prompt: str) -> str:
+    """Deterministic reply text for each prompt the app sends"""
+    if '"suggested_price"' in prompt:
+        dish = re.search(r'- Dish: (.*)', prompt)
+        ingredients = _stable_number(dish.group(1) if dish else prompt, 3, 9)
+        base = ingredients + 1.0
+        return json.dumps({
+            'suggested_price': round(base * 1.3 * 1.1, 2),
+            'min_price': round(base * 1.2 * 1.1, 2),
+            'max_price': round(base * 1.5 * 1.1, 2),
+            'restaurant_comparison': round(base * 1.3 * 1.1 * 2.5, 2),
+            'cost_breakdown': {
+                'ingredients': ingredients,
+                'utilities': 0.5,
+                'packaging': 0.5,
+                'platform_fee': round(base * 1.3 * 0.1, 2),
+                'profit': round(base * 0.3, 2)
+            },
+            'reasoning': 'Deterministic reply from the local LLM stand-in.',
+            'tips': 'Benchmark pricing only.'
+        })
+
+    if '"average_restaurant_price"' in prompt:
+        price = _stable_number(prompt, 6, 14)
+        return json.dumps({
+            'average_restaurant_price': round(price * 2.5, 2),
+            'suggested_homemade_price': price,
+            'ingredient_cost_range': {'min': round(price * 0.4, 2), 'max': round(price * 0.7, 2)},
+            'popular_dishes': ['Dish A', 'Dish B', 'Dish C'],
+            'demand_level': 'medium',
+            'competition_level': 'medium'
+        })
+
+    if '"recommended_language"' in prompt:
+        return json.dumps({
+            'recommended_language': 'en',
+            'local_cuisine_types': ['Local', 'International'],
+            'popular_local_dishes': ['Dish A', 'Dish B', 'Dish C'],
+            'cultural_considerations': 'Deterministic reply from the local LLM stand-in.',
+            'price_currency': 'USD'
+        })
+
+    if 'Detect the language' in prompt:
+        return 'en'
+
+    lang = re.search(r' to (\w+)', prompt)
+    tag = f"[{lang.group(1)[:2].lower()}]" if lang else '[xx]'
+
+    if '"translated portion"' in prompt:
+        fields = {}
+        for field in ('Dish Name', 'Description', 'Ingredients', 'Portion Size'):
+            match = re.search(field + r': (.*)', prompt)
+            fields[field] = f"{tag} {match.group(1).strip()}" if match else tag
+        return json.dumps({
+            'name': fields['Dish Name'],
+            'description': fields['Description'],
+            'ingredients': fields['Ingredients'],
+            'portion_size': fields['Portion Size']
+        })
+
+    if 'Texts to translate:' in prompt:
+        block = prompt.split('Texts to translate:', 1)[1].split('Return format:', 1)[0]
+        texts = re.findall(r'^\s*"(.*)"\s*$', block, re.M)
+        return json.dumps({text: f"{tag} {text}" for text in texts})
+
+    text = _quoted(prompt, 'Text to translate:') or _quoted(prompt, 'Message:')
+    return f"{tag} {text}" if text else tag
+
+
+class FakeLLMError(Exception):
+    """Injected upstream failure"""
+
+
+class FakeMessagesBackend:
+    """In-process backend with the same .messages.create shape as anthropic.Anthropic"""
+
+    def __init__(self, latency_ms: float = 0, failure_rate: float = 0, seed: int = 0):
+        self.latency_ms = latency_ms
+        self.failure_rate = failure_rate
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> 'FakeMessagesBackend':
+        return cls(
+            latency_ms=float(os.getenv('FAKE_LLM_LATENCY_MS', '0')),
+            failure_rate=float(os.getenv('FAKE_LLM_FAILURE_RATE', '0')),
+            seed=int(os.getenv('FAKE_LLM_SEED', '0'))
+        )
+
+    @property
+    def messages(self):
+        return self
+
+    def _should_fail(self) -> bool:
+        with self._lock:
+            return self._random.random() < self.failure_rate
+
+    def create(self, model: str = '', messages=None, timeout: float = None, **kwargs):
+        if self.latency_ms:
+            delay = self.latency_ms / 1000
+            if timeout is not None and delay > timeout:
+                time.sleep(timeout)
+                raise FakeLLMError("Request timed out")
+            time.sleep(delay)
+
+        if self._should_fail():
+            raise FakeLLMError("Injected upstream failure")
+
+        prompt = (messages or [{}])[-1].get('content', '')
+        return SimpleNamespace(
+            model=model,
+            role='assistant',
+            content=[SimpleNamespace(type='text', text=fake_reply(prompt))]
+        )
+
+
+def make_handler(backend: FakeMessagesBackend):
+    """HTTP handler speaking POST /v1/messages"""
+
+    class FakeMessagesHandler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            if self.path.split('?')[0] != '/v1/messages':
+                self._send(404, {'type': 'error', 'error': {'type': 'not_found_error', 'message': 'Not found'}})
+                return
+
+            length = int(self.headers.get('Content-Length', 0))
+            body = json.loads(self.rfile.read(length) or b'{}')
+
+            try:
+                reply = backend.create(model=body.get('model', ''), messages=body.get('messages', []))
+            except FakeLLMError as e:
+                self._send(529, {'type': 'error', 'error': {'type': 'overloaded_error', 'message': str(e)}})
+                return
+
+            text = reply.content[0].text
+            self._send(200, {
+                'id': f"msg_{hashlib.sha1(text.encode('utf-8')).hexdigest()[:24]}",
+                'type': 'message',
+                'role': 'assistant',
+                'model': reply.model,
+                'content': [{'type': 'text', 'text': text}],
+                'stop_reason': 'end_turn',
+                'stop_sequence': None,
+                'usage': {'input_tokens': 0, 'output_tokens': len(text.split())}
+            })
+
+        def _send(self, status: int, payload: Dict):
+            data = json.dumps(payload).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, format, *args):
+            pass  # Keep load tests quiet
+
+    return FakeMessagesHandler
+
+
+def run_server(host: str = '127.0.0.1', port: int = 8765, latency_ms: float = 0,
+               failure_rate: float = 0, seed: int = 0) -> ThreadingHTTPServer:
+    """Start the fake messages API on a background thread and return the server"""
+    backend = FakeMessagesBackend(latency_ms=latency_ms, failure_rate=failure_rate, seed=seed)
+    server = ThreadingHTTPServer((host, port), make_handler(backend))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Local stand-in for the Anthropic messages API')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency-ms', type=float, default=0)
+    parser.add_argument('--failure-rate', type=float, default=0)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    server = run_server(args.host, args.port, args.latency_ms, args.failure_rate, args.seed)
+    print(f"Fake LLM server listening on http://{args.host}:{args.port}/v1/messages")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
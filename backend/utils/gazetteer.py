@@ -0,0 +1,295 @@
+"""
+Postal-code gazetteer for Potluck
+Array-backed zip <-> coordinate lookups with an implicit k-d tree
+
+Sources (POSTAL_GAZETTEER_PATH):
+    *.bin  compiled gazetteer (fast load, see `build` below)
+    *.txt  GeoNames postal dump (tab separated, no header)
+    *.csv  postal_code,latitude,longitude,city,state,country (header row)
+Without a file the gazetteer is built from LocationService.ZIP_COORDINATES.
+
+Compile a dataset once:
+    python utils/gazetteer.py build US.txt postal.bin
+"""
+
+import os
+import sys
+import csv
+import json
+import math
+import heapq
+import struct
+import threading
+from array import array
+from typing import List, Optional, Tuple
+
+POSTAL_GAZETTEER_PATH = os.getenv('POSTAL_GAZETTEER_PATH', '')
+
+EARTH_RADIUS_KM = 6371.0
+_MAGIC = b'PGZ1'
+_HEADER = struct.Struct('<4sII')  # magic, point count, string table bytes
+
+
+def _unit_vector(latitude: float, longitude: float) -> Tuple[float, float, float]:
+    lat = math.radians(latitude)
+    lon = math.radians(longitude)
+    return math.cos(lat) * math.cos(lon), math.cos(lat) * math.sin(lon), math.sin(lat)
+
+
+def _chord_sq(distance_km: float) -> float:
+    """Squared unit-sphere chord length for a great-circle distance"""
+    angle = min(distance_km / EARTH_RADIUS_KM, math.pi)
+    return (2 * math.sin(angle / 2)) ** 2
+
+
+def _distance_km(chord_sq: float) -> float:
+    """Great-circle distance for a squared unit-sphere chord length"""
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(chord_sq) / 2))
+
+
+class PostalGazetteer:
+    """
+    Points are stored in k-d tree order: for any range [lo, hi) at depth d,
+    the split point is at (lo + hi) // 2 on axis d % 3 of the 3D unit vector.
+    A second index sorts points by postal code for exact lookups.
+    """
+
+    def __init__(self, xyz: array, lats: array, lons: array, places: List[List[str]], code_order: array):
+        self.xyz = xyz              # 3 doubles per point
+        self.lats = lats
+        self.lons = lons
+        self.places = places        # [postal_code, city, state, country] per point
+        self.code_order = code_order
+
+    def __len__(self) -> int:
+        return len(self.lats)
+
+    # ---------- building ----------
+
+    @classmethod
+    def from_entries(cls, entries: List[Tuple[str, float, float, str, str, str]]) -> 'PostalGazetteer':
+        """Build from (postal_code, latitude, longitude, city, state, country) tuples"""
+        vectors = [_unit_vector(e[1], e[2]) for e in entries]
+        order = list(range(len(entries)))
+
+        # Arrange indices in implicit k-d tree order
+        stack = [(0, len(order), 0)]
+        while stack:
+            lo, hi, depth = stack.pop()
+            if hi - lo <= 1:
+                continue
+            axis = depth % 3
+            order[lo:hi] = sorted(order[lo:hi], key=lambda i: vectors[i][axis])
+            mid = (lo + hi) // 2
+            stack.append((lo, mid, depth + 1))
+            stack.append((mid + 1, hi, depth + 1))
+
+        xyz = array('d')
+        lats = array('d')
+        lons = array('d')
+        places = []
+        for i in order:
+            xyz.extend(vectors[i])
+            lats.append(entries[i][1])
+            lons.append(entries[i][2])
+            places.append([entries[i][0], entries[i][3], entries[i][4], entries[i][5]])
+
+        code_order = array('I', sorted(range(len(places)), key=lambda i: places[i][0]))
+        return cls(xyz, lats, lons, places, code_order)
+
+    @classmethod
+    def from_file(cls, path: str) -> 'PostalGazetteer':
+        if path.endswith('.bin'):
+            return cls.load_binary(path)
+        return cls.from_entries(list(cls._read_text(path)))
+
+    @staticmethod
+    def _read_text(path: str):
+        """Yield entries from a GeoNames dump (.txt) or a CSV with a header"""
+        with open(path, newline='', encoding='utf-8') as f:
+            if path.endswith('.txt'):
+                for row in csv.reader(f, delimiter='\t'):
+                    if len(row) < 11 or not row[9] or not row[10]:
+                        continue
+                    yield (row[1].replace(' ', '').upper(), float(row[9]), float(row[10]),
+                           row[2], row[4] or row[3], row[0])
+            else:
+                for row in csv.DictReader(f):
+                    if not row.get('latitude') or not row.get('longitude'):
+                        continue
+                    yield (row['postal_code'].replace(' ', '').upper(), float(row['latitude']),
+                           float(row['longitude']), row.get('city', ''), row.get('state', ''),
+                           row.get('country', ''))
+
+    def save_binary(self, path: str):
+        strings = json.dumps(self.places, separators=(',', ':')).encode('utf-8')
+        with open(path, 'wb') as f:
+            f.write(_HEADER.pack(_MAGIC, len(self), len(strings)))
+            self.xyz.tofile(f)
+            self.lats.tofile(f)
+            self.lons.tofile(f)
+            self.code_order.tofile(f)
+            f.write(strings)
+
+    @classmethod
+    def load_binary(cls, path: str) -> 'PostalGazetteer':
+        with open(path, 'rb') as f:
+            magic, count, strings_len = _HEADER.unpack(f.read(_HEADER.size))
+            if magic != _MAGIC:
+                raise ValueError(f"{path} is not a compiled gazetteer")
+            xyz = array('d')
+            xyz.fromfile(f, count * 3)
+            lats = array('d')
+            lats.fromfile(f, count)
+            lons = array('d')
+            lons.fromfile(f, count)
+            code_order = array('I')
+            code_order.fromfile(f, count)
+            places = json.loads(f.read(strings_len).decode('utf-8'))
+        return cls(xyz, lats, lons, places, code_order)
+
+    # ---------- queries ----------
+
+    def _entry(self, index: int) -> Tuple[str, Tuple[float, float, str, str]]:
+        code, city, state, _ = self.places[index]
+        return code, (self.lats[index], self.lons[index], city, state)
+
+    def lookup(self, postal_code: str, country: str = None) -> Optional[Tuple[float, float, str, str]]:
+        """(latitude, longitude, city, state) for a postal code, or None"""
+        code = postal_code.replace(' ', '').upper()
+        lo, hi = 0, len(self.code_order)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.places[self.code_order[mid]][0] < code:
+                lo = mid + 1
+            else:
+                hi = mid
+
+        while lo < len(self.code_order):
+            index = self.code_order[lo]
+            if self.places[index][0] != code:
+                break
+            if not country or self.places[index][3] == country:
+                return self._entry(index)[1]
+            lo += 1
+        return None
+
+    def nearest(self, latitude: float, longitude: float, k: int = 1,
+                max_distance_km: float = None, include_country: bool = False) -> List[Tuple]:
+        """
+        k closest postal codes: [(code, (lat, lon, city, state), distance_km)]
+        include_country appends each one's country code
+        """
+        if not len(self):
+            return []
+
+        target = _unit_vector(latitude, longitude)
+        bound = _chord_sq(max_distance_km) if max_distance_km is not None else float('inf')
+        heap = []  # max-heap of (-dist_sq, index)
+        xyz = self.xyz
+
+        def search(lo, hi, depth):
+            if lo >= hi:
+                return
+            mid = (lo + hi) // 2
+            base = mid * 3
+            dx = xyz[base] - target[0]
+            dy = xyz[base + 1] - target[1]
+            dz = xyz[base + 2] - target[2]
+            dist_sq = dx * dx + dy * dy + dz * dz
+
+            worst = -heap[0][0] if len(heap) == k else bound
+            if dist_sq <= worst:
+                heapq.heappush(heap, (-dist_sq, mid))
+                if len(heap) > k:
+                    heapq.heappop(heap)
+
+            diff = target[depth % 3] - xyz[base + depth % 3]
+            near, far = ((mid + 1, hi), (lo, mid)) if diff > 0 else ((lo, mid), (mid + 1, hi))
+            search(near[0], near[1], depth + 1)
+            worst = -heap[0][0] if len(heap) == k else bound
+            if diff * diff <= worst:
+                search(far[0], far[1], depth + 1)
+
+        search(0, len(self), 0)
+        results = sorted((-neg, index) for neg, index in heap)
+        return [(*self._entry(index), round(_distance_km(dist_sq), 3))
+                + ((self.places[index][3],) if include_country else ())
+                for dist_sq, index in results]
+
+    def within(self, latitude: float, longitude: float, radius_km: float) -> List[Tuple[str, Tuple, float]]:
+        """All postal codes within radius_km, closest first"""
+        if not len(self):
+            return []
+
+        target = _unit_vector(latitude, longitude)
+        bound = _chord_sq(radius_km)
+        found = []
+        xyz = self.xyz
+        stack = [(0, len(self), 0)]
+
+        while stack:
+            lo, hi, depth = stack.pop()
+            if lo >= hi:
+                continue
+            mid = (lo + hi) // 2
+            base = mid * 3
+            dx = xyz[base] - target[0]
+            dy = xyz[base + 1] - target[1]
+            dz = xyz[base + 2] - target[2]
+            dist_sq = dx * dx + dy * dy + dz * dz
+            if dist_sq <= bound:
+                found.append((dist_sq, mid))
+
+            diff = target[depth % 3] - xyz[base + depth % 3]
+            if diff <= 0 or diff * diff <= bound:
+                stack.append((lo, mid, depth + 1))
+            if diff >= 0 or diff * diff <= bound:
+                stack.append((mid + 1, hi, depth + 1))
+
+        found.sort()
+        return [(*self._entry(index), round(_distance_km(dist_sq), 3)) for dist_sq, index in found]
+
+
+_gazetteer: Optional[PostalGazetteer] = None
+_load_lock = threading.Lock()
+
+
+# Countries of the states used by LocationService.ZIP_COORDINATES (anything else is US)
+_BUILTIN_COUNTRIES = {'MH': 'IN', 'CDMX': 'MX'}
+
+
+def _builtin_entries():
+    """Entries from the hard-coded LocationService sample zips"""
+    from utils.location import LocationService
+    return [(code, lat, lon, city, state, _BUILTIN_COUNTRIES.get(state, 'US'))
+            for code, (lat, lon, city, state) in LocationService.ZIP_COORDINATES.items()]
+
+
+def get_gazetteer() -> PostalGazetteer:
+    """Load the configured gazetteer on first use"""
+    global _gazetteer
+    if _gazetteer is not None:
+        return _gazetteer
+
+    with _load_lock:
+        if _gazetteer is None:
+            gazetteer = None
+            if POSTAL_GAZETTEER_PATH and os.path.exists(POSTAL_GAZETTEER_PATH):
+                try:
+                    gazetteer = PostalGazetteer.from_file(POSTAL_GAZETTEER_PATH)
+                    print(f"✅ Postal gazetteer loaded ({len(gazetteer)} postal codes)")
+                except Exception as e:
+                    print(f"⚠️ Could not load postal gazetteer: {e}")
+            _gazetteer = gazetteer or PostalGazetteer.from_entries(_builtin_entries())
+    return _gazetteer
+
+
+if __name__ == '__main__':
+    if len(sys.argv) != 4 or sys.argv[1] != 'build':
+        print("Usage: python utils/gazetteer.py build <source.txt|source.csv> <output.bin>")
+        sys.exit(1)
+
+    built = PostalGazetteer.from_file(sys.argv[2])
+    built.save_binary(sys.argv[3])
+    print(f"✅ Compiled {len(built)} postal codes -> {sys.argv[3]}")
@@ -0,0 +1,127 @@
+"""
+Geohash helpers for Potluck
+Used to quantize coordinates into cache keys and spatial index cells
+"""
+
+import math
+from typing import List, Tuple
+
+_BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+_DECODE = {char: index for index, char in enumerate(_BASE32)}
+
+# Approximate cell size (km) at each precision, width x height at the equator
+CELL_SIZE_KM = {
+    4: (39.1, 19.5),
+    5: (4.9, 4.9),
+    6: (1.2, 0.61),
+    7: (0.153, 0.153),
+}
+
+
+def encode(latitude: float, longitude: float, precision: int = 6) -> str:
+    """Geohash of a coordinate"""
+    lat_range = [-90.0, 90.0]
+    lon_range = [-180.0, 180.0]
+    chars = []
+    bits = 0
+    bit_count = 0
+    even = True  # Geohash interleaves bits starting with longitude
+
+    while len(chars) < precision:
+        if even:
+            mid = (lon_range[0] + lon_range[1]) / 2
+            if longitude >= mid:
+                bits = (bits << 1) | 1
+                lon_range[0] = mid
+            else:
+                bits <<= 1
+                lon_range[1] = mid
+        else:
+            mid = (lat_range[0] + lat_range[1]) / 2
+            if latitude >= mid:
+                bits = (bits << 1) | 1
+                lat_range[0] = mid
+            else:
+                bits <<= 1
+                lat_range[1] = mid
+        even = not even
+        bit_count += 1
+
+        if bit_count == 5:
+            chars.append(_BASE32[bits])
+            bits = 0
+            bit_count = 0
+
+    return ''.join(chars)
+
+
+def decode_bounds(geohash: str) -> Tuple[float, float, float, float]:
+    """(min_lat, min_lon, max_lat, max_lon) of a geohash cell"""
+    lat_range = [-90.0, 90.0]
+    lon_range = [-180.0, 180.0]
+    even = True
+
+    for char in geohash:
+        value = _DECODE[char]
+        for shift in range(4, -1, -1):
+            bit = (value >> shift) & 1
+            target = lon_range if even else lat_range
+            mid = (target[0] + target[1]) / 2
+            if bit:
+                target[0] = mid
+            else:
+                target[1] = mid
+            even = not even
+
+    return lat_range[0], lon_range[0], lat_range[1], lon_range[1]
+
+
+def decode(geohash: str) -> Tuple[float, float]:
+    """Center (latitude, longitude) of a geohash cell"""
+    min_lat, min_lon, max_lat, max_lon = decode_bounds(geohash)
+    return (min_lat + max_lat) / 2, (min_lon + max_lon) / 2
+
+
+def neighbors(geohash: str) -> List[str]:
+    """The cell itself plus its 8 surrounding cells"""
+    min_lat, min_lon, max_lat, max_lon = decode_bounds(geohash)
+    lat_step = max_lat - min_lat
+    lon_step = max_lon - min_lon
+    center_lat = (min_lat + max_lat) / 2
+    center_lon = (min_lon + max_lon) / 2
+
+    cells = []
+    for dlat in (-1, 0, 1):
+        for dlon in (-1, 0, 1):
+            lat = center_lat + dlat * lat_step
+            lon = center_lon + dlon * lon_step
+            if -90 <= lat <= 90:
+                lon = ((lon + 180) % 360) - 180
+                cell = encode(lat, lon, len(geohash))
+                if cell not in cells:
+                    cells.append(cell)
+    return cells
+
+
+def cells_within(latitude: float, longitude: float, radius_km: float, precision: int = 5) -> List[str]:
+    """All cells at `precision` that may contain points within radius_km"""
+    lat_deg = radius_km / 111.0
+    lon_deg = radius_km / (111.0 * max(math.cos(math.radians(latitude)), 0.01))
+
+    min_lat, min_lon, max_lat, max_lon = decode_bounds(encode(latitude, longitude, precision))
+    lat_step = max_lat - min_lat
+    lon_step = max_lon - min_lon
+
+    cells = []
+    lat = latitude - lat_deg
+    while lat <= latitude + lat_deg + lat_step:
+        lon = longitude - lon_deg
+        while lon <= longitude + lon_deg + lon_step:
+            clamped_lat = min(max(lat, -90.0), 90.0)
+            wrapped_lon = ((lon + 180) % 360) - 180
+            cell = encode(clamped_lat, wrapped_lon, precision)
+            if cell not in cells:
+                cells.append(cell)
+            lon += lon_step
+        lat += lat_step
+    return cells
@@ -0,0 +1,103 @@
+"""
+Offline IP geolocation for Potluck
+Loads a local range database into sorted arrays and answers with binary search
+
+Expected CSV (header row required), either range or CIDR form:
+    start_ip,end_ip,country_code,country,region,city,postal_code,latitude,longitude,timezone
+    network,country_code,country,region,city,postal_code,latitude,longitude,timezone
+"""
+
+import os
+import csv
+import ipaddress
+import threading
+from bisect import bisect_right
+from typing import Dict, List, Optional
+
+# Path to the range database; lookups are skipped when unset or missing
+GEOIP_DB_PATH = os.getenv('GEOIP_DB_PATH', '')
+
+
+class GeoIPDatabase:
+    """Sorted, non-overlapping IP ranges with an attached location record"""
+
+    FIELDS = ('country_code', 'country', 'region', 'city', 'postal_code', 'latitude', 'longitude', 'timezone')
+
+    def __init__(self):
+        self.starts: List[int] = []
+        self.ends: List[int] = []
+        self.records: List[tuple] = []
+
+    @classmethod
+    def from_csv(cls, path: str) -> 'GeoIPDatabase':
+        """Build the index from a CSV range database"""
+        rows = []
+        with open(path, newline='', encoding='utf-8') as f:
+            for row in csv.DictReader(f):
+                try:
+                    if row.get('network'):
+                        network = ipaddress.ip_network(row['network'].strip(), strict=False)
+                        start, end = int(network.network_address), int(network.broadcast_address)
+                    else:
+                        start = int(ipaddress.ip_address(row['start_ip'].strip()))
+                        end = int(ipaddress.ip_address(row['end_ip'].strip()))
+                    latitude = float(row.get('latitude') or 0)
+                    longitude = float(row.get('longitude') or 0)
+                except (KeyError, ValueError):
+                    continue
+
+                rows.append((start, end, (
+                    (row.get('country_code') or '').upper(),
+                    row.get('country') or '',
+                    row.get('region') or '',
+                    row.get('city') or '',
+                    row.get('postal_code') or '',
+                    latitude,
+                    longitude,
+                    row.get('timezone') or ''
+                )))
+
+        rows.sort(key=lambda r: r[0])
+        db = cls()
+        db.starts = [r[0] for r in rows]
+        db.ends = [r[1] for r in rows]
+        db.records = [r[2] for r in rows]
+        return db
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    def lookup(self, ip_address: str) -> Optional[Dict]:
+        """Location record for an IP, or None"""
+        try:
+            ip_int = int(ipaddress.ip_address(ip_address))
+        except ValueError:
+            return None
+
+        index = bisect_right(self.starts, ip_int) - 1
+        if index < 0 or ip_int > self.ends[index]:
+            return None
+        return dict(zip(self.FIELDS, self.records[index]))
+
+
+_database: Optional[GeoIPDatabase] = None
+_load_lock = threading.Lock()
+_load_attempted = False
+
+
+def get_geoip_database() -> Optional[GeoIPDatabase]:
+    """Lazily load the configured database once per process"""
+    global _database, _load_attempted
+    if _load_attempted:
+        return _database
+
+    with _load_lock:
+        if not _load_attempted:
+            if GEOIP_DB_PATH and os.path.exists(GEOIP_DB_PATH):
+                try:
+                    _database = GeoIPDatabase.from_csv(GEOIP_DB_PATH)
+                    print(f"✅ GeoIP database loaded ({len(_database)} ranges)")
+                except Exception as e:
+                    print(f"⚠️ Could not load GeoIP database: {e}")
+            _load_attempted = True
+    return _database
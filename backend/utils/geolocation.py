@@ -3,12 +3,48 @@ Global Geolocation and Localization Service
 Automatically detects user location and provides localization data
 """
 
+import os
 import requests
 import json
+import ipaddress
+import queue
+import threading
 from typing import Dict, Optional, Tuple
 from dataclasses import dataclass
 import time
 
+from utils import geohash
+from utils.cache import TTLCache
+from utils.geoip import get_geoip_database
+from middleware.logging import track_external
+
+# IP lookups are cached per /24 (IPv4) or /64 (IPv6) network
+ip_location_cache = TTLCache(
+    'ip_geolocation',
+    maxsize=int(os.getenv('GEOIP_CACHE_SIZE', '50000')),
+    ttl=float(os.getenv('GEOIP_CACHE_TTL', '86400'))
+)
+# Failed lookups are remembered briefly so a flaky API isn't hammered
+GEOIP_NEGATIVE_TTL = 60
+# Remote API settings (remote lookups can be disabled entirely)
+GEOIP_REMOTE_LOOKUPS = os.getenv('GEOIP_REMOTE_LOOKUPS', 'true').lower() == 'true'
+GEOIP_REMOTE_TIMEOUT = float(os.getenv('GEOIP_REMOTE_TIMEOUT', '5'))
+
+# Reverse geocoding is cached per geohash cell (precision 6 is ~1.2 x 0.6 km)
+REVERSE_GEOCODE_PRECISION = int(os.getenv('REVERSE_GEOCODE_PRECISION', '6'))
+reverse_geocode_cache = TTLCache(
+    'reverse_geocoding',
+    maxsize=int(os.getenv('REVERSE_GEOCODE_CACHE_SIZE', '50000')),
+    ttl=float(os.getenv('REVERSE_GEOCODE_CACHE_TTL', str(7 * 86400)))
+)
+# Nominatim's usage policy allows about one request per second
+NOMINATIM_MIN_INTERVAL = float(os.getenv('NOMINATIM_MIN_INTERVAL', '1.0'))
+REVERSE_GEOCODE_QUEUE_SIZE = 1000
+# How long a request waits for the queue before using the local fallback
+REVERSE_GEOCODE_WAIT = float(os.getenv('REVERSE_GEOCODE_WAIT', '0'))
+# Nearest-zip fallback is only trusted within this distance
+REVERSE_GEOCODE_FALLBACK_KM = 25.0
+
 @dataclass
 class LocationData:
     """Location data structure"""
@@ -50,93 +86,93 @@ class GlobalGeolocationService:
     GLOBAL_LOCALIZATION = {
         # North America
         'US': {
-            'currency': 'USD', 'symbol': '$', 'language': 'en', 'phone_code': '+1',
+            'name': 'United States', 'currency': 'USD', 'symbol': '$', 'language': 'en', 'phone_code': '+1',
             'supported': True, 'pricing_tier': 'medium'
         },
         'CA': {
-            'currency': 'CAD', 'symbol': 'C$', 'language': 'en', 'phone_code': '+1',
+            'name': 'Canada', 'currency': 'CAD', 'symbol': 'C$', 'language': 'en', 'phone_code': '+1',
             'supported': True, 'pricing_tier': 'medium'
         },
         'MX': {
-            'currency': 'MXN', 'symbol': '$', 'language': 'es', 'phone_code': '+52',
+            'name': 'Mexico', 'currency': 'MXN', 'symbol': '$', 'language': 'es', 'phone_code': '+52',
             'supported': True, 'pricing_tier': 'low'
         },
         
         # Europe
         'GB': {
-            'currency': 'GBP', 'symbol': '£', 'language': 'en', 'phone_code': '+44',
+            'name': 'United Kingdom', 'currency': 'GBP', 'symbol': '£', 'language': 'en', 'phone_code': '+44',
             'supported': True, 'pricing_tier': 'high'
         },
         'DE': {
-            'currency': 'EUR', 'symbol': '€', 'language': 'de', 'phone_code': '+49',
+            'name': 'Germany', 'currency': 'EUR', 'symbol': '€', 'language': 'de', 'phone_code': '+49',
             'supported': True, 'pricing_tier': 'high'
         },
         'FR': {
-            'currency': 'EUR', 'symbol': '€', 'language': 'fr', 'phone_code': '+33',
+            'name': 'France', 'currency': 'EUR', 'symbol': '€', 'language': 'fr', 'phone_code': '+33',
             'supported': True, 'pricing_tier': 'high'
         },
         'IT': {
-            'currency': 'EUR', 'symbol': '€', 'language': 'it', 'phone_code': '+39',
+            'name': 'Italy', 'currency': 'EUR', 'symbol': '€', 'language': 'it', 'phone_code': '+39',
             'supported': True, 'pricing_tier': 'medium'
         },
         'ES': {
-            'currency': 'EUR', 'symbol': '€', 'language': 'es', 'phone_code': '+34',
+            'name': 'Spain', 'currency': 'EUR', 'symbol': '€', 'language': 'es', 'phone_code': '+34',
             'supported': True, 'pricing_tier': 'medium'
         },
         
         # Asia
         'IN': {
-            'currency': 'INR', 'symbol': '₹', 'language': 'en', 'phone_code': '+91',
+            'name': 'India', 'currency': 'INR', 'symbol': '₹', 'language': 'en', 'phone_code': '+91',
             'supported': True, 'pricing_tier': 'low'
         },
         'CN': {
-            'currency': 'CNY', 'symbol': '¥', 'language': 'zh', 'phone_code': '+86',
+            'name': 'China', 'currency': 'CNY', 'symbol': '¥', 'language': 'zh', 'phone_code': '+86',
             'supported': True, 'pricing_tier': 'medium'
         },
         'JP': {
-            'currency': 'JPY', 'symbol': '¥', 'language': 'ja', 'phone_code': '+81',
+            'name': 'Japan', 'currency': 'JPY', 'symbol': '¥', 'language': 'ja', 'phone_code': '+81',
             'supported': True, 'pricing_tier': 'high'
         },
         'KR': {
-            'currency': 'KRW', 'symbol': '₩', 'language': 'ko', 'phone_code': '+82',
+            'name': 'South Korea', 'currency': 'KRW', 'symbol': '₩', 'language': 'ko', 'phone_code': '+82',
             'supported': True, 'pricing_tier': 'medium'
         },
         'SG': {
-            'currency': 'SGD', 'symbol': 'S$', 'language': 'en', 'phone_code': '+65',
+            'name': 'Singapore', 'currency': 'SGD', 'symbol': 'S$', 'language': 'en', 'phone_code': '+65',
             'supported': True, 'pricing_tier': 'high'
         },
         
         # Oceania
         'AU': {
-            'currency': 'AUD', 'symbol': 'A$', 'language': 'en', 'phone_code': '+61',
+            'name': 'Australia', 'currency': 'AUD', 'symbol': 'A$', 'language': 'en', 'phone_code': '+61',
             'supported': True, 'pricing_tier': 'high'
         },
         'NZ': {
-            'currency': 'NZD', 'symbol': 'NZ$', 'language': 'en', 'phone_code': '+64',
+            'name': 'New Zealand', 'currency': 'NZD', 'symbol': 'NZ$', 'language': 'en', 'phone_code': '+64',
             'supported': True, 'pricing_tier': 'high'
         },
         
         # South America
         'BR': {
-            'currency': 'BRL', 'symbol': 'R$', 'language': 'pt', 'phone_code': '+55',
+            'name': 'Brazil', 'currency': 'BRL', 'symbol': 'R$', 'language': 'pt', 'phone_code': '+55',
             'supported': True, 'pricing_tier': 'low'
         },
         'AR': {
-            'currency': 'ARS', 'symbol': '$', 'language': 'es', 'phone_code': '+54',
+            'name': 'Argentina', 'currency': 'ARS', 'symbol': '$', 'language': 'es', 'phone_code': '+54',
             'supported': True, 'pricing_tier': 'low'
         },
         
         # Africa
         'ZA': {
-            'currency': 'ZAR', 'symbol': 'R', 'language': 'en', 'phone_code': '+27',
+            'name': 'South Africa', 'currency': 'ZAR', 'symbol': 'R', 'language': 'en', 'phone_code': '+27',
             'supported': True, 'pricing_tier': 'low'
         },
         'NG': {
-            'currency': 'NGN', 'symbol': '₦', 'language': 'en', 'phone_code': '+234',
+            'name': 'Nigeria', 'currency': 'NGN', 'symbol': '₦', 'language': 'en', 'phone_code': '+234',
             'supported': True, 'pricing_tier': 'low'
         },
         'EG': {
-            'currency': 'EGP', 'symbol': 'E£', 'language': 'ar', 'phone_code': '+20',
+            'name': 'Egypt', 'currency': 'EGP', 'symbol': 'E£', 'language': 'ar', 'phone_code': '+20',
             'supported': True, 'pricing_tier': 'low'
         }
     }
@@ -158,37 +194,114 @@ class GlobalGeolocationService:
                 phone_code='+1', is_supported=True
             )
         
-        for api in GlobalGeolocationService.GEOLOCATION_APIS:
-            try:
-                url = api['url'].format(ip=ip_address)
-                response = requests.get(url, timeout=5)
-                
-                if response.status_code == 200:
-                    data = response.json()
-                    return GlobalGeolocationService._parse_api_response(data, api['name'])
+        cache_key = GlobalGeolocationService._ip_cache_key(ip_address)
+        cached = ip_location_cache.get(cache_key)
+        if cached is not None:
+            return cached
+        
+        # Local range database answers in-process
+        geoip_db = get_geoip_database()
+        if geoip_db:
+            record = geoip_db.lookup(ip_address)
+            if record:
+                location = GlobalGeolocationService._parse_geoip_record(record)
+                ip_location_cache.set(cache_key, location)
+                return location
+        
+        if GEOIP_REMOTE_LOOKUPS:
+            for api in GlobalGeolocationService.GEOLOCATION_APIS:
+                try:
+                    url = api['url'].format(ip=ip_address)
+                    with track_external('geoip'):
+                        response = requests.get(url, timeout=GEOIP_REMOTE_TIMEOUT)
                     
-            except Exception as e:
-                print(f"Error with {api['name']}: {e}")
-                continue
+                    if response.status_code == 200:
+                        data = response.json()
+                        location = GlobalGeolocationService._parse_api_response(data, api['name'])
+                        ip_location_cache.set(cache_key, location)
+                        return location
+                        
+                except Exception as e:
+                    print(f"Error with {api['name']}: {e}")
+                    continue
         
         # Fallback to default US location if all APIs fail
-        return LocationData(
+        location = LocationData(
             latitude=32.7815, longitude=-96.7968,
             city='Dallas', state='TX', country='United States', country_code='US',
             postal_code='75201', timezone='America/Chicago',
             currency='USD', currency_symbol='$', language='en', language_code='en',
             phone_code='+1', is_supported=True
         )
+        ip_location_cache.set(cache_key, location, ttl=GEOIP_NEGATIVE_TTL)
+        return location
+    
+    @staticmethod
+    def _ip_cache_key(ip_address: str) -> str:
+        """Cache key: the /24 (IPv4) or /64 (IPv6) network containing the IP"""
+        try:
+            ip = ipaddress.ip_address(ip_address)
+            prefix = 24 if ip.version == 4 else 64
+            return str(ipaddress.ip_network(f"{ip}/{prefix}", strict=False))
+        except ValueError:
+            return ip_address
+    
+    @staticmethod
+    def _parse_geoip_record(record: Dict) -> LocationData:
+        """Build LocationData from a local GeoIP database record"""
+        country_code = record['country_code'] or 'US'
+        currency = GlobalGeolocationService._get_currency_by_country(country_code)
+        return LocationData(
+            latitude=record['latitude'],
+            longitude=record['longitude'],
+            city=record['city'],
+            state=record['region'],
+            country=record['country'] or GlobalGeolocationService._get_country_name(country_code),
+            country_code=country_code,
+            postal_code=record['postal_code'],
+            timezone=record['timezone'],
+            currency=currency,
+            currency_symbol=GlobalGeolocationService._get_currency_symbol(currency),
+            language=GlobalGeolocationService._get_language(country_code),
+            language_code=GlobalGeolocationService._get_language_code(country_code),
+            phone_code=GlobalGeolocationService._get_phone_code(country_code),
+            is_supported=GlobalGeolocationService._is_country_supported(country_code)
+        )
+    
+    @staticmethod
+    def get_location_by_coordinates(lat: float, lon: float, wait_seconds: float = None) -> Optional[LocationData]:
+        """
+        Get location data by coordinates (reverse geocoding)
+        
+        Answers from the quantized-coordinate cache when possible. On a miss the
+        lookup is queued for the rate-limited Nominatim worker; we wait up to
+        wait_seconds for it, then fall back to the nearest known zip code.
+        """
+        cache_key = geohash.encode(lat, lon, REVERSE_GEOCODE_PRECISION)
+        cached = reverse_geocode_cache.get(cache_key)
+        if cached is not None:
+            return cached
+        
+        if wait_seconds is None:
+            wait_seconds = REVERSE_GEOCODE_WAIT
+        done = reverse_geocode_queue.submit(cache_key, lat, lon)
+        if wait_seconds > 0 and done.wait(wait_seconds):
+            cached = reverse_geocode_cache.get(cache_key)
+            if cached is not None:
+                return cached
+        
+        return GlobalGeolocationService._nearest_zip_location(lat, lon)
     
     @staticmethod
-    def get_location_by_coordinates(lat: float, lon: float) -> Optional[LocationData]:
-        """Get location data by coordinates (reverse geocoding)"""
+    def _fetch_nominatim(lat: float, lon: float) -> Optional[LocationData]:
+        """Call Nominatim directly (only from the rate-limited worker)"""
         try:
             # Use OpenStreetMap Nominatim API (free)
             url = f"https://nominatim.openstreetmap.org/reverse?lat={lat}&lon={lon}&format=json"
             headers = {'User-Agent': 'PotluckApp/1.0'}
             
-            response = requests.get(url, headers=headers, timeout=5)
+            with track_external('nominatim'):
+                response = requests.get(url, headers=headers, timeout=5)
             
             if response.status_code == 200:
                 data = response.json()
@@ -199,6 +312,32 @@ class GlobalGeolocationService:
         
         return None
     
+    @staticmethod
+    def _nearest_zip_location(lat: float, lon: float) -> Optional[LocationData]:
+        """Local fallback: the closest zip code we know about"""
+        from utils.location import LocationService
+        
+        nearest = LocationService.find_nearest_zip(lat, lon, max_distance_km=REVERSE_GEOCODE_FALLBACK_KM,
+                                                   include_country=True)
+        if not nearest:
+            return None
+        
+        zip_code, (zip_lat, zip_lon, city, state), _, country_code = nearest
+        country_code = (country_code or 'US').upper()
+        currency = GlobalGeolocationService._get_currency_by_country(country_code)
+        
+        return LocationData(
+            latitude=lat, longitude=lon,
+            city=city, state=state,
+            country=GlobalGeolocationService._get_country_name(country_code), country_code=country_code,
+            postal_code=zip_code, timezone='',
+            currency=currency, currency_symbol=GlobalGeolocationService._get_currency_symbol(currency),
+            language=GlobalGeolocationService._get_language(country_code),
+            language_code=GlobalGeolocationService._get_language_code(country_code),
+            phone_code=GlobalGeolocationService._get_phone_code(country_code),
+            is_supported=GlobalGeolocationService._is_country_supported(country_code)
+        )
+    
     @staticmethod
     def _parse_api_response(data: Dict, api_name: str) -> LocationData:
         """Parse response from geolocation API"""
@@ -259,6 +398,12 @@ class GlobalGeolocationService:
         country_code = country_code.upper()
         return GlobalGeolocationService.GLOBAL_LOCALIZATION.get(country_code, {}).get('currency', 'USD')
     
+    @staticmethod
+    def _get_country_name(country_code: str) -> str:
+        """Display name for a country code ('' if we don't know it)"""
+        country_code = country_code.upper()
+        return GlobalGeolocationService.GLOBAL_LOCALIZATION.get(country_code, {}).get('name', '')
+    
     @staticmethod
     def _get_currency_symbol(currency: str) -> str:
         """Get currency symbol"""
@@ -307,5 +452,72 @@ class GlobalGeolocationService:
             if data.get('supported', False)
         }
 
+class ReverseGeocodeQueue:
+    """
+    Single worker thread that drains reverse-geocoding requests at no more
+    than one Nominatim call per NOMINATIM_MIN_INTERVAL seconds
+    """
+    
+    def __init__(self, min_interval: float):
+        self.min_interval = min_interval
+        self._queue = queue.Queue(maxsize=REVERSE_GEOCODE_QUEUE_SIZE)
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+    
+    def submit(self, cache_key: str, lat: float, lon: float) -> threading.Event:
+        """Queue a lookup (deduplicated per cache key); the event is set when it finishes"""
+        self._ensure_worker()
+        with self._lock:
+            done = self._pending.get(cache_key)
+            if done:
+                return done
+            done = threading.Event()
+            try:
+                self._queue.put_nowait((cache_key, lat, lon))
+                self._pending[cache_key] = done
+            except queue.Full:
+                done.set()  # Drop the lookup; callers use the local fallback
+            return done
+    
+    def depth(self) -> int:
+        return self._queue.qsize()
+    
+    def _ensure_worker(self):
+        with self._lock:
+            if self._thread and self._thread.is_alive() and self._pid == os.getpid():
+                return
+            # Forked workers start with an empty queue of their own
+            self._pending = {}
+            self._queue = queue.Queue(maxsize=REVERSE_GEOCODE_QUEUE_SIZE)
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name='reverse-geocoder', daemon=True)
+            self._thread.start()
+    
+    def _run(self):
+        last_call = 0.0
+        while True:
+            cache_key, lat, lon = self._queue.get()
+            try:
+                if reverse_geocode_cache.get(cache_key) is None:
+                    delay = self.min_interval - (time.monotonic() - last_call)
+                    if delay > 0:
+                        time.sleep(delay)
+                    last_call = time.monotonic()
+                    location = GlobalGeolocationService._fetch_nominatim(lat, lon)
+                    if location:
+                        reverse_geocode_cache.set(cache_key, location)
+            except Exception as e:
+                print(f"Reverse geocoding worker error: {e}")
+            finally:
+                with self._lock:
+                    done = self._pending.pop(cache_key, None)
+                if done:
+                    done.set()
+
+
+reverse_geocode_queue = ReverseGeocodeQueue(NOMINATIM_MIN_INTERVAL)
+
 # Singleton instance
 geolocation_service = GlobalGeolocationService() 
\ No newline at end of file
@@ -0,0 +1,196 @@
+"""
+Health checks for Potluck
+Liveness only says the process can answer; readiness probes what a
+request actually needs (database reads and writes, schema, disk,
+background jobs, the LLM breaker) and is cached for a few seconds per
+worker so load balancers can poll it as often as they like
+"""
+
+import os
+import sys
+import time
+import shutil
+import threading
+from typing import Dict, Optional
+
+# Seconds a readiness result is reused before probing again
+HEALTH_CACHE_SECONDS = float(os.getenv('HEALTH_CACHE_SECONDS', '5'))
+
+# Probe write (lock + fsync) slower than this is degraded; slower than the fail limit or locked is not ready
+HEALTH_WRITE_WARN_MS = float(os.getenv('HEALTH_WRITE_WARN_MS', '250'))
+HEALTH_WRITE_FAIL_MS = float(os.getenv('HEALTH_WRITE_FAIL_MS', '2000'))
+
+# Free space left on the database volume
+HEALTH_MIN_FREE_MB = int(os.getenv('HEALTH_MIN_FREE_MB', '200'))
+
+# A job this many seconds past its next run means the scheduler is stuck or behind
+HEALTH_JOB_GRACE_SECONDS = int(os.getenv('HEALTH_JOB_GRACE_SECONDS', '300'))
+
+# 'fail' makes readiness return 503; 'degraded' still serves traffic
+STATUS_ORDER = {'ok': 0, 'degraded': 1, 'fail': 2}
+
+STARTED_AT = time.time()
+
+
+def _worst(statuses) -> str:
+    return max(statuses, key=STATUS_ORDER.get, default='ok')
+
+
+def check_database() -> Dict:
+    """Connectivity, schema version and a timed write under the real write lock"""
+    from config import database
+
+    if not os.path.exists(database.DB_PATH):
+        return {'status': 'fail', 'error': 'database file is missing'}
+
+    conn = None
+    try:
+        conn = database.DatabaseConnection.connect()
+        conn.execute(f"PRAGMA busy_timeout = {int(HEALTH_WRITE_FAIL_MS)}")
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+
+        started = time.perf_counter()
+        conn.execute("BEGIN IMMEDIATE")
+        conn.execute(
+            "INSERT OR REPLACE INTO health_probes (id, pid, checked_at) VALUES (1, ?, CURRENT_TIMESTAMP)",
+            (os.getpid(),)
+        )
+        conn.commit()
+        write_ms = round((time.perf_counter() - started) * 1000, 1)
+    except Exception as e:
+        return {'status': 'fail', 'error': str(e)}
+    finally:
+        if conn is not None:
+            conn.close()
+
+    result = {'status': 'ok', 'write_ms': write_ms, 'schema_version': version,
+              'expected_schema_version': database.SCHEMA_VERSION}
+    if version < database.SCHEMA_VERSION:
+        result.update(status='fail', error='database schema is older than this code')
+    elif write_ms > HEALTH_WRITE_FAIL_MS:
+        result.update(status='fail', error='writes are too slow')
+    elif write_ms > HEALTH_WRITE_WARN_MS:
+        result['status'] = 'degraded'
+    return result
+
+
+def check_disk() -> Dict:
+    """Free space on the volume holding the database"""
+    from config.database import DB_PATH
+
+    try:
+        usage = shutil.disk_usage(os.path.dirname(os.path.abspath(DB_PATH)))
+    except OSError as e:
+        return {'status': 'fail', 'error': str(e)}
+
+    free_mb = usage.free // (1024 * 1024)
+    return {
+        'status': 'ok' if free_mb >= HEALTH_MIN_FREE_MB else 'fail',
+        'free_mb': free_mb,
+        'min_free_mb': HEALTH_MIN_FREE_MB
+    }
+
+
+def check_scheduler() -> Dict:
+    """Scheduler thread alive in this process and every job run on time"""
+    if os.getenv('BACKGROUND_TASKS', 'true').lower() != 'true':
+        return {'status': 'ok', 'running': False, 'enabled': False}
+
+    tasks = sys.modules.get('tasks')
+    if tasks is None or not tasks.scheduler.started():
+        # app.start_background_jobs never got it going (it logs why)
+        return {'status': 'degraded', 'running': False, 'error': 'scheduler was not started'}
+    if not tasks.scheduler.running():
+        # Nothing restarts the thread; only a new worker brings the jobs back
+        return {'status': 'fail', 'running': False, 'error': 'scheduler thread died'}
+
+    now = time.time()
+    overdue, failing = [], []
+    for name, job in tasks.scheduler.active_jobs().items():
+        if now - job['next_run'] > HEALTH_JOB_GRACE_SECONDS:
+            overdue.append(name)
+        beat = tasks.scheduler.heartbeats.get(name)
+        if beat and beat['error']:
+            failing.append(name)
+
+    return {
+        'status': 'degraded' if overdue or failing else 'ok',
+        'running': True,
+        'leader': tasks.scheduler.is_leader(),
+        'overdue_jobs': overdue,
+        'failing_jobs': failing
+    }
+
+
+def check_llm() -> Dict:
+    """Breaker state; LLM features have fallbacks, so an open breaker only degrades"""
+    llm_module = sys.modules.get('utils.llm_client')
+    if llm_module is None:
+        return {'status': 'ok', 'loaded': False}
+
+    stats = llm_module.llm_client.stats()
+    return {
+        'status': 'ok' if stats['breaker_state'] == 'closed' else 'degraded',
+        'available': stats['available'],
+        'breaker_state': stats['breaker_state'],
+        'consecutive_failures': stats['consecutive_failures']
+    }
+
+
+CHECKS = {
+    'database': check_database,
+    'disk': check_disk,
+    'scheduler': check_scheduler,
+    'llm': check_llm,
+}
+
+
+class ReadinessProbe:
+    """Runs CHECKS at most once per HEALTH_CACHE_SECONDS in this process"""
+
+    def __init__(self, cache_seconds: float = HEALTH_CACHE_SECONDS):
+        self.cache_seconds = cache_seconds
+        self._result: Optional[Dict] = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def run(self) -> Dict:
+        checks = {}
+        for name, check in CHECKS.items():
+            try:
+                checks[name] = check()
+            except Exception as e:
+                checks[name] = {'status': 'fail', 'error': str(e)}
+        return {
+            'status': _worst(check['status'] for check in checks.values()),
+            'checks': checks,
+            'checked_at': time.time(),
+            'pid': os.getpid()
+        }
+
+    def get(self) -> Dict:
+        """Cached result; concurrent callers reuse the last one while a probe is running"""
+        if self._result is not None and time.time() - self._checked_at < self.cache_seconds:
+            return self._result
+
+        if not self._lock.acquire(blocking=self._result is None):
+            return self._result
+        try:
+            if self._result is None or time.time() - self._checked_at >= self.cache_seconds:
+                self._result = self.run()
+                self._checked_at = time.time()
+            return self._result
+        finally:
+            self._lock.release()
+
+
+readiness_probe = ReadinessProbe()
+
+
+def liveness() -> Dict:
+    """No dependencies: if this answers, the process isn't wedged"""
+    return {
+        'status': 'ok',
+        'pid': os.getpid(),
+        'uptime_seconds': round(time.time() - STARTED_AT, 1)
+    }
@@ -0,0 +1,215 @@
+"""
+Shared LLM client for Potluck
+Wraps the Anthropic client with deadlines, a circuit breaker,
+a concurrency limit, and latency/error counters. The anthropic SDK
+is imported and the upstream client built on the first call, so
+importing this module costs almost nothing at startup
+"""
+
+import os
+import time
+import threading
+from typing import Dict
+
+from dotenv import load_dotenv
+
+from middleware.logging import track_external
+from utils.metrics import llm_calls, llm_latency
+
+load_dotenv()
+
+# 'anthropic' (default) or 'fake' for the deterministic in-process stand-in;
+# LLM_BASE_URL points the anthropic backend at another server (e.g. utils/fake_llm.py)
+LLM_BACKEND = os.getenv('LLM_BACKEND', 'anthropic').lower()
+LLM_BASE_URL = os.getenv('LLM_BASE_URL') or None
+
+# Per-call deadline and retry budget
+LLM_TIMEOUT_SECONDS = float(os.getenv('LLM_TIMEOUT_SECONDS', '10'))
+LLM_MAX_RETRIES = int(os.getenv('LLM_MAX_RETRIES', '1'))
+
+# Concurrent calls allowed per process, and how long a caller waits for a slot
+LLM_MAX_CONCURRENCY = int(os.getenv('LLM_MAX_CONCURRENCY', '4'))
+LLM_QUEUE_TIMEOUT_SECONDS = float(os.getenv('LLM_QUEUE_TIMEOUT_SECONDS', '0.5'))
+
+# Consecutive failures before the breaker opens, and how long it stays open
+LLM_BREAKER_THRESHOLD = int(os.getenv('LLM_BREAKER_THRESHOLD', '5'))
+LLM_BREAKER_RESET_SECONDS = float(os.getenv('LLM_BREAKER_RESET_SECONDS', '30'))
+
+
+class LLMUnavailableError(Exception):
+    """Raised instead of calling the LLM; callers use their fallback path"""
+
+
+class CircuitBreaker:
+    """
+    Classic three-state breaker
+    closed -> open after `threshold` consecutive failures
+    open -> half_open after `reset_seconds`, letting one trial call through
+    half_open -> closed on success, open again on failure
+    """
+
+    def __init__(self, threshold: int, reset_seconds: float):
+        self.threshold = threshold
+        self.reset_seconds = reset_seconds
+        self.state = 'closed'
+        self.failures = 0
+        self.opened_at = 0.0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        """Whether a call may go out now"""
+        with self._lock:
+            if self.state == 'closed':
+                return True
+            if self.state == 'open' and time.time() - self.opened_at >= self.reset_seconds:
+                self.state = 'half_open'
+                self._trial_in_flight = False
+            if self.state == 'half_open' and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.state = 'closed'
+            self.failures = 0
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == 'half_open' or self.failures >= self.threshold:
+                self.state = 'open'
+                self.opened_at = time.time()
+            self._trial_in_flight = False
+
+    def release_trial(self):
+        """A call let through in half_open never finished (e.g. cancelled); let the next one try"""
+        with self._lock:
+            if self.state == 'half_open':
+                self._trial_in_flight = False
+
+
+class LLMClient:
+    """Guarded drop-in for anthropic.Anthropic (exposes .messages.create)"""
+
+    def __init__(self, api_key: str = None, backend: str = None):
+        self.api_key = api_key if api_key is not None else os.getenv('ANTHROPIC_API_KEY', '')
+        self.backend = backend or LLM_BACKEND
+        self._client = None
+        self._client_failed = False
+        self._client_lock = threading.Lock()
+
+        self.breaker = CircuitBreaker(LLM_BREAKER_THRESHOLD, LLM_BREAKER_RESET_SECONDS)
+        self._slots = threading.BoundedSemaphore(LLM_MAX_CONCURRENCY)
+        self._stats_lock = threading.Lock()
+        self.counters = {
+            'calls': 0,
+            'errors': 0,
+            'short_circuited': 0,
+            'rejected': 0,
+            'latency_ms_total': 0.0,
+            'latency_ms_max': 0.0
+        }
+
+    @property
+    def available(self) -> bool:
+        """Whether an upstream client is configured (doesn't build it)"""
+        if self._client_failed:
+            return False
+        return self.backend == 'fake' or bool(self.api_key or LLM_BASE_URL)
+
+    def _get_client(self):
+        """Build the upstream client on first use (importing the SDK is most of app startup)"""
+        if self._client is not None or not self.available:
+            return self._client
+
+        with self._client_lock:
+            if self._client is None and not self._client_failed:
+                try:
+                    if self.backend == 'fake':
+                        from utils.fake_llm import FakeMessagesBackend
+                        self._client = FakeMessagesBackend.from_env()
+                    else:
+                        import anthropic
+                        self._client = anthropic.Anthropic(
+                            api_key=self.api_key or 'local',  # Local stand-ins don't check the key
+                            base_url=LLM_BASE_URL,
+                            timeout=LLM_TIMEOUT_SECONDS,
+                            max_retries=LLM_MAX_RETRIES
+                        )
+                except Exception as e:
+                    self._client_failed = True
+                    print(f"⚠️ Failed to initialize Anthropic client: {e}")
+        return self._client
+
+    @property
+    def messages(self):
+        """Mirror the anthropic client so callers keep using client.messages.create"""
+        return self
+
+    def _count(self, name: str, latency_ms: float = None):
+        llm_calls.inc(outcome=name)
+        if latency_ms is not None:
+            llm_latency.observe(latency_ms / 1000)
+        with self._stats_lock:
+            self.counters[name] += 1
+            if latency_ms is not None:
+                self.counters['latency_ms_total'] += latency_ms
+                self.counters['latency_ms_max'] = max(self.counters['latency_ms_max'], latency_ms)
+
+    def create(self, **kwargs):
+        """messages.create with deadline, breaker and concurrency limit"""
+        client = self._get_client()
+        if not client:
+            raise LLMUnavailableError("No LLM client configured")
+
+        # Take a slot first so a rejected call never holds the breaker's half-open trial
+        if not self._slots.acquire(timeout=LLM_QUEUE_TIMEOUT_SECONDS):
+            self._count('rejected')
+            raise LLMUnavailableError("Too many concurrent LLM calls")
+
+        settled = False
+        try:
+            if not self.breaker.allow():
+                self._count('short_circuited')
+                raise LLMUnavailableError("LLM circuit breaker is open")
+
+            started = time.time()
+            try:
+                kwargs.setdefault('timeout', LLM_TIMEOUT_SECONDS)
+                with track_external('llm'):
+                    response = client.messages.create(**kwargs)
+            except Exception:
+                settled = True
+                self.breaker.record_failure()
+                self._count('errors', (time.time() - started) * 1000)
+                raise
+
+            settled = True
+            self.breaker.record_success()
+            self._count('calls', (time.time() - started) * 1000)
+            return response
+        finally:
+            self._slots.release()
+            if not settled:
+                self.breaker.release_trial()
+
+    def stats(self) -> Dict:
+        """Counters and breaker state for health/metrics endpoints"""
+        with self._stats_lock:
+            counters = dict(self.counters)
+        completed = counters['calls'] + counters['errors']
+        counters['latency_ms_avg'] = round(counters['latency_ms_total'] / completed, 1) if completed else 0.0
+        return {
+            'backend': self.backend,
+            'available': self.available,
+            'breaker_state': self.breaker.state,
+            'consecutive_failures': self.breaker.failures,
+            **counters
+        }
+
+
+# Shared instance used by PriceAdvisor and both translators
+llm_client = LLMClient()
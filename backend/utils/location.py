@@ -68,14 +68,31 @@ class LocationService:
         if zip_clean in LocationService.ZIP_COORDINATES:
             return LocationService.ZIP_COORDINATES[zip_clean]
         
-        # For 5-digit US zip codes, try without leading zeros
-        if len(zip_clean) == 5 and zip_clean.isdigit():
-            if zip_clean in LocationService.ZIP_COORDINATES:
-                return LocationService.ZIP_COORDINATES[zip_clean]
-        
-        # In production, call a geocoding API here
-        # For now, return None if not found
-        return None
+        # Fall back to the loaded postal gazetteer
+        from utils.gazetteer import get_gazetteer
+        return get_gazetteer().lookup(zip_clean)
+    
+    @staticmethod
+    def find_nearest_zip(latitude: float, longitude: float, max_distance_km: float = None,
+                         include_country: bool = False) -> Optional[Tuple]:
+        """
+        Closest known zip code to a coordinate
+        Returns: (zip_code, (latitude, longitude, city, state), distance_km) or None,
+        with the ISO country code appended when include_country is set
+        """
+        from utils.gazetteer import get_gazetteer
+        matches = get_gazetteer().nearest(latitude, longitude, k=1, max_distance_km=max_distance_km,
+                                          include_country=include_country)
+        return matches[0] if matches else None
+    
+    @staticmethod
+    def find_zips_within(latitude: float, longitude: float, radius_km: float) -> List[Tuple[str, Tuple, float]]:
+        """
+        All known zip codes within radius_km, closest first
+        Returns: [(zip_code, (latitude, longitude, city, state), distance_km)]
+        """
+        from utils.gazetteer import get_gazetteer
+        return get_gazetteer().within(latitude, longitude, radius_km)
     
     @staticmethod
     def validate_service_area(chef_zip: str, customer_zip: str, 
@@ -109,97 +126,218 @@ class LocationService:
             'customer_location': f"{customer_coords[2]}, {customer_coords[3]}"
         }
     
+    @staticmethod
+    def bounding_box(latitude: float, longitude: float,
+                     radius_km: float) -> Tuple[float, float, float, float]:
+        """
+        (min_lat, max_lat, min_lon, max_lon) enclosing a radius
+        Used as an index-friendly prefilter before the exact Haversine check
+        """
+        lat_delta = radius_km / 111.0
+        lon_delta = radius_km / (111.0 * max(math.cos(math.radians(latitude)), 0.01))
+        return (latitude - lat_delta, latitude + lat_delta,
+                longitude - lon_delta, longitude + lon_delta)
+    
+    @staticmethod
+    def _zip_candidates(latitude: float, longitude: float, radius_km: float) -> Dict[str, Tuple]:
+        """Known zips within radius, for rows that only carry a zip code"""
+        return {zip_code: coords for zip_code, coords, _ in
+                LocationService.find_zips_within(latitude, longitude, radius_km)}
+    
+    @staticmethod
+    def chefs_near(cursor, latitude: float, longitude: float, radius_km: float,
+                   limit: int = None) -> List[Dict]:
+        """
+        Available chefs within radius of a point, closest first (better rated breaks ties)
+        Chefs without coordinates are placed at their zip code
+        """
+        min_lat, max_lat, min_lon, max_lon = LocationService.bounding_box(latitude, longitude, radius_km)
+        zip_coords = LocationService._zip_candidates(latitude, longitude, radius_km)
+        zip_placeholders = ','.join('?' * len(zip_coords)) or 'NULL'
+        
+        cursor.execute(f"""
+            SELECT id, full_name, zip_code, city, state, latitude, longitude,
+                   chef_rating, chef_specialties
+            FROM users
+            WHERE user_type = 'chef' AND is_active = 1 AND is_available = 1
+              AND latitude BETWEEN ? AND ? AND longitude BETWEEN ? AND ?
+            UNION
+            SELECT id, full_name, zip_code, city, state, latitude, longitude,
+                   chef_rating, chef_specialties
+            FROM users
+            WHERE user_type = 'chef' AND is_active = 1 AND is_available = 1
+              AND latitude IS NULL AND zip_code IN ({zip_placeholders})
+        """, (min_lat, max_lat, min_lon, max_lon, *zip_coords))
+        
+        nearby_chefs = []
+        for chef in cursor.fetchall():
+            if chef['latitude'] is not None:
+                chef_lat, chef_lon = chef['latitude'], chef['longitude']
+            else:
+                chef_lat, chef_lon = zip_coords[chef['zip_code']][:2]
+            
+            distance = LocationService.calculate_distance(latitude, longitude, chef_lat, chef_lon)
+            if distance <= radius_km:
+                nearby_chefs.append({
+                    'chef_id': chef['id'],
+                    'name': chef['full_name'],
+                    'zip': chef['zip_code'],
+                    'distance': round(distance, 2),
+                    'rating': chef['chef_rating'] or 0,
+                    'location': f"{chef['city']}, {chef['state']}"
+                })
+        
+        # Closest first, better rated chefs break ties
+        nearby_chefs.sort(key=lambda x: (x['distance'], -x['rating']))
+        return nearby_chefs[:limit] if limit else nearby_chefs
+    
+    @staticmethod
+    def agents_near(cursor, latitude: float, longitude: float, radius_km: float,
+                    online_only: bool = False, limit: int = None) -> List[Dict]:
+        """
+        Active delivery agents within radius of a pickup point, closest first
+        An agent qualifies by current position or by any active service area
+        (service areas without coordinates are placed at their zip code)
+        """
+        min_lat, max_lat, min_lon, max_lon = LocationService.bounding_box(latitude, longitude, radius_km)
+        zip_coords = LocationService._zip_candidates(latitude, longitude, radius_km)
+        zip_placeholders = ','.join('?' * len(zip_coords)) or 'NULL'
+        status_filter = "AND u.current_status = 'online'" if online_only else ""
+        
+        # Candidate positions: the agent's own location, then service areas
+        cursor.execute(f"""
+            SELECT u.id, u.full_name, u.vehicle_type, u.current_status, u.delivery_rating,
+                   u.zip_code, u.city, u.state, u.latitude, u.longitude
+            FROM users u
+            WHERE u.user_type = 'delivery' AND u.is_active = 1 {status_filter}
+              AND u.latitude BETWEEN ? AND ? AND u.longitude BETWEEN ? AND ?
+            UNION ALL
+            SELECT u.id, u.full_name, u.vehicle_type, u.current_status, u.delivery_rating,
+                   sa.zip_code, sa.city, sa.state, sa.latitude, sa.longitude
+            FROM service_areas sa
+            JOIN users u ON u.id = sa.delivery_agent_id
+            WHERE sa.is_active = 1 AND u.user_type = 'delivery' AND u.is_active = 1 {status_filter}
+              AND ((sa.latitude BETWEEN ? AND ? AND sa.longitude BETWEEN ? AND ?)
+                   OR (sa.latitude IS NULL AND sa.zip_code IN ({zip_placeholders})))
+        """, (min_lat, max_lat, min_lon, max_lon,
+              min_lat, max_lat, min_lon, max_lon, *zip_coords))
+        
+        best = {}
+        for row in cursor.fetchall():
+            if row['latitude'] is not None:
+                agent_lat, agent_lon = row['latitude'], row['longitude']
+            else:
+                agent_lat, agent_lon = zip_coords[row['zip_code']][:2]
+            
+            pickup_distance = LocationService.calculate_distance(agent_lat, agent_lon, latitude, longitude)
+            if pickup_distance > radius_km:
+                continue
+            if row['id'] in best and best[row['id']]['distance_to_pickup'] <= pickup_distance:
+                continue
+            
+            best[row['id']] = {
+                'agent_id': row['id'],
+                'name': row['full_name'],
+                'zip': row['zip_code'],
+                'vehicle_type': row['vehicle_type'],
+                'status': row['current_status'],
+                'rating': row['delivery_rating'] or 0,
+                'distance_to_pickup': round(pickup_distance, 2),
+                'location': f"{row['city']}, {row['state']}"
+            }
+        
+        # Sort by distance to pickup, better rated agents break ties
+        eligible_agents = sorted(best.values(), key=lambda x: (x['distance_to_pickup'], -x['rating']))
+        return eligible_agents[:limit] if limit else eligible_agents
+    
     @staticmethod
     def find_nearby_chefs(customer_zip: str, radius_km: float = None) -> List[Dict]:
         """
         Find all chefs within radius of customer
         """
+        return LocationService.find_nearby_chefs_bulk([customer_zip], radius_km).get(customer_zip, [])
+    
+    @staticmethod
+    def find_nearby_chefs_bulk(customer_zips: List[str], radius_km: float = None,
+                               limit: int = None) -> Dict[str, List[Dict]]:
+        """
+        Nearby available chefs for many customer zips over one connection
+        Returns: {customer_zip: [chef, ...]} ranked by distance, then rating
+        """
         if radius_km is None:
             radius_km = LocationService.DEFAULT_RADIUS_KM
         
-        customer_coords = LocationService.get_coordinates_from_zip(customer_zip)
-        if not customer_coords:
-            return []
-        
-        nearby_chefs = []
-        
-        # In production, query database for chef locations
-        # For demo, check against sample data
-        sample_chef_zips = ['75201', '75202', '75203']  # Example chef locations
+        from config.database import DatabaseConnection
         
-        for chef_zip in sample_chef_zips:
-            chef_coords = LocationService.get_coordinates_from_zip(chef_zip)
-            if chef_coords:
-                distance = LocationService.calculate_distance(
-                    customer_coords[0], customer_coords[1],
-                    chef_coords[0], chef_coords[1]
+        results = {}
+        with DatabaseConnection.get_db() as conn:
+            cursor = conn.cursor()
+            for customer_zip in customer_zips:
+                customer_coords = LocationService.get_coordinates_from_zip(customer_zip)
+                if not customer_coords:
+                    results[customer_zip] = []
+                    continue
+                results[customer_zip] = LocationService.chefs_near(
+                    cursor, customer_coords[0], customer_coords[1], radius_km, limit
                 )
-                
-                if distance <= radius_km:
-                    nearby_chefs.append({
-                        'zip': chef_zip,
-                        'distance': round(distance, 2),
-                        'location': f"{chef_coords[2]}, {chef_coords[3]}"
-                    })
         
-        # Sort by distance
-        nearby_chefs.sort(key=lambda x: x['distance'])
-        return nearby_chefs
+        return results
     
     @staticmethod
     def find_delivery_agents_in_range(order_pickup_zip: str, 
                                      order_delivery_zip: str,
-                                     max_radius_km: float = None) -> List[Dict]:
+                                     max_radius_km: float = None,
+                                     online_only: bool = False) -> List[Dict]:
         """
         Find delivery agents who can handle the order
         Agent must be within radius of BOTH pickup and delivery
         """
+        return LocationService.find_delivery_agents_bulk(
+            [(order_pickup_zip, order_delivery_zip)], max_radius_km, online_only
+        )[0]
+    
+    @staticmethod
+    def find_delivery_agents_bulk(trips: List[Tuple[str, str]], max_radius_km: float = None,
+                                  online_only: bool = False, limit: int = None) -> List[List[Dict]]:
+        """
+        Eligible delivery agents for many (pickup_zip, delivery_zip) trips
+        Returns one ranked list per trip, in input order
+        """
         if max_radius_km is None:
             max_radius_km = LocationService.DEFAULT_RADIUS_KM
         
-        pickup_coords = LocationService.get_coordinates_from_zip(order_pickup_zip)
-        delivery_coords = LocationService.get_coordinates_from_zip(order_delivery_zip)
-        
-        if not pickup_coords or not delivery_coords:
-            return []
-        
-        # Calculate total trip distance
-        trip_distance = LocationService.calculate_distance(
-            pickup_coords[0], pickup_coords[1],
-            delivery_coords[0], delivery_coords[1]
-        )
-        
-        # Don't allow deliveries beyond service radius
-        if trip_distance > max_radius_km:
-            return []
+        from config.database import DatabaseConnection
         
-        eligible_agents = []
-        
-        # In production, query database for online delivery agents
-        # For demo, use sample data
-        sample_agent_zips = ['75201', '75204', '75205']
-        
-        for agent_zip in sample_agent_zips:
-            agent_coords = LocationService.get_coordinates_from_zip(agent_zip)
-            if agent_coords:
-                # Check distance to pickup
-                pickup_distance = LocationService.calculate_distance(
-                    agent_coords[0], agent_coords[1],
-                    pickup_coords[0], pickup_coords[1]
+        results = []
+        with DatabaseConnection.get_db() as conn:
+            cursor = conn.cursor()
+            for pickup_zip, delivery_zip in trips:
+                pickup_coords = LocationService.get_coordinates_from_zip(pickup_zip)
+                delivery_coords = LocationService.get_coordinates_from_zip(delivery_zip)
+                
+                if not pickup_coords or not delivery_coords:
+                    results.append([])
+                    continue
+                
+                # Calculate total trip distance
+                trip_distance = LocationService.calculate_distance(
+                    pickup_coords[0], pickup_coords[1],
+                    delivery_coords[0], delivery_coords[1]
                 )
                 
-                # Agent should be within reasonable distance of pickup
-                if pickup_distance <= max_radius_km:
-                    eligible_agents.append({
-                        'zip': agent_zip,
-                        'distance_to_pickup': round(pickup_distance, 2),
-                        'total_trip': round(trip_distance, 2),
-                        'location': f"{agent_coords[2]}, {agent_coords[3]}"
-                    })
+                # Don't allow deliveries beyond service radius
+                if trip_distance > max_radius_km:
+                    results.append([])
+                    continue
+                
+                agents = LocationService.agents_near(
+                    cursor, pickup_coords[0], pickup_coords[1], max_radius_km, online_only, limit
+                )
+                for agent in agents:
+                    agent['total_trip'] = round(trip_distance, 2)
+                results.append(agents)
         
-        # Sort by distance to pickup
-        eligible_agents.sort(key=lambda x: x['distance_to_pickup'])
-        return eligible_agents
+        return results
     
     @staticmethod
     def get_local_market_info(zip_code: str) -> Dict:
@@ -262,5 +400,50 @@ class LocationService:
         return f"{address} {zip_code}"
 
 
+def get_currency_for_location(city, state):
+    """Get currency info based on location"""
+    city_lower = (city or '').lower()
+    state_upper = (state or '').upper()
+
+    # India
+    if state_upper in ['MH', 'DL', 'KA', 'TN', 'GJ', 'RJ', 'UP', 'WB', 'AP', 'TS']:
+        return {
+            'code': 'INR',
+            'symbol': '₹',
+            'name': 'Indian Rupee'
+        }
+
+    # Mexico
+    if state_upper in ['CDMX', 'JAL', 'NL', 'BCN', 'QRO', 'PUE']:
+        return {
+            'code': 'MXN',
+            'symbol': '$',
+            'name': 'Mexican Peso'
+        }
+
+    # Canada
+    if state_upper in ['ON', 'QC', 'BC', 'AB']:
+        return {
+            'code': 'CAD',
+            'symbol': '$',
+            'name': 'Canadian Dollar'
+        }
+
+    # UK (if we add it)
+    if 'london' in city_lower or 'manchester' in city_lower:
+        return {
+            'code': 'GBP',
+            'symbol': '£',
+            'name': 'British Pound'
+        }
+
+    # Default: USD (USA and others)
+    return {
+        'code': 'USD',
+        'symbol': '$',
+        'name': 'US Dollar'
+    }
+
+
 # Singleton instance
 location_service = LocationService()
\ No newline at end of file
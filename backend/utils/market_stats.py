@@ -0,0 +1,162 @@
+"""
+Market statistics for Potluck
+Precomputed per (city, cuisine) from local dish and order data
+"""
+
+import os
+import json
+import threading
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+
+from config.database import DatabaseConnection
+from utils.price_model import normalize_city, normalize_cuisine, weighted_quantiles
+
+# Entries older than this are refreshed in the background when read
+STALE_AFTER_HOURS = float(os.getenv('MARKET_STATS_STALE_HOURS', '6'))
+
+# Pairs currently being refreshed in the background
+_refreshing = set()
+_refreshing_lock = threading.Lock()
+
+
+def _level(value: float, low: float, high: float) -> str:
+    """Bucket a number into low/medium/high"""
+    if value < low:
+        return 'low'
+    if value < high:
+        return 'medium'
+    return 'high'
+
+
+def compute_market_stats(city: str = None, cuisine: str = None) -> int:
+    """
+    Recompute market_stats for every active (city, cuisine) pair,
+    or just one pair when city and cuisine are given.
+    Returns the number of rows written.
+    """
+    query = """
+        SELECT d.name, d.price, d.cuisine_type, d.total_orders, d.chef_id, u.city
+        FROM dishes d
+        JOIN users u ON d.chef_id = u.id
+        WHERE d.is_available = 1 AND u.is_active = 1 AND d.price > 0
+    """
+    params = ()
+    if city is not None:
+        # Narrow to the one pair in SQL; the normalized keys below still decide exact matches
+        query += " AND LOWER(TRIM(d.cuisine_type)) = ? AND instr(LOWER(u.city), ?) > 0"
+        params = (normalize_cuisine(cuisine), normalize_city(city))
+    dishes = DatabaseConnection.execute_query(query, params)
+
+    markets = defaultdict(list)
+    for dish in dishes:
+        key = (normalize_city(dish['city']), normalize_cuisine(dish['cuisine_type']))
+        if not key[0] or not key[1]:
+            continue
+        if city is not None and key != (normalize_city(city), normalize_cuisine(cuisine)):
+            continue
+        markets[key].append(dish)
+
+    now = datetime.utcnow().isoformat()
+    rows = []
+    for (market_city, market_cuisine), market_dishes in markets.items():
+        p25, median, p75 = weighted_quantiles(
+            [(float(d['price']), 1.0 + (d['total_orders'] or 0)) for d in market_dishes],
+            quantiles=(0.25, 0.5, 0.75)
+        )
+        chef_count = len({d['chef_id'] for d in market_dishes})
+        total_orders = sum(d['total_orders'] or 0 for d in market_dishes)
+        popular = sorted(market_dishes, key=lambda d: d['total_orders'] or 0, reverse=True)[:3]
+
+        rows.append((
+            market_city, market_cuisine, len(market_dishes), chef_count, total_orders,
+            p25, median, p75,
+            json.dumps([d['name'] for d in popular]),
+            _level(total_orders / len(market_dishes), 10, 40),  # orders per dish
+            _level(chef_count, 3, 10),
+            now
+        ))
+
+    with DatabaseConnection.get_db() as conn:
+        # Markets with no active dishes left must not keep serving their old numbers
+        if city is None:
+            conn.execute("DELETE FROM market_stats")
+        else:
+            conn.execute("DELETE FROM market_stats WHERE city = ? AND cuisine = ?",
+                         (normalize_city(city), normalize_cuisine(cuisine)))
+        conn.executemany("""
+            INSERT OR REPLACE INTO market_stats (
+                city, cuisine, dish_count, chef_count, total_orders,
+                p25_price, median_price, p75_price, popular_dishes,
+                demand_level, competition_level, computed_at
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, rows)
+        conn.commit()
+
+    return len(rows)
+
+
+def refresh_in_background(city: str, cuisine: str):
+    """Recompute one market on a daemon thread (deduplicated per pair)"""
+    key = (normalize_city(city), normalize_cuisine(cuisine))
+    with _refreshing_lock:
+        if key in _refreshing:
+            return
+        _refreshing.add(key)
+
+    def run():
+        try:
+            compute_market_stats(*key)
+        except Exception as e:
+            print(f"Market stats refresh failed for {key}: {e}")
+        finally:
+            with _refreshing_lock:
+                _refreshing.discard(key)
+
+    threading.Thread(target=run, daemon=True).start()
+
+
+def get_market_stats(location: str, cuisine: str) -> Optional[Dict]:
+    """
+    Read precomputed stats for a location ('City, State') and cuisine
+    Stale rows are still returned, and refreshed in the background
+    """
+    city = normalize_city(location)
+    cuisine_key = normalize_cuisine(cuisine)
+
+    row = DatabaseConnection.execute_one(
+        "SELECT * FROM market_stats WHERE city = ? AND cuisine = ?",
+        (city, cuisine_key)
+    )
+    if not row:
+        return None
+
+    try:
+        computed_at = datetime.fromisoformat(row['computed_at'])
+        if datetime.utcnow() - computed_at > timedelta(hours=STALE_AFTER_HOURS):
+            refresh_in_background(city, cuisine_key)
+    except (TypeError, ValueError):
+        refresh_in_background(city, cuisine_key)
+
+    return row
+
+
+def format_market_analysis(row: Dict) -> Dict:
+    """Shape a market_stats row like PriceAdvisor.get_market_analysis results"""
+    # Strip the 30% margin and 10% platform fee to approximate ingredient costs
+    cost_factor = 1.3 * 1.1
+    return {
+        "average_restaurant_price": round(row['median_price'] * 2.5, 2),  # Restaurants typically 2.5x
+        "suggested_homemade_price": row['median_price'],
+        "ingredient_cost_range": {
+            "min": round(row['p25_price'] / cost_factor, 2),
+            "max": round(row['p75_price'] / cost_factor, 2)
+        },
+        "popular_dishes": json.loads(row['popular_dishes'] or '[]'),
+        "demand_level": row['demand_level'],
+        "competition_level": row['competition_level'],
+        "dish_count": row['dish_count'],
+        "chef_count": row['chef_count'],
+        "computed_at": row['computed_at']
+    }
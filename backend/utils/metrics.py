@@ -0,0 +1,391 @@
+"""
+Prometheus-style metrics for Potluck
+Counters, gauges and histograms kept in process memory. With METRICS_DIR
+set (gunicorn), every worker periodically writes a snapshot file there
+and /metrics merges all of them: counters and histograms are summed
+(dead workers' counts are kept), gauges come from live workers only.
+"""
+
+import os
+import sys
+import json
+import time
+import atexit
+import threading
+from typing import Callable, Dict, List, Optional, Tuple
+
+# Shared directory for per-process snapshots; unset means single-process mode.
+# Empty it before starting the server (start.sh does) so old runs aren't counted
+METRICS_DIR = os.getenv('METRICS_DIR') or None
+METRICS_FLUSH_INTERVAL = float(os.getenv('METRICS_FLUSH_INTERVAL', '5'))
+
+# Seconds
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+class Metric:
+    """One metric family; values are keyed by label values in labelnames order"""
+
+    def __init__(self, registry: 'MetricsRegistry', kind: str, name: str, documentation: str,
+                 labelnames: Tuple[str, ...] = (), buckets: Tuple[float, ...] = None, mode: str = 'sum'):
+        self.registry = registry
+        self.kind = kind
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets or DEFAULT_BUCKETS)
+        # Gauges across processes: 'sum' of live workers, 'max', or 'all' (one series per pid)
+        self.mode = mode
+        self.values: Dict[Tuple, object] = {}
+
+    def _key(self, labels: Dict) -> Tuple:
+        return tuple(str(labels.get(name, '')) for name in self.labelnames)
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self.registry.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self.registry.lock:
+            self.values[key] = value
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self.registry.lock:
+            entry = self.values.get(key)
+            if entry is None:
+                entry = self.values[key] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    entry[0][i] += 1
+                    break
+            entry[1] += value
+            entry[2] += 1
+
+
+class MetricsRegistry:
+    """All metric families for this process, plus collectors sampled at snapshot time"""
+
+    def __init__(self, directory: Optional[str] = METRICS_DIR):
+        self.directory = directory
+        self.lock = threading.Lock()
+        self.metrics: Dict[str, Metric] = {}
+        # Called before each snapshot to refresh gauges from live objects (caches, breaker, queues)
+        self.collectors: List[Callable[[], None]] = []
+        self._last_flush = 0.0
+        self._flusher = None
+        self._flusher_pid = None
+
+    def _add(self, metric: Metric) -> Metric:
+        self.metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, documentation, labelnames=()) -> Metric:
+        return self._add(Metric(self, 'counter', name, documentation, labelnames))
+
+    def gauge(self, name, documentation, labelnames=(), mode='sum') -> Metric:
+        return self._add(Metric(self, 'gauge', name, documentation, labelnames, mode=mode))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=None) -> Metric:
+        return self._add(Metric(self, 'histogram', name, documentation, labelnames, buckets=buckets))
+
+    def register_collector(self, func: Callable[[], None]):
+        self.collectors.append(func)
+
+    def snapshot(self) -> Dict:
+        """This process's values, JSON-ready"""
+        for collect in self.collectors:
+            try:
+                collect()
+            except Exception as e:
+                print(f"⚠️ Metrics collector failed: {e}")
+        with self.lock:
+            return {
+                name: [[list(key), value] for key, value in metric.values.items()]
+                for name, metric in self.metrics.items()
+            }
+
+    def flush(self, force: bool = False):
+        """Write this process's snapshot to METRICS_DIR (at most once per flush interval unless forced)"""
+        if not self.directory:
+            return
+        now = time.time()
+        if not force and now - self._last_flush < METRICS_FLUSH_INTERVAL:
+            return
+        self._last_flush = now
+
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, f'{os.getpid()}.json')
+        temp = f'{path}.tmp'
+        with open(temp, 'w') as f:
+            json.dump({'pid': os.getpid(), 'written_at': now, 'metrics': self.snapshot()}, f)
+        os.replace(temp, path)
+
+    def ensure_flusher(self):
+        """Flush every interval from a thread of this process, so idle workers' last counts still land"""
+        if not self.directory or (self._flusher_pid == os.getpid() and self._flusher.is_alive()):
+            return
+        with self.lock:
+            if self._flusher_pid == os.getpid() and self._flusher.is_alive():
+                return
+            # Forked workers need their own thread
+            self._flusher_pid = os.getpid()
+            self._flusher = threading.Thread(target=self._flush_forever, name='metrics-flusher', daemon=True)
+            self._flusher.start()
+
+    def _flush_forever(self):
+        while True:
+            time.sleep(METRICS_FLUSH_INTERVAL)
+            try:
+                self.flush(force=True)
+            except Exception as e:
+                print(f"⚠️ Could not write metrics snapshot: {e}")
+
+    def _snapshots(self) -> List[Dict]:
+        if not self.directory:
+            return [{'pid': os.getpid(), 'metrics': self.snapshot()}]
+
+        self.flush(force=True)
+        snapshots = []
+        for filename in os.listdir(self.directory):
+            if not filename.endswith('.json'):
+                continue
+            try:
+                with open(os.path.join(self.directory, filename)) as f:
+                    snapshots.append(json.load(f))
+            except (OSError, ValueError):
+                continue  # Being replaced right now; picked up next scrape
+        return snapshots
+
+    def collect(self) -> Dict[str, Dict[Tuple, object]]:
+        """Values merged across every process"""
+        merged: Dict[str, Dict[Tuple, object]] = {name: {} for name in self.metrics}
+        for snapshot in self._snapshots():
+            alive = _pid_alive(snapshot['pid'])
+            for name, samples in snapshot['metrics'].items():
+                metric = self.metrics.get(name)
+                if metric is None:
+                    continue
+                values = merged[name]
+                for key, value in samples:
+                    key = tuple(key)
+                    if metric.kind == 'counter':
+                        values[key] = values.get(key, 0) + value
+                    elif metric.kind == 'histogram':
+                        entry = values.setdefault(key, [[0] * len(metric.buckets), 0.0, 0])
+                        entry[0] = [a + b for a, b in zip(entry[0], value[0])]
+                        entry[1] += value[1]
+                        entry[2] += value[2]
+                    elif not alive:
+                        continue
+                    elif metric.mode == 'all':
+                        values[key + (str(snapshot['pid']),)] = value
+                    elif metric.mode == 'max':
+                        values[key] = max(values.get(key, value), value)
+                    else:
+                        values[key] = values.get(key, 0) + value
+        return merged
+
+    def render(self, merged: Dict[str, Dict[Tuple, object]] = None) -> str:
+        """Prometheus text exposition format"""
+        lines = []
+        for name, values in (merged or self.collect()).items():
+            metric = self.metrics[name]
+            labelnames = metric.labelnames + (('pid',) if metric.kind == 'gauge' and metric.mode == 'all' else ())
+            lines.append(f'# HELP {name} {metric.documentation}')
+            lines.append(f'# TYPE {name} {metric.kind}')
+            for key, value in sorted(values.items()):
+                labels = list(zip(labelnames, key))
+                if metric.kind != 'histogram':
+                    lines.append(f'{name}{_labels(labels)} {_number(value)}')
+                    continue
+                cumulative = 0
+                for bound, count in zip(metric.buckets, value[0]):
+                    cumulative += count
+                    lines.append(f'{name}_bucket{_labels(labels + [("le", _number(bound))])} {cumulative}')
+                lines.append(f'{name}_bucket{_labels(labels + [("le", "+Inf")])} {value[2]}')
+                lines.append(f'{name}_sum{_labels(labels)} {_number(value[1])}')
+                lines.append(f'{name}_count{_labels(labels)} {value[2]}')
+        return '\n'.join(lines) + '\n'
+
+
+def _pid_alive(pid: int) -> bool:
+    if pid == os.getpid():
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _labels(pairs) -> str:
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+def _number(value) -> str:
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value)) if abs(value) < 1e15 else repr(value)
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+registry = MetricsRegistry()
+
+# --- HTTP -------------------------------------------------------------------
+http_requests = registry.counter(
+    'potluck_http_requests_total', 'HTTP requests handled', ('blueprint', 'route', 'method', 'status'))
+http_latency = registry.histogram(
+    'potluck_http_request_duration_seconds', 'HTTP request latency', ('blueprint', 'route', 'method'))
+http_in_flight = registry.gauge(
+    'potluck_http_requests_in_flight', 'Requests being handled right now')
+
+# --- Database (SQLite has no pool: one connection per unit of work) ---------
+db_connections_opened = registry.counter(
+    'potluck_db_connections_opened_total', 'SQLite connections opened')
+db_statements = registry.counter(
+    'potluck_db_statements_total', 'SQL statements executed')
+db_file_bytes = registry.gauge(
+    'potluck_db_file_bytes', 'Size of the database file and its journal', ('file',))
+
+# --- Caches -----------------------------------------------------------------
+cache_lookups = registry.counter(
+    'potluck_cache_lookups_total', 'Cache lookups by result', ('cache', 'result'))
+cache_hit_ratio = registry.gauge(
+    'potluck_cache_hit_ratio', 'Cache hits / lookups across all workers since they started', ('cache',))
+cache_entries = registry.gauge(
+    'potluck_cache_entries', 'Entries held per cache, summed over workers', ('cache',))
+
+# --- LLM --------------------------------------------------------------------
+llm_calls = registry.counter(
+    'potluck_llm_calls_total', 'LLM calls by outcome', ('outcome',))
+llm_latency = registry.histogram(
+    'potluck_llm_call_duration_seconds', 'LLM call latency (completed and failed calls)',
+    buckets=(0.25, 0.5, 1.0, 2.0, 4.0, 8.0, 15.0, 30.0))
+llm_breaker_state = registry.gauge(
+    'potluck_llm_breaker_state', 'LLM circuit breaker: 0 closed, 1 half open, 2 open', mode='all')
+
+# --- Background work --------------------------------------------------------
+queue_depth = registry.gauge(
+    'potluck_queue_depth', 'Items waiting in background queues', ('queue',))
+job_last_run_age = registry.gauge(
+    'potluck_job_seconds_since_last_run', 'Seconds since each scheduler job last ran', ('job',), mode='all')
+job_failed = registry.gauge(
+    'potluck_job_last_run_failed', 'Whether the last run of each scheduler job failed', ('job',), mode='all')
+
+
+def _collect_process_state():
+    """Gauges read from this process's caches, LLM client, queues and scheduler"""
+    from utils.cache import cache_registry
+    for name, cache in list(cache_registry.items()):
+        stats = cache.stats()
+        cache_lookups.set(stats['hits'], cache=name, result='hit')
+        cache_lookups.set(stats['misses'], cache=name, result='miss')
+        cache_entries.set(stats['size'], cache=name)
+
+    from utils.llm_client import llm_client
+    llm_breaker_state.set({'closed': 0, 'half_open': 1, 'open': 2}.get(llm_client.breaker.state, 2))
+
+    from utils.geolocation import reverse_geocode_queue
+    from services.location_service import location_buffer
+    queue_depth.set(reverse_geocode_queue.depth(), queue='reverse_geocode')
+    queue_depth.set(location_buffer.pending(), queue='location_points')
+
+    # Only where the scheduler module is loaded; importing it here would register its jobs
+    tasks = sys.modules.get('tasks')
+    now = time.time()
+    for job, beat in list(tasks.scheduler.heartbeats.items() if tasks else ()):
+        job_last_run_age.set(round(now - beat['last_run'], 1), job=job)
+        job_failed.set(1 if beat['error'] else 0, job=job)
+
+
+def _database_state(merged: Dict[str, Dict[Tuple, object]]):
+    """Shared state, read once per scrape by whichever worker serves it (never snapshotted)"""
+    from config.database import DatabaseConnection, DB_PATH
+    for suffix in ('', '-wal', '-journal'):
+        if os.path.exists(DB_PATH + suffix):
+            merged[db_file_bytes.name][(suffix.lstrip('-') or 'main',)] = os.path.getsize(DB_PATH + suffix)
+
+    with DatabaseConnection.get_db() as conn:
+        counts = conn.execute("""
+            SELECT (SELECT COUNT(*) FROM notification_outbox WHERE status = 'pending') AS notification_outbox,
+                   (SELECT COUNT(*) FROM open_jobs) AS open_jobs
+        """).fetchone()
+    for name, depth in counts.items():
+        merged[queue_depth.name][(name,)] = depth
+
+
+registry.register_collector(_collect_process_state)
+
+
+def _statement(_):
+    db_statements.inc()
+
+
+def _track_connection(conn):
+    db_connections_opened.inc()
+
+
+def _before_request():
+    from flask import g
+    g.metrics_started = time.perf_counter()
+    http_in_flight.inc()
+
+
+def _after_request(response):
+    from flask import g, request
+    started = g.get('metrics_started')
+    if started is None:
+        return response
+    # Unmatched paths share one series so scanners can't blow up the label set
+    route = request.url_rule.rule if request.url_rule else 'unmatched'
+    blueprint = request.blueprint or 'app'
+    http_requests.inc(blueprint=blueprint, route=route, method=request.method, status=response.status_code)
+    http_latency.observe(time.perf_counter() - started, blueprint=blueprint, route=route, method=request.method)
+    registry.ensure_flusher()
+    return response
+
+
+def _teardown_request(error=None):
+    from flask import g
+    if g.pop('metrics_started', None) is not None:
+        http_in_flight.inc(-1)
+
+
+def render_latest() -> str:
+    """Exposition text for /metrics"""
+    merged = registry.collect()
+    try:
+        _database_state(merged)
+    except Exception as e:
+        print(f"⚠️ Could not read database metrics: {e}")
+
+    # Hit ratios come from the merged counters so they cover every worker
+    lookups = merged[cache_lookups.name]
+    for cache in {key[0] for key in lookups}:
+        hits, misses = lookups.get((cache, 'hit'), 0), lookups.get((cache, 'miss'), 0)
+        merged[cache_hit_ratio.name][(cache,)] = round(hits / (hits + misses), 4) if hits + misses else 0.0
+    return registry.render(merged)
+
+
+def init_app(app):
+    """Count requests and time them by blueprint and route; track SQLite connections"""
+    from config.database import CONNECTION_HOOKS, TRACE_HOOKS
+    CONNECTION_HOOKS.append(_track_connection)
+    TRACE_HOOKS.append(_statement)
+    app.before_request(_before_request)
+    app.after_request(_after_request)
+    app.teardown_request(_teardown_request)
+    if METRICS_DIR:
+        atexit.register(registry.flush, True)
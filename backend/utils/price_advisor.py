@@ -3,29 +3,30 @@ AI-powered Price Advisor for Potluck
 Uses Anthropic Claude to suggest competitive pricing based on actual costs
 """
 
-import os
 import json
 from typing import Dict, Tuple
-import anthropic
-from dotenv import load_dotenv
+from utils.llm_client import llm_client
+from utils.price_model import get_price_model
+from utils.cache import TTLCache
 
-load_dotenv()
+# LLM suggestions for dishes the local model can't price, keyed on everything the prompt uses
+price_suggestion_cache = TTLCache('price_suggestions', maxsize=2000, ttl=6 * 3600)
+
+
+def _suggestion_key(dish_data: Dict) -> Tuple:
+    return tuple(str(dish_data.get(field, '')).strip().lower() for field in (
+        'name', 'cuisine', 'portion_size', 'location', 'currency', 'chef_experience'
+    )) + (tuple(sorted(str(i).strip().lower() for i in dish_data.get('ingredients', []))),)
 
 class PriceAdvisor:
     """AI-powered pricing suggestions for home chefs"""
     
     def __init__(self):
-        api_key = os.getenv('ANTHROPIC_API_KEY', '')
-        self.has_api_key = bool(api_key and api_key != '')
+        self.has_api_key = llm_client.available
         
         if self.has_api_key:
-            try:
-                self.client = anthropic.Anthropic(api_key=api_key)
-                print("✅ AI Price Advisor initialized with Anthropic API")
-            except Exception as e:
-                print(f"⚠️ Failed to initialize Anthropic client: {e}")
-                self.has_api_key = False
-                self.client = None
+            self.client = llm_client
+            print("✅ AI Price Advisor initialized with Anthropic API")
         else:
             print("ℹ️ AI Price Advisor running in fallback mode (no API key)")
             self.client = None
@@ -46,6 +47,11 @@ class PriceAdvisor:
             }
         """
         
+        # Our own market data answers most dishes locally
+        local_suggestion = get_price_model().suggest(dish_data)
+        if local_suggestion:
+            return self._with_cost_breakdown(local_suggestion, dish_data)
+        
         # Build context for AI
         prompt = f"""You are a pricing expert for a homemade food marketplace app.
         
@@ -99,6 +105,11 @@ class PriceAdvisor:
         if not self.has_api_key or not self.client:
             return self._fallback_pricing(dish_data)
         
+        cache_key = _suggestion_key(dish_data)
+        cached = price_suggestion_cache.get(cache_key)
+        if cached is not None:
+            return cached
+        
         try:
             # Call Anthropic API
             message = self.client.messages.create(
@@ -130,10 +141,13 @@ class PriceAdvisor:
                     if pricing_data['suggested_price'] > max_price:
                         pricing_data['suggested_price'] = round(max_price, 2)
             
-            return {
+            suggestion = {
                 'success': True,
-                'pricing': pricing_data
+                'pricing': pricing_data,
+                'source': 'ai'
             }
+            price_suggestion_cache.set(cache_key, suggestion)
+            return suggestion
             
         except json.JSONDecodeError:
             # Fallback to rule-based pricing if AI fails
@@ -142,8 +156,9 @@ class PriceAdvisor:
             print(f"Error getting AI price suggestion: {e}")
             return self._fallback_pricing(dish_data)
     
-    def _fallback_pricing(self, dish_data: Dict) -> Dict:
-        """Fallback rule-based pricing when AI is unavailable"""
+    @staticmethod
+    def _estimate_costs(dish_data: Dict) -> Tuple[float, float, float]:
+        """Estimated (ingredients, utilities, packaging) cost of one portion"""
         
         # Cost-based pricing for different cuisines (estimated ingredient costs)
         base_costs = {
@@ -160,7 +175,7 @@ class PriceAdvisor:
                                {'ingredients': 5, 'utilities': 0.5, 'packaging': 0.5})
         
         # Adjust for portion size
-        portion = dish_data.get('portion_size', '').lower()
+        portion = (dish_data.get('portion_size') or '').lower()
         multiplier = 1.0
         if 'family' in portion or 'serves 4' in portion:
             multiplier = 2.5
@@ -169,10 +184,27 @@ class PriceAdvisor:
         elif 'serves 2' in portion:
             multiplier = 1.3
         
+        return costs['ingredients'] * multiplier, costs['utilities'] * multiplier, costs['packaging']
+    
+    def _with_cost_breakdown(self, suggestion: Dict, dish_data: Dict) -> Dict:
+        """Add the estimated cost breakdown behind a market-model price (same shape as the fallback)"""
+        pricing = suggestion['pricing']
+        ingredient_cost, utility_cost, packaging_cost = self._estimate_costs(dish_data)
+        price_before_fee = pricing['suggested_price'] / 1.1
+        pricing['cost_breakdown'] = {
+            'ingredients': round(ingredient_cost, 2),
+            'utilities': round(utility_cost, 2),
+            'packaging': round(packaging_cost, 2),
+            'platform_fee': round(pricing['suggested_price'] - price_before_fee, 2),
+            'profit': round(price_before_fee - (ingredient_cost + utility_cost + packaging_cost), 2)
+        }
+        return suggestion
+    
+    def _fallback_pricing(self, dish_data: Dict) -> Dict:
+        """Fallback rule-based pricing when AI is unavailable"""
+        
         # Calculate actual costs
-        ingredient_cost = costs['ingredients'] * multiplier
-        utility_cost = costs['utilities'] * multiplier
-        packaging_cost = costs['packaging']
+        ingredient_cost, utility_cost, packaging_cost = self._estimate_costs(dish_data)
         base_cost = ingredient_cost + utility_cost + packaging_cost
         
         # Profit margins based on experience
@@ -209,7 +241,8 @@ class PriceAdvisor:
                 'reasoning': f'Price calculated from actual costs: ingredients ${ingredient_cost:.2f} + utilities ${utility_cost:.2f} + packaging ${packaging_cost:.2f} = ${base_cost:.2f}. Added {int(margin*100)}% profit margin and 10% platform fee.',
                 'tips': 'Focus on quality and consistency to build customer trust. Your competitive pricing based on actual costs will attract customers while maintaining profitability.'
             },
-            'fallback': True
+            'fallback': True,
+            'source': 'rules'
         }
     
     def validate_price_change(self, chef_id: int, old_price: float, 
@@ -276,6 +309,15 @@ class PriceAdvisor:
     def get_market_analysis(self, location: str, cuisine: str) -> Dict:
         """Get market analysis for a location and cuisine type"""
         
+        # Precomputed from our own data (refreshed by the market-stats task)
+        from utils.market_stats import get_market_stats, format_market_analysis
+        try:
+            stats = get_market_stats(location, cuisine)
+            if stats:
+                return format_market_analysis(stats)
+        except Exception as e:
+            print(f"Error reading market stats: {e}")
+        
         prompt = f"""Analyze the food market in {location} for {cuisine} cuisine.
         
         Focus on:
@@ -300,6 +342,9 @@ class PriceAdvisor:
         Only respond with valid JSON."""
         
         try:
+            if not self.has_api_key or not self.client:
+                raise RuntimeError("AI market analysis unavailable")
+            
             message = self.client.messages.create(
                 model="claude-3-haiku-20240307",
                 max_tokens=300,
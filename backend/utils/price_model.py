@@ -0,0 +1,263 @@
+"""
+Offline Price Model for Potluck
+Per-market price quantiles fitted from our own dishes and orders
+"""
+
+import os
+import re
+import json
+import time
+import threading
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+
+from utils.location import get_currency_for_location
+
+# Serialized model location (next to potluck.db by default)
+MODEL_PATH = os.getenv(
+    'PRICE_MODEL_PATH',
+    os.path.join(os.path.dirname(__file__), '..', 'price_model.json')
+)
+
+# A market needs at least this many observations before we trust it
+MIN_SAMPLES = 5
+
+# Quantiles stored per market
+QUANTILES = (0.1, 0.25, 0.5, 0.75, 0.9)
+
+
+def normalize_cuisine(cuisine: Optional[str]) -> str:
+    """Cuisine key used by the model ('Indian' and 'indian' are the same market)"""
+    return (cuisine or '').strip().lower()
+
+
+def normalize_city(location: Optional[str]) -> str:
+    """City key from a 'City, State' location string or a bare city"""
+    return (location or '').split(',')[0].strip().lower()
+
+
+def portion_bucket(portion_size: Optional[str]) -> int:
+    """
+    Map a free-text portion description to a 'serves N' bucket (1-4)
+    'Serves 2', 'Serves 2-3' -> 2, 'Family pack' -> 4, anything else -> 1
+    """
+    portion = (portion_size or '').lower()
+    if 'family' in portion:
+        return 4
+    match = re.search(r'serves\s*(\d+)', portion)
+    if match:
+        return max(1, min(int(match.group(1)), 4))
+    return 1
+
+
+def weighted_quantiles(samples: List[Tuple[float, float]], quantiles=QUANTILES) -> List[float]:
+    """Quantiles of (value, weight) samples"""
+    samples = sorted(samples)
+    total = sum(weight for _, weight in samples)
+    results = []
+    for q in quantiles:
+        target = q * total
+        running = 0.0
+        for value, weight in samples:
+            running += weight
+            if running >= target:
+                results.append(round(value, 2))
+                break
+        else:
+            results.append(round(samples[-1][0], 2))
+    return results
+
+
+class PriceModel:
+    """
+    Lightweight pricing model: price quantiles per market
+
+    Markets are keyed at three levels so novel combinations can back off:
+        city|cuisine|portion  ->  *USD|cuisine|portion  ->  *USD|cuisine|*
+    The fallback levels pool cities by currency, never across currencies.
+    """
+
+    def __init__(self, markets: Dict = None, trained_at: float = None):
+        self.markets = markets or {}
+        self.trained_at = trained_at
+
+    @staticmethod
+    def market_keys(city: str, cuisine: str, portion: int, currency: str) -> List[str]:
+        """Lookup keys from most to least specific"""
+        return [
+            f"{city}|{cuisine}|{portion}",
+            f"*{currency}|{cuisine}|{portion}",
+            f"*{currency}|{cuisine}|*",
+        ]
+
+    @classmethod
+    def fit(cls, conn) -> 'PriceModel':
+        """
+        Fit the model from the dishes and orders tables
+
+        Every listed dish counts once at its list price; every ordered item
+        counts with its quantity at the price it actually sold for.
+        """
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT d.id, d.price, d.cuisine_type, d.portion_size, u.city, u.state
+            FROM dishes d
+            JOIN users u ON d.chef_id = u.id
+            WHERE d.price > 0
+        """)
+        dishes = {}
+        for row in cursor.fetchall():
+            row = dict(row) if not isinstance(row, dict) else row
+            dishes[row['id']] = (
+                normalize_city(row['city']),
+                normalize_cuisine(row['cuisine_type']),
+                portion_bucket(row['portion_size']),
+                get_currency_for_location(row['city'], row['state'])['code'],
+                float(row['price'])
+            )
+
+        samples = defaultdict(list)
+
+        def add_sample(dish_key, price, weight):
+            city, cuisine, portion, currency = dish_key
+            if not cuisine:
+                return
+            for key in cls.market_keys(city, cuisine, portion, currency):
+                samples[key].append((price, weight))
+
+        for *dish_key, price in dishes.values():
+            add_sample(dish_key, price, 1.0)
+
+        cursor.execute("SELECT items FROM orders WHERE order_status != 'cancelled'")
+        for row in cursor.fetchall():
+            raw_items = row['items'] if isinstance(row, dict) else row[0]
+            try:
+                items = json.loads(raw_items or '[]')
+            except (TypeError, ValueError):
+                continue
+            for item in items:
+                dish = dishes.get(item.get('dish_id'))
+                if not dish:
+                    continue
+                price = float(item.get('price') or dish[4])
+                add_sample(dish[:4], price, float(item.get('quantity') or 1))
+
+        markets = {}
+        for key, values in samples.items():
+            p10, p25, p50, p75, p90 = weighted_quantiles(values)
+            markets[key] = {
+                'samples': len(values),
+                'p10': p10, 'p25': p25, 'p50': p50, 'p75': p75, 'p90': p90
+            }
+
+        return cls(markets, trained_at=time.time())
+
+    def save(self, path: str = None):
+        """Serialize model to disk (atomic replace)"""
+        path = path or MODEL_PATH
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump({'trained_at': self.trained_at, 'markets': self.markets}, f)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str = None) -> 'PriceModel':
+        """Load a serialized model; an empty model if none has been trained yet"""
+        path = path or MODEL_PATH
+        try:
+            with open(path) as f:
+                data = json.load(f)
+            model = cls(data.get('markets', {}), data.get('trained_at'))
+            print(f"✅ Price model loaded ({len(model.markets)} markets)")
+            return model
+        except FileNotFoundError:
+            return cls()
+        except Exception as e:
+            print(f"⚠️ Could not load price model: {e}")
+            return cls()
+
+    def lookup(self, dish_data: Dict) -> Optional[Tuple[str, Dict]]:
+        """Most specific market with enough samples for a dish, or None"""
+        cuisine = normalize_cuisine(dish_data.get('cuisine'))
+        if not cuisine:
+            return None
+
+        city = normalize_city(dish_data.get('location'))
+        portion = portion_bucket(dish_data.get('portion_size'))
+        currency = (dish_data.get('currency') or 'USD').upper()
+
+        for key in self.market_keys(city, cuisine, portion, currency):
+            market = self.markets.get(key)
+            if market and market['samples'] >= MIN_SAMPLES:
+                return key, market
+        return None
+
+    def suggest(self, dish_data: Dict) -> Optional[Dict]:
+        """
+        Price suggestion from market data, same shape as PriceAdvisor results
+        Returns None when the dish is too novel for the model
+        """
+        match = self.lookup(dish_data)
+        if not match:
+            return None
+
+        key, market = match
+        experience_quantile = {
+            'new': 'p25',
+            'intermediate': 'p50',
+            'experienced': 'p75'
+        }
+        suggested = market[experience_quantile.get(dish_data.get('chef_experience', 'new'), 'p25')]
+        city, cuisine, _ = key.split('|')
+        market_name = (f"{cuisine.title()} priced in {city[1:]}" if city.startswith('*')
+                       else f"{cuisine.title()} in {city.title()}")
+
+        return {
+            'success': True,
+            'pricing': {
+                'suggested_price': suggested,
+                'min_price': market['p10'],
+                'max_price': market['p90'],
+                'restaurant_comparison': round(market['p50'] * 2.5, 2),  # Restaurants typically 2.5x
+                'market': {
+                    'key': key,
+                    'samples': market['samples'],
+                    'median_price': market['p50']
+                },
+                'reasoning': f"Based on {market['samples']} dishes and orders for {market_name} on Potluck. "
+                             f"Most chefs price between {market['p25']:.2f} and {market['p75']:.2f}.",
+                'tips': 'Start near the suggested price and adjust as you build ratings and repeat customers.'
+            },
+            'source': 'model'
+        }
+
+
+def train_and_save(conn, path: str = None) -> PriceModel:
+    """Fit the model from the database and write it to disk"""
+    model = PriceModel.fit(conn)
+    model.save(path)
+    return model
+
+
+_model: Optional[PriceModel] = None
+_model_mtime: Optional[float] = None
+_load_lock = threading.Lock()
+
+
+def _model_file_mtime() -> Optional[float]:
+    try:
+        return os.path.getmtime(MODEL_PATH)
+    except OSError:
+        return None
+
+
+def get_price_model() -> PriceModel:
+    """Load the serialized model on first use; reload when train-price-model rewrites the file"""
+    global _model, _model_mtime
+    mtime = _model_file_mtime()
+    if _model is None or mtime != _model_mtime:
+        with _load_lock:
+            if _model is None or mtime != _model_mtime:
+                _model = PriceModel.load()
+                _model_mtime = mtime
+    return _model
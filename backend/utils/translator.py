@@ -6,18 +6,16 @@ Multi-language support for global home chefs
 import os
 import json
 from typing import Dict, List, Optional
-import anthropic
-from dotenv import load_dotenv
+from utils.llm_client import llm_client
 
-load_dotenv()
 
 class TranslationService:
     """AI-powered translation for app localization"""
     
     def __init__(self):
-        self.client = anthropic.Anthropic(
-            api_key=os.getenv('ANTHROPIC_API_KEY', '')
-        )
+        # Shared guarded client; raises LLMUnavailableError when the
+        # API is not configured or the breaker is open (callers fall back)
+        self.client = llm_client
         
         # Supported languages with their local names
         self.supported_languages = {
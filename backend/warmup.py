@@ -0,0 +1,61 @@
+"""
+Pre-fork warm-up for Potluck
+Loads read-mostly data (postal gazetteer, price model, GeoIP ranges,
+the LLM SDK) once in the gunicorn master when the app is preloaded, so
+forked workers share those pages instead of each building a copy on
+its first request. Without preloading each worker runs it after boot.
+
+Nothing here opens a database connection or starts a thread: neither
+survives fork.
+"""
+
+import time
+from typing import Dict
+
+
+def _load_gazetteer():
+    from utils.gazetteer import get_gazetteer
+    return f"{len(get_gazetteer())} postal codes"
+
+
+def _load_price_model():
+    from utils.price_model import get_price_model
+    return f"{len(get_price_model().markets)} markets"
+
+
+def _load_geoip():
+    from utils.geoip import get_geoip_database
+    database = get_geoip_database()
+    return f"{len(database)} ranges" if database else 'not configured'
+
+
+def _load_llm_sdk():
+    """Import the SDK only; the client itself is built per worker on first use"""
+    from utils.llm_client import llm_client
+    if not llm_client.available or llm_client.backend == 'fake':
+        return 'not configured'
+    import anthropic
+    return f"anthropic {anthropic.__version__}"
+
+
+WARMUPS = {
+    'gazetteer': _load_gazetteer,
+    'price-model': _load_price_model,
+    'geoip': _load_geoip,
+    'llm-sdk': _load_llm_sdk,
+}
+
+
+def warm_up() -> Dict[str, float]:
+    """Run every warm-up step; returns milliseconds per step (failures are logged and skipped)"""
+    timings = {}
+    for name, load in WARMUPS.items():
+        started = time.perf_counter()
+        try:
+            detail = load()
+        except Exception as e:
+            print(f"⚠️ Warm-up {name} failed: {e}")
+            continue
+        timings[name] = round((time.perf_counter() - started) * 1000, 1)
+        print(f"✅ Warmed {name} ({detail}) in {timings[name]} ms")
+    return timings
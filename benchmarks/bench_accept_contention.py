@@ -0,0 +1,139 @@
+"""
+Contention benchmark for POST /api/delivery/accept-job
+
+Copies potluck.db to a scratch file, creates delivery agents and
+ready orders, then releases N concurrent accepts per order at once
+and checks that every order ends up with exactly one agent.
+
+    python benchmarks/bench_accept_contention.py --agents 100 --orders 20
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import sqlite3
+import argparse
+import tempfile
+import threading
+from statistics import quantiles
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BACKEND = os.path.join(ROOT, 'backend')
+
+
+def prepare_database(path: str, agents: int, orders: int):
+    """Seed agents and claimable orders into the scratch copy; returns (agent_ids, order_ids)"""
+    conn = sqlite3.connect(path)
+    conn.row_factory = sqlite3.Row
+    chef = conn.execute("SELECT id FROM users WHERE user_type = 'chef' LIMIT 1").fetchone()
+    consumer = conn.execute("SELECT id FROM users WHERE user_type = 'consumer' LIMIT 1").fetchone()
+
+    stamp = int(time.time())
+    agent_ids = []
+    for i in range(agents):
+        cursor = conn.execute("""
+            INSERT INTO users (email, phone, password_hash, full_name, user_type, current_status)
+            VALUES (?, ?, 'x', ?, 'delivery', 'online')
+        """, (f'bench-agent-{stamp}-{i}@example.com', f'bench-{stamp}-{i}', f'Bench Agent {i}'))
+        agent_ids.append(cursor.lastrowid)
+
+    order_ids = []
+    for i in range(orders):
+        cursor = conn.execute("""
+            INSERT INTO orders (order_number, consumer_id, chef_id, items, subtotal, total_amount,
+                                delivery_type, delivery_address, order_status)
+            VALUES (?, ?, ?, '[]', 10, 12, 'delivery', 'bench', 'ready')
+        """, (f'BENCH-{stamp}-{i}', consumer['id'], chef['id']))
+        order_ids.append(cursor.lastrowid)
+
+    conn.commit()
+    conn.close()
+    return agent_ids, order_ids
+
+
+def run(agents: int, orders: int) -> dict:
+    scratch_dir = tempfile.mkdtemp(prefix='potluck-bench-')
+    db_path = os.path.join(scratch_dir, 'potluck.db')
+    shutil.copy(os.path.join(BACKEND, 'potluck.db'), db_path)
+
+    # Must be set before the backend modules read it
+    os.environ['POTLUCK_DB_PATH'] = db_path
+    os.environ.setdefault('BACKGROUND_TASKS', 'false')
+    sys.path.insert(0, BACKEND)
+
+    from config.database import DatabaseConnection
+    DatabaseConnection.ensure_schema()
+    agent_ids, order_ids = prepare_database(db_path, agents, orders)
+
+    from app import app
+    from utils.auth_utils import AuthUtils
+    tokens = {agent_id: AuthUtils.generate_token(agent_id, 'delivery', 'bench@example.com') for agent_id in agent_ids}
+
+    results = []
+    results_lock = threading.Lock()
+
+    for order_id in order_ids:
+        barrier = threading.Barrier(len(agent_ids))
+
+        def accept(agent_id):
+            client = app.test_client()
+            barrier.wait()
+            started = time.perf_counter()
+            response = client.post(f'/api/delivery/accept-job/{order_id}',
+                                   headers={'Authorization': f'Bearer {tokens[agent_id]}'})
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            with results_lock:
+                results.append((order_id, agent_id, response.status_code, elapsed_ms))
+
+        threads = [threading.Thread(target=accept, args=(agent_id,)) for agent_id in agent_ids]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    # Ground truth from the database
+    conn = sqlite3.connect(db_path)
+    assigned = dict(conn.execute(
+        f"SELECT id, delivery_agent_id FROM orders WHERE id IN ({','.join('?' * len(order_ids))})", order_ids
+    ).fetchall())
+    conn.close()
+
+    winners = {}
+    for order_id, agent_id, status, _ in results:
+        if status == 200:
+            winners.setdefault(order_id, []).append(agent_id)
+
+    latencies = sorted(r[3] for r in results)
+    cuts = quantiles(latencies, n=100) if len(latencies) > 1 else latencies * 99
+    shutil.rmtree(scratch_dir, ignore_errors=True)
+
+    return {
+        'agents': agents,
+        'orders': orders,
+        'accept_requests': len(results),
+        'accepted': sum(1 for r in results if r[2] == 200),
+        'already_taken': sum(1 for r in results if r[2] == 409),
+        'errors': sum(1 for r in results if r[2] not in (200, 409)),
+        'double_assignments': sum(1 for ids in winners.values() if len(ids) > 1),
+        'unassigned_orders': sum(1 for order_id in order_ids if assigned.get(order_id) is None),
+        'winner_matches_db': all(winners.get(o) == [assigned.get(o)] for o in order_ids),
+        'latency_ms': {
+            'p50': round(cuts[49], 2),
+            'p95': round(cuts[94], 2),
+            'p99': round(cuts[98], 2),
+            'max': round(latencies[-1], 2)
+        }
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--agents', type=int, default=100, help='concurrent accepts per order')
+    parser.add_argument('--orders', type=int, default=20, help='orders to contend for')
+    args = parser.parse_args()
+
+    report = run(args.agents, args.orders)
+    print(json.dumps(report, indent=2))
+    sys.exit(0 if report['double_assignments'] == 0 and report['errors'] == 0 else 1)
@@ -0,0 +1,315 @@
+"""
+Load generator and latency benchmark for the Potluck API
+
+Seeds a scratch database with synthetic data (database/seed_test_data.py),
+replays a weighted mix of consumer, chef and delivery-agent traffic, and
+reports p50/p95/p99 latency and SQL statements per request per endpoint.
+
+    python benchmarks/bench_api.py --requests 2000 --concurrency 8
+    python benchmarks/bench_api.py --chefs 10000 --consumers 100000 --orders 1000000
+    python benchmarks/bench_api.py --db /tmp/perf.db --requests 5000     # reuse a seeded db
+    python benchmarks/bench_api.py --url http://127.0.0.1:8000 --db /tmp/perf.db   # running gunicorn
+
+Results are written as JSON (benchmarks/results/ by default);
+--compare OLD.json prints the change against an earlier run.
+Queries per request are only measured in-process (test client mode).
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import argparse
+import tempfile
+import threading
+import platform
+from collections import defaultdict
+from statistics import mean, quantiles
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BACKEND = os.path.join(ROOT, 'backend')
+RESULTS_DIR = os.path.join(ROOT, 'benchmarks', 'results')
+
+# role -> share of traffic
+DEFAULT_MIX = {'consumer': 0.6, 'chef': 0.2, 'delivery': 0.2}
+
+# role -> [(weight, endpoint name, method, path, body)]; path/body may take (user, ctx)
+SCENARIOS = {
+    'consumer': [
+        (4, 'GET /api/consumer/dishes', 'GET', '/api/consumer/dishes', None),
+        (3, 'GET /api/consumer/orders?status=active', 'GET', '/api/consumer/orders?status=active', None),
+        (1, 'GET /api/consumer/orders', 'GET', '/api/consumer/orders', None),
+        (2, 'GET /api/consumer/notifications', 'GET', '/api/consumer/notifications', None),
+        (1, 'POST /api/consumer/orders', 'POST', '/api/consumer/orders', lambda user, ctx: ctx.new_order()),
+    ],
+    'chef': [
+        (2, 'GET /api/chef/dashboard', 'GET', '/api/chef/dashboard', None),
+        (3, 'GET /api/chef/orders', 'GET', '/api/chef/orders', None),
+        (1, 'GET /api/chef/dishes', 'GET', '/api/chef/dishes', None),
+    ],
+    'delivery': [
+        (3, 'GET /api/delivery/available-jobs', 'GET', '/api/delivery/available-jobs', None),
+        (1, 'GET /api/delivery/dashboard', 'GET', '/api/delivery/dashboard', None),
+        (2, 'GET /api/delivery/active-orders', 'GET', '/api/delivery/active-orders', None),
+        (3, 'POST /api/delivery/location', 'POST', '/api/delivery/location', lambda user, ctx: ctx.gps_point(user)),
+    ],
+}
+
+
+class QueryCounter:
+    """Count SQL statements per thread through the central trace hook"""
+
+    def __init__(self):
+        self._local = threading.local()
+
+    def install(self):
+        from config.database import TRACE_HOOKS
+        TRACE_HOOKS.append(self._trace)
+
+    def _trace(self, statement):
+        self._local.count = getattr(self._local, 'count', 0) + 1
+
+    def reset(self):
+        self._local.count = 0
+
+    @property
+    def count(self) -> int:
+        return getattr(self._local, 'count', 0)
+
+
+class TrafficContext:
+    """Users and data the scenarios draw from"""
+
+    def __init__(self, db_path: str, rng: random.Random):
+        import sqlite3
+        self.rng = rng
+        conn = sqlite3.connect(db_path)
+        conn.row_factory = sqlite3.Row
+        self.users = {
+            role: [dict(row) for row in conn.execute(
+                "SELECT id, email, user_type, latitude, longitude FROM users WHERE user_type = ? AND is_active = 1",
+                (role,)
+            )]
+            for role in DEFAULT_MIX
+        }
+        self.dishes = [dict(row) for row in conn.execute(
+            "SELECT id, chef_id, price FROM dishes WHERE is_available = 1 LIMIT 5000"
+        )]
+        conn.close()
+
+    def new_order(self) -> dict:
+        dish = self.rng.choice(self.dishes)
+        subtotal = round(dish['price'], 2)
+        return {
+            'chef_id': dish['chef_id'],
+            'items': [{'dish_id': dish['id'], 'quantity': 1, 'price': dish['price']}],
+            'subtotal': subtotal,
+            'total_amount': round(subtotal * 1.13 + 3.99, 2),
+            'delivery_type': 'delivery',
+            'delivery_address': 'Benchmark address'
+        }
+
+    def gps_point(self, user: dict) -> dict:
+        lat = (user['latitude'] or 32.7767) + self.rng.uniform(-0.001, 0.001)
+        lon = (user['longitude'] or -96.7970) + self.rng.uniform(-0.001, 0.001)
+        return {'points': [{'latitude': lat, 'longitude': lon, 'timestamp': time.time()}]}
+
+
+def seed_scratch_database(args) -> str:
+    """Create an empty scratch database with the schema and a synthetic dataset"""
+    scratch_dir = tempfile.mkdtemp(prefix='potluck-bench-')
+    db_path = os.path.join(scratch_dir, 'potluck.db')
+    os.environ['POTLUCK_DB_PATH'] = db_path
+
+    from config.database import DatabaseConnection
+    DatabaseConnection.ensure_schema()
+
+    sys.path.insert(0, os.path.join(ROOT, 'database'))
+    from seed_test_data import seed_synthetic
+
+    started = time.perf_counter()
+    seed_synthetic(db_path, chefs=args.chefs, consumers=args.consumers, agents=args.agents,
+                   dishes_per_chef=args.dishes_per_chef, orders=args.orders, seed=args.seed)
+    print(f"Seeded {db_path} in {time.perf_counter() - started:.1f}s")
+    return db_path
+
+
+def summarize(samples: list) -> dict:
+    latencies = sorted(s['ms'] for s in samples)
+    # Inclusive: percentiles stay within the observed latencies (exclusive extrapolates past max)
+    cuts = quantiles(latencies, n=100, method='inclusive') if len(latencies) > 1 else latencies * 99
+    queries = [s['queries'] for s in samples if s['queries'] is not None]
+    return {
+        'requests': len(samples),
+        'errors': sum(1 for s in samples if s['status'] >= 500),
+        'client_errors': sum(1 for s in samples if 400 <= s['status'] < 500),
+        'p50_ms': round(cuts[49], 2),
+        'p95_ms': round(cuts[94], 2),
+        'p99_ms': round(cuts[98], 2),
+        'mean_ms': round(mean(latencies), 2),
+        'max_ms': round(latencies[-1], 2),
+        'queries_per_request': round(mean(queries), 2) if queries else None
+    }
+
+
+def run(args) -> dict:
+    os.environ.setdefault('BACKGROUND_TASKS', 'false')
+    # Request profiling would skew the latencies being measured
+    os.environ.setdefault('PROFILING_ENABLED', 'false')
+    sys.path.insert(0, BACKEND)
+
+    if args.db:
+        os.environ['POTLUCK_DB_PATH'] = os.path.abspath(args.db)
+        db_path = os.environ['POTLUCK_DB_PATH']
+        scratch = False
+    else:
+        db_path = seed_scratch_database(args)
+        scratch = True
+
+    import tasks
+    tasks.rebuild_open_jobs()
+
+    from utils.auth_utils import AuthUtils
+    rng = random.Random(args.seed)
+    ctx = TrafficContext(db_path, rng)
+    tokens = {}
+
+    counter = None
+    if args.url:
+        import requests
+        session_local = threading.local()
+
+        def send(method, path, headers, body):
+            session = getattr(session_local, 'session', None) or requests.Session()
+            session_local.session = session
+            response = session.request(method, args.url.rstrip('/') + path, headers=headers, json=body)
+            return response.status_code, len(response.content)
+    else:
+        counter = QueryCounter()
+        counter.install()
+        from app import app
+
+        def send(method, path, headers, body):
+            response = app.test_client().open(path, method=method, headers=headers, json=body)
+            return response.status_code, len(response.get_data())
+
+    roles = [role for role in args.mix if ctx.users.get(role)]
+    weights = [args.mix[role] for role in roles]
+
+    def plan_request(local_rng):
+        role = local_rng.choices(roles, weights)[0]
+        user = local_rng.choice(ctx.users[role])
+        scenario = SCENARIOS[role]
+        _, name, method, path, body = local_rng.choices(scenario, [s[0] for s in scenario])[0]
+        if user['id'] not in tokens:
+            tokens[user['id']] = AuthUtils.generate_token(user['id'], role, user['email'])
+        return name, method, path, body(user, ctx) if callable(body) else body, tokens[user['id']]
+
+    samples = defaultdict(list)
+    lock = threading.Lock()
+    remaining = [args.requests]
+
+    def worker(worker_id):
+        local_rng = random.Random(args.seed * 1000 + worker_id)
+        while True:
+            with lock:
+                if remaining[0] <= 0:
+                    return
+                remaining[0] -= 1
+                name, method, path, body, token = plan_request(local_rng)
+            if counter:
+                counter.reset()
+            started = time.perf_counter()
+            status, size = send(method, path, {'Authorization': f'Bearer {token}'}, body)
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            with lock:
+                samples[name].append({'ms': elapsed_ms, 'status': status, 'bytes': size,
+                                      'queries': counter.count if counter else None})
+
+    # Warm caches and lazy imports before timing
+    for _ in range(min(args.warmup, args.requests)):
+        name, method, path, body, token = plan_request(rng)
+        send(method, path, {'Authorization': f'Bearer {token}'}, body)
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(args.concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - started
+
+    all_samples = [s for endpoint in samples.values() for s in endpoint]
+    report = {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'target': args.url or 'flask-test-client',
+        'python': platform.python_version(),
+        'dataset': {role: len(users) for role, users in ctx.users.items()},
+        'config': {'requests': args.requests, 'concurrency': args.concurrency, 'mix': args.mix, 'seed': args.seed},
+        'throughput_rps': round(len(all_samples) / wall, 1) if wall else None,
+        'overall': summarize(all_samples),
+        'endpoints': {name: summarize(endpoint) for name, endpoint in sorted(samples.items())}
+    }
+
+    if scratch:
+        shutil.rmtree(os.path.dirname(db_path), ignore_errors=True)
+    return report
+
+
+def compare(report: dict, baseline_path: str):
+    """Print p95 and queries-per-request changes against an earlier result file"""
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    print(f"\n{'endpoint':45} {'p95 ms':>18} {'queries/req':>16}")
+    for name, current in report['endpoints'].items():
+        old = baseline.get('endpoints', {}).get(name)
+        if not old:
+            print(f"{name:45} {current['p95_ms']:>18} {'(new)':>16}")
+            continue
+        p95 = f"{old['p95_ms']} -> {current['p95_ms']}"
+        queries = f"{old['queries_per_request']} -> {current['queries_per_request']}"
+        print(f"{name:45} {p95:>18} {queries:>16}")
+
+
+def parse_mix(value: str) -> dict:
+    """'consumer=0.6,chef=0.2,delivery=0.2'"""
+    mix = {}
+    for part in value.split(','):
+        role, _, weight = part.partition('=')
+        if role.strip() not in SCENARIOS:
+            raise argparse.ArgumentTypeError(f'unknown role {role!r}')
+        mix[role.strip()] = float(weight)
+    return mix
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=2000, help='timed requests')
+    parser.add_argument('--concurrency', type=int, default=4, help='client threads')
+    parser.add_argument('--warmup', type=int, default=50, help='untimed requests first')
+    parser.add_argument('--mix', type=parse_mix, default=DEFAULT_MIX, help='role weights, e.g. consumer=0.6,chef=0.2,delivery=0.2')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--db', help='use this (already seeded) database instead of a scratch one')
+    parser.add_argument('--url', help='send traffic to a running server instead of the Flask test client')
+    parser.add_argument('--chefs', type=int, default=200)
+    parser.add_argument('--consumers', type=int, default=2000)
+    parser.add_argument('--agents', type=int, default=200)
+    parser.add_argument('--dishes-per-chef', type=int, default=5)
+    parser.add_argument('--orders', type=int, default=20000)
+    parser.add_argument('--output', help='result file (default benchmarks/results/api-<timestamp>.json)')
+    parser.add_argument('--compare', help='earlier result file to compare against')
+    args = parser.parse_args()
+
+    report = run(args)
+
+    output = args.output or os.path.join(RESULTS_DIR, f"api-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+
+    print(json.dumps(report['overall'], indent=2))
+    print(f"Throughput: {report['throughput_rps']} req/s -> {output}")
+    if args.compare:
+        compare(report, args.compare)
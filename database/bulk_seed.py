@@ -0,0 +1,422 @@
+#!/usr/bin/env python3
+"""
+Bulk synthetic data generator for Potluck
+Builds a fresh performance database with geographically clustered
+chefs, consumers and delivery agents, their dishes and order history.
+
+    python database/bulk_seed.py --db /tmp/potluck-perf.db
+    python database/bulk_seed.py --db /tmp/potluck-perf.db --chefs 10000 --consumers 200000 \\
+        --agents 5000 --orders 2000000
+
+Users and dishes go in with executemany inside a few large transactions;
+orders are expanded inside SQLite with one INSERT ... SELECT from small
+seeding tables. Journaling and fsync are off while loading and indexes
+are created after the data is in. Every user's password is
+'password123' (hashed once).
+"""
+
+import os
+import sys
+import json
+import math
+import time
+import random
+import bisect
+import sqlite3
+import argparse
+import itertools
+from datetime import datetime, timedelta
+
+import bcrypt
+
+SCHEMA_PATH = os.path.join(os.path.dirname(__file__), 'schema.sql')
+DEFAULT_DB_PATH = os.path.join(os.path.dirname(__file__), '..', 'backend', 'potluck_perf.db')
+
+PASSWORD = 'password123'
+# Each consumer/chef pairing accounts for this many orders on average (repeat customers)
+ORDERS_PER_PAIR = 4
+
+# name, state, center, share of users, zip codes
+METROS = [
+    ('Dallas', 'TX', (32.7767, -96.7970), 0.18, ['75201', '75204', '75206', '75214', '75219', '75225']),
+    ('Philadelphia', 'PA', (39.9526, -75.1652), 0.14, ['19102', '19103', '19106', '19107', '19146', '19147']),
+    ('New York', 'NY', (40.7128, -74.0060), 0.24, ['10001', '10002', '10003', '10011', '10012', '10014']),
+    ('Chicago', 'IL', (41.8781, -87.6298), 0.16, ['60601', '60605', '60607', '60610', '60614', '60622']),
+    ('Houston', 'TX', (29.7604, -95.3698), 0.14, ['77002', '77003', '77004', '77006', '77007', '77019']),
+    ('Seattle', 'WA', (47.6062, -122.3321), 0.14, ['98101', '98102', '98103', '98104', '98105', '98109']),
+]
+NEIGHBORHOODS_PER_METRO = 40
+
+CUISINES = ['indian', 'mexican', 'american', 'italian', 'chinese', 'thai', 'mediterranean', 'korean']
+VEHICLES = ['bike', 'scooter', 'car']
+VEHICLE_WEIGHTS = [0.3, 0.3, 0.4]
+
+# Orders cluster around lunch and dinner
+HOUR_WEIGHTS = [1, 1, 0, 0, 0, 1, 2, 4, 5, 4, 5, 12, 16, 10, 5, 4, 6, 12, 18, 16, 10, 6, 3, 2]
+
+# Share of orders a consumer places outside their own neighborhood
+CROSS_NEIGHBORHOOD_SHARE = 0.2
+
+# Chef popularity falls off like a power law within each neighborhood
+POPULARITY_EXPONENT = 1.1
+
+LOAD_PRAGMAS = [
+    'PRAGMA journal_mode = OFF',
+    'PRAGMA synchronous = OFF',
+    'PRAGMA locking_mode = EXCLUSIVE',
+    'PRAGMA temp_store = MEMORY',
+    'PRAGMA cache_size = -262144',  # 256MB
+]
+
+
+def split_schema(schema: str):
+    """Schema statements split into (tables, indexes) so indexes can be built after loading"""
+    tables, indexes = [], []
+    for statement in schema.split(';'):
+        lines = [line for line in statement.strip().splitlines() if not line.strip().startswith('--')]
+        body = '\n'.join(lines).strip()
+        if not body:
+            continue
+        (indexes if body.upper().startswith(('CREATE INDEX', 'CREATE UNIQUE INDEX')) else tables).append(body)
+    return tables, indexes
+
+
+class Geography:
+    """Metros split into neighborhoods; people are scattered around neighborhood centers"""
+
+    def __init__(self, rng: random.Random):
+        self.rng = rng
+        self.neighborhoods = []  # (metro index, lat, lon)
+        for metro_index, (_, _, (lat, lon), _, _) in enumerate(METROS):
+            for _ in range(NEIGHBORHOODS_PER_METRO):
+                self.neighborhoods.append((metro_index, lat + rng.gauss(0, 0.07), lon + rng.gauss(0, 0.09)))
+
+        # Neighborhood weight = metro share, with some neighborhoods much busier than others
+        weights = [METROS[m][3] * rng.paretovariate(2.0) for m, _, _ in self.neighborhoods]
+        self.cum_weights = list(itertools.accumulate(weights))
+
+    def pick(self) -> int:
+        return bisect.bisect_left(self.cum_weights, self.rng.random() * self.cum_weights[-1])
+
+    def place(self, neighborhood: int):
+        metro_index, lat, lon = self.neighborhoods[neighborhood]
+        return lat + self.rng.gauss(0, 0.01), lon + self.rng.gauss(0, 0.012), METROS[metro_index]
+
+
+def _price(rng: random.Random) -> float:
+    """Log-normal dish prices around $13, ending in .99"""
+    return max(4.99, math.floor(rng.lognormvariate(math.log(13), 0.35)) + 0.99)
+
+
+def build(db_path: str, chefs: int = 1000, consumers: int = 20000, agents: int = 500,
+          orders: int = 200000, seed: int = 42, force: bool = False) -> dict:
+    """Create db_path from schema.sql and fill it; returns row counts and timings"""
+    if os.path.exists(db_path):
+        if not force:
+            raise FileExistsError(f'{db_path} exists (use --force to replace it)')
+        os.remove(db_path)
+
+    rng = random.Random(seed)
+    geo = Geography(rng)
+    timings = {}
+    started = time.perf_counter()
+
+    with open(SCHEMA_PATH) as f:
+        tables, indexes = split_schema(f.read())
+
+    conn = sqlite3.connect(db_path, isolation_level=None)
+    for pragma in LOAD_PRAGMAS:
+        conn.execute(pragma)
+    for statement in tables:
+        conn.execute(statement)
+
+    # One bcrypt hash for everyone: hashing per user is what makes the fixture seeders slow
+    password_hash = bcrypt.hashpw(PASSWORD.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+    now = datetime.now()
+
+    # --- users -------------------------------------------------------------
+    people = {}  # user_type -> [(id, neighborhood, lat, lon)]
+    next_id = itertools.count(1)
+
+    signup_days = [(now - timedelta(days=d)).strftime('%Y-%m-%d %H:%M:%S') for d in range(2 * 365)]
+
+    def user_rows(user_type, count):
+        rand = rng.random
+        people[user_type] = []
+        is_chef, is_agent = user_type == 'chef', user_type == 'delivery'
+        phone_prefix = '+13' if is_chef else '+14' if is_agent else '+15'
+        for i in range(count):
+            user_id = next(next_id)
+            neighborhood = geo.pick()
+            lat, lon, (city, state, _, _, zips) = geo.place(neighborhood)
+            people[user_type].append((user_id, neighborhood, lat, lon))
+            vehicle = None
+            if is_agent:
+                r = rand()
+                vehicle = VEHICLES[0] if r < VEHICLE_WEIGHTS[0] else \
+                    VEHICLES[1] if r < VEHICLE_WEIGHTS[0] + VEHICLE_WEIGHTS[1] else VEHICLES[2]
+            yield (
+                user_id, f'{user_type}{i}@perf.potluck', f'{phone_prefix}{i:09d}',
+                password_hash, f'{user_type.title()} {i}', user_type, 1, 1,
+                f'{int(rand() * 9999) + 1} Synthetic St', city, state, zips[int(rand() * len(zips))], lat, lon,
+                json.dumps(rng.sample(CUISINES, 2)) if is_chef else None,
+                (30, 45, 60, 90)[int(rand() * 4)] if is_chef else 60,
+                1 if not is_chef or rand() < 0.8 else 0,
+                round(min(5.0, rng.gauss(4.5, 0.3)), 1) if is_chef else 0,
+                vehicle,
+                (3, 5, 8, 10)[int(rand() * 4)] if is_agent else 5,
+                ('online' if rand() < 0.4 else 'offline') if is_agent else 'offline',
+                round(min(5.0, rng.gauss(4.6, 0.25)), 1) if is_agent else 0,
+                signup_days[int(rand() * len(signup_days))]
+            )
+
+    conn.execute('BEGIN')
+    for user_type, count in (('chef', chefs), ('consumer', consumers), ('delivery', agents)):
+        conn.executemany('''
+            INSERT INTO users (id, email, phone, password_hash, full_name, user_type, is_active, is_verified,
+                               address, city, state, zip_code, latitude, longitude, chef_specialties,
+                               preparation_time, is_available, chef_rating, vehicle_type, delivery_radius,
+                               current_status, delivery_rating, created_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', user_rows(user_type, count))
+    conn.execute('COMMIT')
+    timings['users'] = time.perf_counter() - started
+
+    # --- dishes ------------------------------------------------------------
+    dishes = {}  # chef id -> [(dish id, price, prep)]
+    dish_ids = itertools.count(1)
+
+    def dish_rows():
+        for chef_id, _, _, _ in people['chef']:
+            menu = dishes[chef_id] = []
+            for n in range(max(1, int(rng.expovariate(1 / 5)) + 1)):
+                dish_id, price, prep = next(dish_ids), _price(rng), rng.choice([15, 20, 30, 45, 60])
+                menu.append((dish_id, price, prep))
+                yield (dish_id, chef_id, f'Dish {n + 1} by chef {chef_id}', 'Synthetic dish', price,
+                       rng.choice(CUISINES), rng.choice(['lunch', 'dinner', 'snack']), '[]',
+                       rng.randint(1, 5), prep, 1 if rng.random() < 0.9 else 0)
+
+    conn.execute('BEGIN')
+    conn.executemany('''
+        INSERT INTO dishes (id, chef_id, name, description, price, cuisine_type, meal_type, ingredients,
+                            spice_level, preparation_time, is_available)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ''', dish_rows())
+    conn.execute('COMMIT')
+    timings['dishes'] = time.perf_counter() - started - sum(timings.values())
+
+    # --- orders ------------------------------------------------------------
+    # Chefs and agents by neighborhood, chefs weighted by popularity rank
+    chefs_by_hood, agents_by_hood, agents_by_metro = {}, {}, {}
+    for chef_id, hood, lat, lon in people['chef']:
+        chefs_by_hood.setdefault(hood, []).append((chef_id, lat, lon))
+    chef_weights = {
+        hood: list(itertools.accumulate(1 / (rank + 1) ** POPULARITY_EXPONENT for rank in range(len(members))))
+        for hood, members in chefs_by_hood.items()
+    }
+    for agent_id, hood, _, _ in people['delivery']:
+        agents_by_hood.setdefault(hood, []).append(agent_id)
+        agents_by_metro.setdefault(geo.neighborhoods[hood][0], []).append(agent_id)
+    hoods_by_metro = {}
+    for hood in chefs_by_hood:
+        hoods_by_metro.setdefault(geo.neighborhoods[hood][0], []).append(hood)
+
+    def pick_chef(hood):
+        members = chefs_by_hood[hood]
+        weights = chef_weights[hood]
+        return members[bisect.bisect_left(weights, rng.random() * weights[-1])]
+
+    # Python picks who orders from whom (geography, popularity, repeat customers);
+    # SQLite expands those pairs into orders with INSERT ... SELECT, so no order row
+    # crosses the Python/SQLite boundary
+    rand = rng.random
+    consumers_list = people['consumer']
+    n_consumers = len(consumers_list)
+
+    def pair_rows():
+        k = 0
+        while k < max(1, orders // ORDERS_PER_PAIR):
+            _, hood, lat, lon = consumer = consumers_list[int(rand() * n_consumers)]
+            metro = geo.neighborhoods[hood][0]
+            if hood not in chefs_by_hood or rand() < CROSS_NEIGHBORHOOD_SHARE:
+                if metro not in hoods_by_metro:
+                    continue
+                metro_hoods = hoods_by_metro[metro]
+                hood = metro_hoods[int(rand() * len(metro_hoods))]
+            chef_id = pick_chef(hood)[0]
+            pool = agents_by_hood.get(hood) or agents_by_metro.get(metro)
+            yield (k, consumer[0], chef_id, pool[int(rand() * len(pool))] if pool else None,
+                   len(dishes[chef_id]), lat, lon)
+            k += 1
+
+    # Exponential order age (mean 90 days) as a quantile table
+    day_quantiles = []
+    for n in range(1000):
+        days = int(-math.log(1 - (n + 0.5) / 1000) * 90)
+        # Today only has the hours that already finished; later hours fall back to yesterday
+        day_quantiles.append((n, days, (now - timedelta(days=days)).strftime('%Y-%m-%d'),
+                              (now - timedelta(days=days or 1)).strftime('%Y-%m-%d')))
+    hour_slots = list(enumerate(hour for hour, weight in enumerate(HOUR_WEIGHTS) for _ in range(weight)))
+
+    conn.execute('BEGIN')
+    conn.execute('CREATE TEMP TABLE seed_pairs (k INTEGER PRIMARY KEY, consumer_id, chef_id, agent_id, menu_size, lat, lon)')
+    conn.execute('CREATE TEMP TABLE seed_menu (chef_id, n, dish_id, price, prep, PRIMARY KEY (chef_id, n)) WITHOUT ROWID')
+    conn.execute('CREATE TEMP TABLE seed_days (n INTEGER PRIMARY KEY, days, day, earlier_day)')
+    conn.execute('CREATE TEMP TABLE seed_hours (n INTEGER PRIMARY KEY, hour)')
+    conn.executemany('INSERT INTO seed_pairs VALUES (?, ?, ?, ?, ?, ?, ?)', pair_rows())
+    conn.executemany('INSERT INTO seed_menu VALUES (?, ?, ?, ?, ?)', (
+        (chef_id, n, dish_id, price, prep)
+        for chef_id, menu in dishes.items() for n, (dish_id, price, prep) in enumerate(menu)
+    ))
+    conn.executemany('INSERT INTO seed_days VALUES (?, ?, ?, ?)', day_quantiles)
+    conn.executemany('INSERT INTO seed_hours VALUES (?, ?)', hour_slots)
+    pairs = conn.execute('SELECT COUNT(*) FROM seed_pairs').fetchone()[0]
+
+    # Five random() calls per order, materialized once and sliced into 20-bit draws. SQLite's
+    # random() can't be seeded: --seed fixes the people, menus and pairings, while
+    # per-order details (items, status, timestamps) differ between runs
+    conn.execute('''
+        WITH RECURSIVE seq(i) AS (
+            SELECT 0 UNION ALL SELECT i + 1 FROM seq WHERE i < :orders - 1
+        ),
+        draws AS MATERIALIZED (
+            SELECT i, random() AS r1, random() AS r2, random() AS r3, random() AS r4, random() AS r5 FROM seq
+        ),
+        sliced AS (
+            SELECT i,
+                   (r1 & 4294967295) % :pairs AS k,
+                   (r1 >> 32) & 65535 AS r_first,
+                   ((r1 >> 48) & 32767) % 25 AS r_ride,
+                   (r2 & 1048575) % 1000 AS r_count,
+                   ((r2 >> 20) & 1048575) % 1000 AS r_q1,
+                   ((r2 >> 40) & 1048575) % 1000 AS r_q2,
+                   (r3 & 1048575) % 1000 AS r_q3,
+                   ((r3 >> 20) & 1048575) % 1000 AS r_type,
+                   ((r3 >> 40) & 1048575) % 1000 AS r_status,
+                   (r4 & 1048575) % 100000 AS r_live,
+                   ((r4 >> 20) & 1048575) % 1000 AS r_assign,
+                   ((r4 >> 40) & 1048575) % 1000 AS r_day,
+                   (r5 & 1048575) % :hour_slots AS r_hour,
+                   ((r5 >> 20) & 1048575) % 3600 AS r_second,
+                   ((r5 >> 40) & 1048575) % 1000 AS r_rating
+            FROM draws
+        ),
+        shaped AS (
+            SELECT d.*, p.consumer_id, p.chef_id, p.agent_id, p.menu_size, p.lat, p.lon,
+                   min(p.menu_size, CASE WHEN d.r_count < 600 THEN 1 WHEN d.r_count < 900 THEN 2 ELSE 3 END) AS items,
+                   d.r_type < 750 AS is_delivery,
+                   d.r_live < 100 AS in_flight,
+                   CASE WHEN d.r_q1 < 700 THEN 1 WHEN d.r_q1 < 920 THEN 2 ELSE 3 END AS q1,
+                   CASE WHEN d.r_q2 < 700 THEN 1 WHEN d.r_q2 < 920 THEN 2 ELSE 3 END AS q2,
+                   CASE WHEN d.r_q3 < 700 THEN 1 WHEN d.r_q3 < 920 THEN 2 ELSE 3 END AS q3
+            FROM sliced d JOIN seed_pairs p ON p.k = d.k
+        ),
+        stamped AS (
+            SELECT s.*,
+                   CASE WHEN s.in_flight THEN
+                            CASE s.r_status % 5 WHEN 0 THEN 'pending' WHEN 1 THEN 'accepted'
+                                 WHEN 2 THEN 'preparing' WHEN 3 THEN 'ready' ELSE 'picked_up' END
+                        WHEN s.r_status < 40 THEN 'cancelled' ELSE 'delivered' END AS status,
+                   CASE WHEN s.in_flight
+                        THEN strftime('%Y-%m-%dT%H:%M:%S', :now, '-' || (s.r_second % 90 + 1) || ' minutes')
+                        ELSE printf('%sT%02d:%02d:%02d', CASE WHEN sh.hour >= :hour THEN sd.earlier_day ELSE sd.day END,
+                                    sh.hour, s.r_second / 60, s.r_second % 60) END AS placed
+            FROM shaped s
+            JOIN seed_days sd ON sd.n = s.r_day
+            JOIN seed_hours sh ON sh.n = s.r_hour
+        ),
+        priced AS MATERIALIZED (
+            SELECT st.*, m1.dish_id AS d1, m1.price AS p1, m2.dish_id AS d2, m2.price AS p2,
+                   m3.dish_id AS d3, m3.price AS p3,
+                   max(m1.prep, coalesce(m2.prep, 0), coalesce(m3.prep, 0)) AS prep,
+                   CASE WHEN st.is_delivery THEN 3.99 ELSE 0 END AS fee,
+                   round(m1.price * st.q1
+                         + CASE WHEN st.items >= 2 THEN m2.price * st.q2 ELSE 0 END
+                         + CASE WHEN st.items >= 3 THEN m3.price * st.q3 ELSE 0 END, 2) AS subtotal
+            FROM stamped st
+            JOIN seed_menu m1 ON m1.chef_id = st.chef_id AND m1.n = st.r_first % st.menu_size
+            LEFT JOIN seed_menu m2 ON m2.chef_id = st.chef_id AND m2.n = (st.r_first + 1) % st.menu_size
+            LEFT JOIN seed_menu m3 ON m3.chef_id = st.chef_id AND m3.n = (st.r_first + 2) % st.menu_size
+        )
+        INSERT INTO orders (order_number, consumer_id, chef_id, delivery_agent_id, items, subtotal,
+                            delivery_fee, platform_fee, tax, total_amount, delivery_type, delivery_address,
+                            delivery_latitude, delivery_longitude, order_status, order_placed_at,
+                            delivered_at, chef_rating)
+        SELECT printf('PERF-%09d', o.i), o.consumer_id, o.chef_id,
+               CASE WHEN o.is_delivery AND (o.status IN ('delivered', 'picked_up') OR
+                         (o.status IN ('accepted', 'preparing', 'ready') AND o.r_assign < 500))
+                    THEN o.agent_id END,
+               CASE o.items
+                    WHEN 1 THEN json_array(json_object('dish_id', o.d1, 'quantity', o.q1, 'price', o.p1))
+                    WHEN 2 THEN json_array(json_object('dish_id', o.d1, 'quantity', o.q1, 'price', o.p1),
+                                           json_object('dish_id', o.d2, 'quantity', o.q2, 'price', o.p2))
+                    ELSE json_array(json_object('dish_id', o.d1, 'quantity', o.q1, 'price', o.p1),
+                                    json_object('dish_id', o.d2, 'quantity', o.q2, 'price', o.p2),
+                                    json_object('dish_id', o.d3, 'quantity', o.q3, 'price', o.p3))
+               END,
+               o.subtotal, o.fee, round(o.subtotal * 0.05, 2), round(o.subtotal * 0.08, 2),
+               round(o.subtotal * 1.13 + o.fee, 2),
+               CASE WHEN o.is_delivery THEN 'delivery' ELSE 'pickup' END, 'Synthetic address',
+               CASE WHEN o.is_delivery THEN o.lat END, CASE WHEN o.is_delivery THEN o.lon END,
+               o.status, o.placed,
+               CASE WHEN o.status = 'delivered' THEN
+                    strftime('%Y-%m-%dT%H:%M:%S', o.placed, '+' || (o.prep + 10 + o.r_ride) || ' minutes') END,
+               CASE WHEN o.status = 'delivered' AND o.r_rating < 400 THEN
+                    CASE WHEN o.r_rating < 180 THEN 5 WHEN o.r_rating < 330 THEN 4
+                         WHEN o.r_rating < 378 THEN 3 WHEN o.r_rating < 394 THEN 2 ELSE 1 END END
+        FROM priced o
+    ''', {
+        'orders': orders, 'pairs': pairs, 'hour_slots': len(hour_slots),
+        'now': now.strftime('%Y-%m-%d %H:%M:%S'), 'hour': now.hour
+    })
+    written = conn.execute('SELECT COUNT(*) FROM orders').fetchone()[0]
+    conn.execute('COMMIT')
+    timings['orders'] = time.perf_counter() - started - sum(timings.values())
+
+    # --- service areas: every agent covers their own zip ---------------------
+    conn.execute('BEGIN')
+    conn.execute('''
+        INSERT INTO service_areas (delivery_agent_id, area_name, zip_code, city, state, latitude, longitude, is_primary)
+        SELECT id, city || ' ' || zip_code, zip_code, city, state, latitude, longitude, 1
+        FROM users WHERE user_type = 'delivery'
+    ''')
+    conn.execute('COMMIT')
+
+    # --- indexes last, then planner stats -------------------------------------
+    index_started = time.perf_counter()
+    for statement in indexes:
+        conn.execute(statement)
+    conn.execute('ANALYZE')
+    timings['indexes'] = time.perf_counter() - index_started
+
+    conn.execute('PRAGMA journal_mode = DELETE')
+    conn.close()
+
+    counts = {'chefs': chefs, 'consumers': consumers, 'agents': agents,
+              'dishes': sum(len(menu) for menu in dishes.values()), 'orders': written}
+    return {'counts': counts, 'timings': {k: round(v, 2) for k, v in timings.items()},
+            'seconds': round(time.perf_counter() - started, 2)}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--db', default=DEFAULT_DB_PATH, help='database file to create')
+    parser.add_argument('--force', action='store_true', help='replace the file if it exists')
+    parser.add_argument('--chefs', type=int, default=1000)
+    parser.add_argument('--consumers', type=int, default=20000)
+    parser.add_argument('--agents', type=int, default=500)
+    parser.add_argument('--orders', type=int, default=200000)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    try:
+        result = build(args.db, args.chefs, args.consumers, args.agents, args.orders, args.seed, args.force)
+    except FileExistsError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+
+    print(f"✅ Built {os.path.abspath(args.db)} in {result['seconds']}s")
+    for table, count in result['counts'].items():
+        print(f"   - {count} {table}")
+    print(f"   timings: {result['timings']}")
+    print("   Then: POTLUCK_DB_PATH=... python backend/tasks.py open-jobs (and coverage)")
@@ -294,10 +294,94 @@ CREATE TABLE IF NOT EXISTS delivery_verification (
     FOREIGN KEY (verified_by) REFERENCES users(id)
 );
 
+-- Precomputed market statistics per (city, cuisine), refreshed by backend/tasks.py
+CREATE TABLE IF NOT EXISTS market_stats (
+    city TEXT NOT NULL, -- normalized lowercase city
+    cuisine TEXT NOT NULL, -- normalized lowercase cuisine
+    dish_count INTEGER DEFAULT 0,
+    chef_count INTEGER DEFAULT 0,
+    total_orders INTEGER DEFAULT 0,
+    p25_price REAL,
+    median_price REAL,
+    p75_price REAL,
+    popular_dishes TEXT, -- JSON array of dish names
+    demand_level TEXT, -- 'low', 'medium', 'high'
+    competition_level TEXT, -- 'low', 'medium', 'high'
+    computed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (city, cuisine)
+);
+
+-- Chef coverage per geohash cell, maintained by backend/utils/coverage.py
+CREATE TABLE IF NOT EXISTS coverage_cells (
+    cell TEXT PRIMARY KEY, -- geohash at COVERAGE_PRECISION
+    chef_count INTEGER DEFAULT 0,
+    nearest_chef_ids TEXT, -- JSON array, closest first
+    nearest_distance_km REAL,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Unassigned delivery jobs, maintained by backend/services/job_board.py
+CREATE TABLE IF NOT EXISTS open_jobs (
+    order_id INTEGER PRIMARY KEY,
+    status TEXT NOT NULL, -- 'accepted', 'preparing', 'ready'
+    pickup_cell TEXT NOT NULL, -- geohash of the chef's kitchen
+    pickup_latitude REAL,
+    pickup_longitude REAL,
+    drop_latitude REAL,
+    drop_longitude REAL,
+    drop_zip TEXT,
+    ready_at TIMESTAMP,
+    placed_at TIMESTAMP,
+    FOREIGN KEY (order_id) REFERENCES orders(id)
+);
+
+-- Batched job offers written by backend/services/dispatch_service.py
+CREATE TABLE IF NOT EXISTS delivery_offers (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    order_id INTEGER NOT NULL,
+    agent_id INTEGER NOT NULL,
+    cost REAL,
+    pickup_distance REAL, -- miles
+    pickup_eta_minutes REAL,
+    status TEXT DEFAULT 'pending', -- 'pending', 'accepted', 'declined', 'expired', 'superseded'
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    expires_at TIMESTAMP,
+    FOREIGN KEY (order_id) REFERENCES orders(id),
+    FOREIGN KEY (agent_id) REFERENCES users(id)
+);
+
+-- Notification events awaiting fan-out by backend/services/notification_service.py
+CREATE TABLE IF NOT EXISTS notification_outbox (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    event_type TEXT NOT NULL, -- e.g. 'delivery_job_available'
+    payload TEXT NOT NULL, -- JSON
+    status TEXT DEFAULT 'pending', -- 'pending', 'done', 'failed'
+    attempts INTEGER DEFAULT 0,
+    recipients INTEGER,
+    error TEXT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    processed_at TIMESTAMP
+);
+
+-- Running platform totals for /api/stats (bumped by write paths, recounted periodically)
+CREATE TABLE IF NOT EXISTS platform_counters (
+    name TEXT PRIMARY KEY, -- 'users:chef', 'active_dishes', 'orders', 'orders:YYYY-MM-DD', 'gmv'
+    value REAL NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Single row rewritten by the readiness probe to time a real write
+CREATE TABLE IF NOT EXISTS health_probes (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    pid INTEGER,
+    checked_at TIMESTAMP
+);
+
 -- Create indexes for better performance
 CREATE INDEX IF NOT EXISTS idx_users_email ON users(email);
 CREATE INDEX IF NOT EXISTS idx_users_phone ON users(phone);
 CREATE INDEX IF NOT EXISTS idx_users_type ON users(user_type);
+CREATE INDEX IF NOT EXISTS idx_users_type_location ON users(user_type, latitude, longitude);
 CREATE INDEX IF NOT EXISTS idx_dishes_chef ON dishes(chef_id);
 CREATE INDEX IF NOT EXISTS idx_dishes_available ON dishes(is_available);
 CREATE INDEX IF NOT EXISTS idx_orders_consumer ON orders(consumer_id);
@@ -305,6 +389,15 @@ CREATE INDEX IF NOT EXISTS idx_orders_chef ON orders(chef_id);
 CREATE INDEX IF NOT EXISTS idx_orders_status ON orders(order_status);
 CREATE INDEX IF NOT EXISTS idx_messages_order ON messages(order_id);
 CREATE INDEX IF NOT EXISTS idx_delivery_tracking_order ON delivery_tracking(order_id);
+CREATE INDEX IF NOT EXISTS idx_delivery_tracking_updated ON delivery_tracking(updated_at);
 CREATE INDEX IF NOT EXISTS idx_service_areas_da ON service_areas(delivery_agent_id);
 CREATE INDEX IF NOT EXISTS idx_service_areas_zip ON service_areas(zip_code);
-CREATE INDEX IF NOT EXISTS idx_delivery_verification_da ON delivery_verification(delivery_agent_id);
\ No newline at end of file
+CREATE INDEX IF NOT EXISTS idx_service_areas_location ON service_areas(latitude, longitude);
+CREATE INDEX IF NOT EXISTS idx_delivery_verification_da ON delivery_verification(delivery_agent_id);
+CREATE INDEX IF NOT EXISTS idx_open_jobs_cell_status ON open_jobs(pickup_cell, status);
+CREATE INDEX IF NOT EXISTS idx_open_jobs_zip_status ON open_jobs(drop_zip, status);
+CREATE INDEX IF NOT EXISTS idx_delivery_offers_order_status ON delivery_offers(order_id, status);
+CREATE INDEX IF NOT EXISTS idx_delivery_offers_agent_status ON delivery_offers(agent_id, status);
+-- At most one live offer per order, even if two dispatch rounds overlap
+CREATE UNIQUE INDEX IF NOT EXISTS idx_delivery_offers_one_pending ON delivery_offers(order_id) WHERE status = 'pending';
+CREATE INDEX IF NOT EXISTS idx_notification_outbox_status ON notification_outbox(status, id);
@@ -467,5 +467,139 @@ def seed_database():
     print("   Chef: chef.anu@demo.tld / Passw0rd!")
     print("   Delivery: ravi.rider@demo.tld / Passw0rd!")
 
+# Synthetic data for benchmarks: metro center, city, state, zip codes
+SYNTHETIC_METROS = [
+    (32.7767, -96.7970, 'Dallas', 'TX', ['75201', '75202', '75203', '75204', '75205', '75206']),
+    (39.9526, -75.1652, 'Philadelphia', 'PA', ['19102', '19103', '19106', '19107', '19146', '19147']),
+    (40.7128, -74.0060, 'New York', 'NY', ['10001', '10002', '10003', '10011', '10012', '10014']),
+    (41.8781, -87.6298, 'Chicago', 'IL', ['60601', '60602', '60605', '60607', '60610', '60614']),
+]
+SYNTHETIC_CUISINES = ['indian', 'mexican', 'american', 'italian', 'chinese', 'thai']
+SYNTHETIC_VEHICLES = ['bike', 'scooter', 'car']
+# Mostly history, a thin slice of in-flight orders
+SYNTHETIC_ORDER_STATUSES = (['delivered'] * 90 + ['cancelled'] * 5 +
+                            ['pending', 'accepted', 'preparing', 'ready', 'picked_up'])
+
+
+def _synthetic_users(user_type, count, password_hash, rng):
+    """Yield user rows spread around the synthetic metros"""
+    for i in range(count):
+        lat, lon, city, state, zips = SYNTHETIC_METROS[i % len(SYNTHETIC_METROS)]
+        yield (
+            f'synth-{user_type}-{i}@bench.potluck', f'+1{user_type[:2]}{i:09d}', password_hash,
+            f'Synthetic {user_type.title()} {i}', user_type, city, state, rng.choice(zips),
+            lat + rng.uniform(-0.08, 0.08), lon + rng.uniform(-0.08, 0.08),
+            json.dumps([rng.choice(SYNTHETIC_CUISINES)]) if user_type == 'chef' else None,
+            rng.choice([30, 45, 60]) if user_type == 'chef' else None,
+            rng.choice(SYNTHETIC_VEHICLES) if user_type == 'delivery' else None,
+            rng.choice(['online', 'offline']) if user_type == 'delivery' else 'offline',
+            round(rng.uniform(3.5, 5.0), 1)
+        )
+
+
+def seed_synthetic(db_path=DB_PATH, chefs=100, consumers=1000, agents=100, dishes_per_chef=5,
+                   orders=10000, seed=42, batch_size=10000):
+    """
+    Add a synthetic dataset of configurable size (for benchmarks)
+    Rows are written with executemany in batches; every user shares one password hash
+    """
+    rng = random.Random(seed)
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+    password_hash = hash_password('password123')
+
+    def insert_users(user_type, count):
+        cursor.executemany('''
+            INSERT INTO users (email, phone, password_hash, full_name, user_type, city, state, zip_code,
+                               latitude, longitude, chef_specialties, preparation_time, vehicle_type,
+                               current_status, chef_rating, is_verified)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, 1)
+        ''', _synthetic_users(user_type, count, password_hash, rng))
+        return [row[0] for row in cursor.execute(
+            "SELECT id FROM users WHERE email LIKE ? ORDER BY id", (f'synth-{user_type}-%',)
+        )]
+
+    chef_ids = insert_users('chef', chefs)
+    consumer_ids = insert_users('consumer', consumers)
+    agent_ids = insert_users('delivery', agents)
+    print(f"Created {len(chef_ids)} chefs, {len(consumer_ids)} consumers, {len(agent_ids)} delivery agents")
+
+    cursor.executemany('''
+        INSERT INTO dishes (chef_id, name, description, price, cuisine_type, meal_type, ingredients,
+                            preparation_time, is_available)
+        VALUES (?, ?, ?, ?, ?, ?, '[]', ?, 1)
+    ''', (
+        (chef_id, f'Dish {n} of chef {chef_id}', 'Synthetic dish', round(rng.uniform(6, 25), 2),
+         rng.choice(SYNTHETIC_CUISINES), rng.choice(['lunch', 'dinner']), rng.choice([15, 20, 30, 45]))
+        for chef_id in chef_ids for n in range(dishes_per_chef)
+    ))
+    dishes_by_chef = {}
+    for dish_id, chef_id, price in cursor.execute(
+        "SELECT id, chef_id, price FROM dishes WHERE chef_id IN (SELECT id FROM users WHERE email LIKE 'synth-chef-%')"
+    ):
+        dishes_by_chef.setdefault(chef_id, []).append((dish_id, price))
+    print(f"Created {len(chef_ids) * dishes_per_chef} dishes")
+
+    now = datetime.now()
+
+    def order_rows():
+        for i in range(orders):
+            chef_id = rng.choice(chef_ids)
+            dish_id, price = rng.choice(dishes_by_chef[chef_id])
+            quantity = rng.randint(1, 3)
+            subtotal = round(price * quantity, 2)
+            status = rng.choice(SYNTHETIC_ORDER_STATUSES)
+            delivery_type = 'delivery' if rng.random() < 0.8 else 'pickup'
+            assigned = delivery_type == 'delivery' and status in ('delivered', 'picked_up') or \
+                (delivery_type == 'delivery' and status in ('accepted', 'preparing', 'ready') and rng.random() < 0.5)
+            placed = now - timedelta(minutes=rng.randint(5, 60)) if status not in ('delivered', 'cancelled') \
+                else now - timedelta(days=rng.uniform(0, 365))
+            yield (
+                f'SYN-{i:08d}', rng.choice(consumer_ids), chef_id,
+                rng.choice(agent_ids) if assigned else None,
+                json.dumps([{'dish_id': dish_id, 'quantity': quantity, 'price': price}]),
+                subtotal, 3.99, round(subtotal * 0.05, 2), round(subtotal * 0.08, 2),
+                round(subtotal * 1.13 + 3.99, 2), delivery_type, 'Synthetic address', status,
+                placed.isoformat(),
+                (placed + timedelta(minutes=45)).isoformat() if status == 'delivered' else None
+            )
+
+    rows = order_rows()
+    written = 0
+    while True:
+        batch = [row for _, row in zip(range(batch_size), rows)]
+        if not batch:
+            break
+        cursor.executemany('''
+            INSERT INTO orders (order_number, consumer_id, chef_id, delivery_agent_id, items, subtotal,
+                                delivery_fee, platform_fee, tax, total_amount, delivery_type,
+                                delivery_address, order_status, order_placed_at, delivered_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', batch)
+        written += len(batch)
+        conn.commit()
+    print(f"Created {written} orders")
+
+    conn.commit()
+    conn.close()
+    return {'chefs': len(chef_ids), 'consumers': len(consumer_ids), 'agents': len(agent_ids),
+            'dishes': len(chef_ids) * dishes_per_chef, 'orders': written}
+
+
 if __name__ == "__main__":
-    seed_database()
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Seed the Potluck database')
+    parser.add_argument('--synthetic', action='store_true', help='add a synthetic dataset instead of the fixtures')
+    parser.add_argument('--db', default=DB_PATH, help='database file (synthetic mode)')
+    parser.add_argument('--chefs', type=int, default=100)
+    parser.add_argument('--consumers', type=int, default=1000)
+    parser.add_argument('--agents', type=int, default=100)
+    parser.add_argument('--dishes-per-chef', type=int, default=5)
+    parser.add_argument('--orders', type=int, default=10000)
+    args = parser.parse_args()
+
+    if args.synthetic:
+        seed_synthetic(args.db, args.chefs, args.consumers, args.agents, args.dishes_per_chef, args.orders)
+    else:
+        seed_database()
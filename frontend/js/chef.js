@@ -591,7 +591,10 @@ async function getAIPriceSuggestion() {
                 <div class="price-suggestion-box">
                     <div class="suggestion-header">
                         <h4>🤖 AI Price Recommendation</h4>
-                        ${data.data.ai_suggestion.fallback ? '<span class="badge">Rule-based</span>' : '<span class="badge ai">AI-powered</span>'}
+                        ${{
+                            model: '<span class="badge">Market data</span>',
+                            rules: '<span class="badge">Rule-based</span>'
+                        }[data.data.ai_suggestion.source || (data.data.ai_suggestion.fallback ? 'rules' : 'ai')] || '<span class="badge ai">AI-powered</span>'}
                     </div>
                     <div class="price-range">
                         <div class="price-option">
@@ -610,6 +613,7 @@ async function getAIPriceSuggestion() {
                             <button type="button" class="btn-use-price" onclick="document.getElementById('dishPrice').value = ${pricing.max_price}">Use</button>
                         </div>
                     </div>
+                    ${pricing.cost_breakdown ? `
                     <div class="cost-breakdown">
                         <h5>Cost Breakdown (${currencyCode}):</h5>
                         <ul>
@@ -619,7 +623,7 @@ async function getAIPriceSuggestion() {
                             <li>Platform Fee (10%): ${currencySymbol}${pricing.cost_breakdown.platform_fee}</li>
                             <li><strong>Your Profit: ${currencySymbol}${pricing.cost_breakdown.profit}</strong></li>
                         </ul>
-                    </div>
+                    </div>` : ''}
                     <div class="pricing-tip">
                         <p><strong>💡 Tip:</strong> ${pricing.tips}</p>
                         <p><small>Restaurant price for reference: ${currencySymbol}${pricing.restaurant_comparison} (not recommended for homemade)</small></p>
@@ -666,6 +666,13 @@ function displayActiveOrders() {
                     </div>
                 `).join('')}
             </div>
+            ${order.eta ? `
+                <div class="order-eta">
+                    ${order.eta.arrival_in_minutes !== null
+                        ? `🚗 Arriving in ~${Math.round(order.eta.arrival_in_minutes)} min`
+                        : `⏱️ Ready in ~${Math.round(order.eta.ready_in_minutes)} min`}
+                </div>
+            ` : ''}
             <div class="order-footer">
                 <div class="order-total">Total: $${order.total_amount.toFixed(2)}</div>
                 <div class="order-actions">
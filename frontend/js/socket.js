@@ -1 +1,72 @@
-// Real-time socket connection 
+// Real-time socket connection
+// Dashboards pass handlers for the events they care about; views are
+// refreshed when the server pushes a change instead of on a timer.
+// Requires the Socket.IO client (loaded from the CDN on each dashboard).
+//
+// The server only serves Socket.IO in some deployments (see backend/events.py),
+// so /api/realtime is asked first. While sockets are off or disconnected,
+// refresh() runs every poll_seconds instead.
+
+let realtimeSocket = null;
+let realtimePollTimer = null;
+
+async function getRealtimeConfig() {
+    try {
+        const response = await fetch('/api/realtime');
+        if (response.ok) {
+            return await response.json();
+        }
+    } catch (error) {
+        console.error('Error loading real-time config:', error);
+    }
+    return { enabled: false, reason: 'config unavailable', poll_seconds: 30 };
+}
+
+function startRealtimePolling(refresh, seconds) {
+    if (!refresh || realtimePollTimer) {
+        return;
+    }
+    realtimePollTimer = setInterval(() => {
+        if (!realtimeSocket || !realtimeSocket.connected) {
+            refresh();
+        }
+    }, seconds * 1000);
+}
+
+async function connectRealtime(handlers = {}, refresh = null) {
+    const token = localStorage.getItem('token');
+    const config = await getRealtimeConfig();
+    startRealtimePolling(refresh, config.poll_seconds || 30);
+
+    if (!token || typeof io !== 'function' || !config.enabled) {
+        console.log(`⚠️ Real-time updates unavailable (${config.reason || 'no client'}), refreshing every ${config.poll_seconds}s`);
+        return null;
+    }
+
+    realtimeSocket = io(window.location.origin, {
+        auth: { token },
+        transports: ['websocket', 'polling']
+    });
+
+    realtimeSocket.on('connect', () => console.log('🔌 Real-time updates connected'));
+    realtimeSocket.on('connect_error', (err) => console.log('⚠️ Real-time connection failed:', err.message));
+
+    Object.entries(handlers).forEach(([event, handler]) => {
+        realtimeSocket.on(event, (data) => {
+            try {
+                handler(data);
+            } catch (error) {
+                console.error(`Error handling ${event}:`, error);
+            }
+        });
+    });
+
+    return realtimeSocket;
+}
+
+// Delivery agents move between job areas as they drive
+function sendRealtimeLocation(latitude, longitude) {
+    if (realtimeSocket && realtimeSocket.connected) {
+        realtimeSocket.emit('update_location', { latitude, longitude });
+    }
+}
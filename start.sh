@@ -15,6 +15,6 @@ if [ ! -f "potluck.db" ]; then
     cd /app/backend
 fi
 
-# Start the application
-exec gunicorn app:app --bind 0.0.0.0:$PORT --workers 4 --timeout 120
+# Start the application (workers, preloading and metrics directory: see backend/gunicorn.conf.py)
+exec gunicorn -c gunicorn.conf.py app:app
 
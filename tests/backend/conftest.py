@@ -0,0 +1,51 @@
+# Shared fixtures: backend modules import as top-level packages (config, services, utils)
+import os
+import sys
+import tempfile
+
+import pytest
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', 'backend'))
+sys.path.insert(0, BACKEND_DIR)
+
+# Keep module-level imports away from the checked-in backend/potluck.db
+os.environ.setdefault('POTLUCK_DB_PATH', os.path.join(tempfile.mkdtemp(prefix='potluck-tests-'), 'potluck.db'))
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    """Empty database built from database/schema.sql; yields its path"""
+    from config import database
+
+    path = str(tmp_path / 'potluck.db')
+    monkeypatch.setattr(database, 'DB_PATH', path)
+    database.DatabaseConnection.ensure_schema()
+    return path
+
+
+def add_user(conn, user_type: str, latitude=None, longitude=None, **fields) -> int:
+    """Insert a user with just enough columns filled in; returns its id"""
+    count = conn.execute("SELECT COUNT(*) FROM users").fetchone()[0]
+    row = {
+        'email': f"user{count}@example.com", 'phone': f"555{count:07d}", 'password_hash': 'x',
+        'full_name': f"User {count}", 'user_type': user_type,
+        'latitude': latitude, 'longitude': longitude, **fields
+    }
+    cursor = conn.execute(
+        f"INSERT INTO users ({', '.join(row)}) VALUES ({', '.join('?' * len(row))})", list(row.values())
+    )
+    return cursor.lastrowid
+
+
+def add_order(conn, consumer_id: int, chef_id: int, **fields) -> int:
+    """Insert an order with just enough columns filled in; returns its id"""
+    count = conn.execute("SELECT COUNT(*) FROM orders").fetchone()[0]
+    row = {
+        'order_number': f"POT-TEST-{count:04d}", 'consumer_id': consumer_id, 'chef_id': chef_id,
+        'items': '[]', 'subtotal': 10, 'total_amount': 10, 'delivery_type': 'delivery',
+        'order_status': 'ready', **fields
+    }
+    cursor = conn.execute(
+        f"INSERT INTO orders ({', '.join(row)}) VALUES ({', '.join('?' * len(row))})", list(row.values())
+    )
+    return cursor.lastrowid
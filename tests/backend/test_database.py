@@ -0,0 +1,52 @@
+# Schema tests: migrations run before schema.sql and the version is stamped only once it applied
+import sqlite3
+
+import pytest
+
+from conftest import add_order, add_user
+from config import database
+from config.database import DatabaseConnection
+
+
+def _version(path):
+    with sqlite3.connect(path) as conn:
+        return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def test_fresh_database_is_stamped(db):
+    assert _version(db) == database.SCHEMA_VERSION
+
+
+def test_version_1_database_keeps_one_pending_offer_per_order(db):
+    with sqlite3.connect(db) as conn:
+        chef = add_user(conn, 'chef', 32.78, -96.80)
+        consumer = add_user(conn, 'consumer', 32.80, -96.78)
+        agent = add_user(conn, 'delivery', 32.78, -96.80)
+        order = add_order(conn, consumer, chef)
+        # Offers written before the unique index existed
+        conn.execute("DROP INDEX idx_delivery_offers_one_pending")
+        for _ in range(2):
+            conn.execute("INSERT INTO delivery_offers (order_id, agent_id) VALUES (?, ?)", (order, agent))
+        conn.execute("PRAGMA user_version = 1")
+
+    assert DatabaseConnection.ensure_schema()
+    assert _version(db) == database.SCHEMA_VERSION
+    with sqlite3.connect(db) as conn:
+        statuses = [row[0] for row in conn.execute("SELECT status FROM delivery_offers ORDER BY id")]
+    assert statuses == ['superseded', 'pending']
+
+
+def test_failed_schema_is_not_stamped(tmp_path, monkeypatch):
+    path = str(tmp_path / 'old.db')
+    schema = tmp_path / 'schema.sql'
+    schema.write_text("CREATE TABLE IF NOT EXISTS t (x INTEGER);\n"
+                      "CREATE UNIQUE INDEX IF NOT EXISTS idx_t_x ON t(x);\n")
+    with sqlite3.connect(path) as conn:
+        conn.execute("CREATE TABLE t (x INTEGER)")
+        conn.executemany("INSERT INTO t VALUES (?)", [(1,), (1,)])
+    monkeypatch.setattr(database, 'DB_PATH', path)
+    monkeypatch.setattr(database, 'SCHEMA_PATH', str(schema))
+
+    with pytest.raises(sqlite3.IntegrityError):
+        DatabaseConnection.ensure_schema()
+    assert _version(path) == 0
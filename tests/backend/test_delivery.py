@@ -1 +1,76 @@
-# Delivery route tests 
+# Delivery route tests
+import sqlite3
+import time
+
+import pytest
+from flask import Flask
+
+from conftest import add_order, add_user
+from middleware.auth import AuthUtils
+from routes.delivery import bp
+from services.location_service import location_buffer
+
+
+@pytest.fixture
+def client(db):
+    app = Flask(__name__)
+    app.register_blueprint(bp, url_prefix='/api/delivery')
+    location_buffer._pending.clear()
+    yield app.test_client()
+    location_buffer._pending.clear()
+
+
+def _headers(user_id, user_type):
+    return {'Authorization': f"Bearer {AuthUtils.generate_token(user_id, user_type, f'{user_id}@example.com')}"}
+
+
+def _point(**fields):
+    return {'latitude': 32.78, 'longitude': -96.80, 'timestamp': time.time(), **fields}
+
+
+def test_location_rejects_non_delivery_users(client, db):
+    with sqlite3.connect(db) as conn:
+        chef = add_user(conn, 'chef', 32.78, -96.80)
+
+    response = client.post('/api/delivery/location', json={'points': [_point()]},
+                           headers=_headers(chef, 'chef'))
+    assert response.status_code == 403
+    assert chef not in location_buffer._pending
+
+
+def test_location_only_accepts_the_callers_orders(client, db):
+    with sqlite3.connect(db) as conn:
+        chef = add_user(conn, 'chef', 32.78, -96.80)
+        consumer = add_user(conn, 'consumer', 32.80, -96.78)
+        agent = add_user(conn, 'delivery', 32.78, -96.80)
+        other = add_user(conn, 'delivery', 32.79, -96.80)
+        own_order = add_order(conn, consumer, chef, delivery_agent_id=agent, order_status='picked_up')
+        other_order = add_order(conn, consumer, chef, delivery_agent_id=other, order_status='picked_up')
+
+    response = client.post('/api/delivery/location', headers=_headers(agent, 'delivery'), json={'points': [
+        _point(order_id=own_order, timestamp=time.time() - 20),
+        _point(order_id=str(other_order), timestamp=time.time() - 10),
+        _point(latitude=32.785),
+    ]})
+    assert response.status_code == 202
+    assert response.get_json()['rejected'] == 1
+    assert [point['order_id'] for point in location_buffer._pending[agent]] == [own_order, None]
+
+    response = client.post('/api/delivery/location', headers=_headers(agent, 'delivery'),
+                           json={'points': [_point(order_id=other_order)]})
+    assert response.status_code == 400
+
+
+def test_route_plan_treats_out_for_delivery_as_carried(client, db):
+    with sqlite3.connect(db) as conn:
+        chef = add_user(conn, 'chef', 32.78, -96.80)
+        consumer = add_user(conn, 'consumer', 32.80, -96.78)
+        agent = add_user(conn, 'delivery', 32.785, -96.805, vehicle_type='bike')
+        carried = add_order(conn, consumer, chef, delivery_agent_id=agent, order_status='out_for_delivery')
+        waiting = add_order(conn, consumer, chef, delivery_agent_id=agent, order_status='ready')
+
+    response = client.get('/api/delivery/route-plan', headers=_headers(agent, 'delivery'))
+    assert response.status_code == 200
+    stops = [(stop['type'], stop['order_id']) for batch in response.get_json()['batches'] for stop in batch['stops']]
+    assert ('pickup', carried) not in stops and ('drop', carried) in stops
+    assert ('pickup', waiting) in stops
@@ -0,0 +1,117 @@
+# Dispatch engine tests: cost function, regret assignment and one round against a scratch database
+import random
+import sqlite3
+from datetime import datetime
+
+from conftest import add_order, add_user
+from services.dispatch_service import (
+    IDLE_WEIGHT, LATE_WEIGHT, assign_with_regret, dispatch_service, pickup_cost
+)
+from services.job_board import job_board
+from config.database import DatabaseConnection
+
+
+def _reference_regret(costs):
+    """Straightforward O(J^2 P) version of the same greedy, to check the heap one against"""
+    options = {}
+    for (job, agent), cost in costs.items():
+        options.setdefault(job, []).append((cost, agent))
+    for job_options in options.values():
+        job_options.sort()
+    assignments, taken = [], set()
+    while options:
+        chosen = None
+        for job, job_options in list(options.items()):
+            job_options = [option for option in job_options if option[1] not in taken]
+            if not job_options:
+                del options[job]
+                continue
+            options[job] = job_options
+            best = job_options[0]
+            regret = job_options[1][0] - best[0] if len(job_options) > 1 else float('inf')
+            if chosen is None or (regret, -best[0]) > chosen[0]:
+                chosen = ((regret, -best[0]), job, best)
+        if chosen is None:
+            break
+        _, job, (cost, agent) = chosen
+        assignments.append((job, agent, cost))
+        taken.add(agent)
+        del options[job]
+    return assignments
+
+
+def test_pickup_cost_on_time_is_travel():
+    assert pickup_cost(12.0, 12.0) == 12.0
+
+
+def test_pickup_cost_weights_idle_and_late():
+    assert pickup_cost(5.0, 15.0) == 5.0 + IDLE_WEIGHT * 10.0
+    assert pickup_cost(15.0, 5.0) == 15.0 + LATE_WEIGHT * 10.0
+    # Food waiting costs more than an agent waiting
+    assert pickup_cost(15.0, 10.0) > pickup_cost(5.0, 10.0)
+
+
+def test_regret_gives_contested_agent_to_job_with_no_alternative():
+    costs = {(1, 'a'): 1.0, (1, 'b'): 2.0, (2, 'a'): 1.5}
+    assert sorted(assign_with_regret(costs)) == [(1, 'b', 2.0), (2, 'a', 1.5)]
+
+
+def test_regret_ties_prefer_cheaper_best_then_first_job():
+    # Equal regret: the cheaper best option wins the shared agent
+    costs = {(1, 'a'): 3.0, (1, 'b'): 4.0, (2, 'a'): 2.0, (2, 'b'): 3.0}
+    assert assign_with_regret(costs)[0] == (2, 'a', 2.0)
+    # Fully tied: the first job seen goes first
+    costs = {(1, 'a'): 1.0, (1, 'b'): 2.0, (2, 'a'): 1.0, (2, 'b'): 2.0}
+    assert assign_with_regret(costs) == [(1, 'a', 1.0), (2, 'b', 2.0)]
+
+
+def test_more_jobs_than_agents_uses_each_agent_once():
+    costs = {(job, agent): float(job + agent) for job in range(6) for agent in range(2)}
+    assignments = assign_with_regret(costs)
+    assert len(assignments) == 2
+    assert len({agent for _, agent, _ in assignments}) == 2
+    assert len({job for job, _, _ in assignments}) == 2
+
+
+def test_matches_reference_greedy_on_random_matrices():
+    rng = random.Random(7)
+    for _ in range(200):
+        jobs, agents = rng.randint(1, 8), rng.randint(1, 8)
+        costs = {(job, agent): round(rng.uniform(0, 30), 1)
+                 for job in range(jobs) for agent in range(agents) if rng.random() < 0.7}
+        assert assign_with_regret(costs) == _reference_regret(costs)
+
+
+def test_build_costs_skips_declined_and_out_of_range_pairs():
+    now = datetime.now()
+    jobs = [{'order_id': 1, 'pickup_latitude': 32.78, 'pickup_longitude': -96.80, 'ready_at': None}]
+    agents = [
+        {'id': 10, 'latitude': 32.79, 'longitude': -96.80, 'vehicle_type': 'car'},
+        {'id': 11, 'latitude': 32.80, 'longitude': -96.80, 'vehicle_type': 'bike'},
+        {'id': 12, 'latitude': 34.00, 'longitude': -96.80, 'vehicle_type': 'car'},  # ~84 miles away
+    ]
+    matrix = dispatch_service.build_costs(now, jobs, agents, declined={(1, 10)})
+    assert set(matrix) == {(1, 11)}
+
+
+def test_round_offers_each_job_once(db):
+    with sqlite3.connect(db) as conn:
+        chef = add_user(conn, 'chef', 32.78, -96.80)
+        consumer = add_user(conn, 'consumer', 32.80, -96.78)
+        for offset in (0.01, 0.02):
+            add_user(conn, 'delivery', 32.78 + offset, -96.80, current_status='online', vehicle_type='car')
+        orders = [add_order(conn, consumer, chef) for _ in range(3)]
+    with DatabaseConnection.get_db() as conn:
+        job_board.rebuild(conn)
+
+    assert dispatch_service.run_round() == 2
+    # Both agents hold an offer now; the third job waits for one to free up
+    assert dispatch_service.run_round() == 0
+
+    with sqlite3.connect(db) as conn:
+        pending = conn.execute(
+            "SELECT order_id, COUNT(*) FROM delivery_offers WHERE status = 'pending' GROUP BY order_id"
+        ).fetchall()
+    assert len(pending) == 2
+    assert all(count == 1 for _, count in pending)
+    assert {order_id for order_id, _ in pending} < set(orders)
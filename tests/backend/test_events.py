@@ -0,0 +1,41 @@
+# Socket.IO gating: which worker setups serve sockets, and what dashboards are told
+import pytest
+from flask import Flask
+
+import events
+
+
+@pytest.fixture(autouse=True)
+def reset_state(monkeypatch):
+    monkeypatch.setattr(events, '_disabled_reason', 'Socket.IO was not initialized')
+    monkeypatch.delenv('GUNICORN_WORKER_CLASS', raising=False)
+    monkeypatch.delenv('WEB_CONCURRENCY', raising=False)
+
+
+def test_default_sync_workers_poll_instead(monkeypatch):
+    monkeypatch.setenv('GUNICORN_WORKER_CLASS', 'sync')
+    monkeypatch.setenv('WEB_CONCURRENCY', '4')
+
+    with pytest.raises(RuntimeError):
+        events.init_app(Flask(__name__))
+    config = events.realtime_config()
+    assert config['enabled'] is False
+    assert 'sync' in config['reason']
+    assert config['poll_seconds'] == events.REALTIME_POLL_SECONDS
+
+
+def test_several_async_workers_need_a_message_queue(monkeypatch):
+    monkeypatch.setenv('GUNICORN_WORKER_CLASS', 'eventlet')
+    monkeypatch.setenv('WEB_CONCURRENCY', '2')
+    monkeypatch.setattr(events, 'SOCKETIO_MESSAGE_QUEUE', '')
+    assert 'SOCKETIO_MESSAGE_QUEUE' in events.socketio_unsupported_reason()
+
+    monkeypatch.setattr(events, 'SOCKETIO_MESSAGE_QUEUE', 'redis://localhost:6379/0')
+    assert events.socketio_unsupported_reason() is None
+
+
+def test_single_process_serves_sockets():
+    app = Flask(__name__)
+    events.init_app(app)
+    assert events.realtime_config()['enabled'] is True
+    assert app.test_client().get('/socket.io/?EIO=4&transport=polling').status_code != 404
@@ -0,0 +1,40 @@
+# Geolocation tests: offline fallbacks keep the real country code and a readable country name
+import pytest
+
+from utils import gazetteer
+from utils.gazetteer import PostalGazetteer
+from utils.geolocation import GlobalGeolocationService
+
+
+@pytest.fixture
+def euro_gazetteer(monkeypatch):
+    monkeypatch.setattr(gazetteer, '_gazetteer', PostalGazetteer.from_entries([
+        ('75001', 48.8625, 2.3363, 'Paris', 'Ile-de-France', 'FR'),
+        ('10115', 52.5323, 13.3846, 'Berlin', 'Berlin', 'DE'),
+        ('99999', 10.0, 10.0, 'Nowhere', '', ''),
+    ]))
+
+
+def test_nearest_zip_keeps_the_country_of_the_postal_code(euro_gazetteer):
+    location = GlobalGeolocationService._nearest_zip_location(48.86, 2.34)
+    assert (location.country_code, location.country) == ('FR', 'France')
+    assert (location.currency, location.language) == ('EUR', 'fr')
+
+
+def test_nearest_zip_without_a_country_falls_back_to_us(euro_gazetteer):
+    location = GlobalGeolocationService._nearest_zip_location(10.0, 10.0)
+    assert (location.country_code, location.country, location.currency) == ('US', 'United States', 'USD')
+
+
+def test_builtin_sample_zips_know_their_country(monkeypatch):
+    monkeypatch.setattr(gazetteer, '_gazetteer', None)
+    location = GlobalGeolocationService._nearest_zip_location(18.94, 72.83)
+    assert (location.city, location.country_code, location.currency) == ('Mumbai', 'IN', 'INR')
+
+
+def test_geoip_record_without_a_country_name():
+    record = {'country_code': 'ES', 'country': '', 'latitude': 40.4, 'longitude': -3.7, 'city': 'Madrid',
+              'region': 'Madrid', 'postal_code': '28001', 'timezone': 'Europe/Madrid'}
+    location = GlobalGeolocationService._parse_geoip_record(record)
+    assert (location.country, location.country_code) == ('Spain', 'ES')
+    assert GlobalGeolocationService._parse_geoip_record({**record, 'country_code': 'XX'}).country == ''
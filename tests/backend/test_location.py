@@ -0,0 +1,111 @@
+# Location query tests: bounding-box prefilter edges and the zip fallback for rows without coordinates
+import sqlite3
+
+from conftest import add_user
+from config.database import DatabaseConnection
+from utils.location import LocationService
+
+# 75202 in LocationService.ZIP_COORDINATES; 75201 is about 1 km east of it
+CUSTOMER_ZIP = '75202'
+LAT, LON = 32.7831, -96.8067
+RADIUS_KM = 3.0
+_, _MAX_LAT, _, _MAX_LON = LocationService.bounding_box(LAT, LON, RADIUS_KM)
+LAT_DELTA, LON_DELTA = _MAX_LAT - LAT, _MAX_LON - LON
+
+
+def _chef_ids(zip_code=CUSTOMER_ZIP, radius_km=RADIUS_KM):
+    return [chef['chef_id'] for chef in LocationService.find_nearby_chefs(zip_code, radius_km)]
+
+
+def test_bounding_box_encloses_the_radius():
+    min_lat, max_lat, min_lon, max_lon = LocationService.bounding_box(LAT, LON, RADIUS_KM)
+    # Each edge midpoint is at least the radius away, so nothing inside the circle is cut off
+    assert LocationService.calculate_distance(LAT, LON, max_lat, LON) >= RADIUS_KM
+    assert LocationService.calculate_distance(LAT, LON, min_lat, LON) >= RADIUS_KM
+    assert LocationService.calculate_distance(LAT, LON, LAT, max_lon) >= RADIUS_KM
+    assert LocationService.calculate_distance(LAT, LON, LAT, min_lon) >= RADIUS_KM
+
+
+def test_chefs_inside_the_box_but_outside_the_radius_are_dropped(db):
+    with sqlite3.connect(db) as conn:
+        inside = add_user(conn, 'chef', LAT + LAT_DELTA * 0.95, LON)
+        corner = add_user(conn, 'chef', LAT + LAT_DELTA * 0.9, LON + LON_DELTA * 0.9)
+        outside = add_user(conn, 'chef', LAT + LAT_DELTA * 1.1, LON)
+        unavailable = add_user(conn, 'chef', LAT, LON, is_available=0)
+
+    ids = _chef_ids()
+    assert inside in ids
+    assert corner not in ids
+    assert outside not in ids
+    assert unavailable not in ids
+
+
+def test_chefs_rank_by_distance_then_rating(db):
+    with sqlite3.connect(db) as conn:
+        far = add_user(conn, 'chef', LAT + LAT_DELTA * 0.5, LON, chef_rating=5)
+        near_low = add_user(conn, 'chef', LAT + LAT_DELTA * 0.1, LON, chef_rating=3)
+        near_high = add_user(conn, 'chef', LAT + LAT_DELTA * 0.1, LON, chef_rating=4.5)
+
+    assert _chef_ids() == [near_high, near_low, far]
+
+
+def test_chefs_without_coordinates_fall_back_to_their_zip(db):
+    with sqlite3.connect(db) as conn:
+        by_zip = add_user(conn, 'chef', zip_code='75201')
+        unknown_zip = add_user(conn, 'chef', zip_code='99999')
+        far_zip = add_user(conn, 'chef', zip_code='400001')
+
+    chefs = LocationService.find_nearby_chefs(CUSTOMER_ZIP, RADIUS_KM)
+    assert [chef['chef_id'] for chef in chefs] == [by_zip]
+    assert 0.5 < chefs[0]['distance'] < 1.5
+    assert unknown_zip not in _chef_ids() and far_zip not in _chef_ids()
+
+
+def test_bulk_chefs_keep_every_requested_zip(db):
+    with sqlite3.connect(db) as conn:
+        chef = add_user(conn, 'chef', LAT, LON)
+
+    results = LocationService.find_nearby_chefs_bulk([CUSTOMER_ZIP, '400001', 'nope'], RADIUS_KM)
+    assert [c['chef_id'] for c in results[CUSTOMER_ZIP]] == [chef]
+    assert results['400001'] == [] and results['nope'] == []
+
+
+def test_agents_match_by_position_or_service_area(db):
+    with sqlite3.connect(db) as conn:
+        here = add_user(conn, 'delivery', LAT, LON, current_status='online')
+        away = add_user(conn, 'delivery', 40.0, -100.0, current_status='offline')
+        conn.execute(
+            "INSERT INTO service_areas (delivery_agent_id, area_name, zip_code, city, state, is_active) "
+            "VALUES (?, 'Downtown', '75201', 'Dallas', 'TX', 1)",
+            (away,)
+        )
+        nowhere = add_user(conn, 'delivery', 40.0, -100.0)
+
+    agents = LocationService.find_delivery_agents_in_range(CUSTOMER_ZIP, '75201', RADIUS_KM)
+    assert [agent['agent_id'] for agent in agents] == [here, away]
+    assert all(agent['total_trip'] < RADIUS_KM for agent in agents)
+    assert nowhere not in [agent['agent_id'] for agent in agents]
+
+    online = LocationService.find_delivery_agents_in_range(CUSTOMER_ZIP, '75201', RADIUS_KM, online_only=True)
+    assert [agent['agent_id'] for agent in online] == [here]
+
+
+def test_agents_keep_their_closest_position(db):
+    with sqlite3.connect(db) as conn:
+        agent = add_user(conn, 'delivery', LAT + LAT_DELTA * 0.8, LON)
+        conn.execute(
+            "INSERT INTO service_areas (delivery_agent_id, area_name, zip_code, city, state, latitude, longitude, is_active) "
+            "VALUES (?, 'Home', ?, 'Dallas', 'TX', ?, ?, 1)",
+            (agent, CUSTOMER_ZIP, LAT, LON)
+        )
+
+    with DatabaseConnection.get_db() as conn:
+        agents = LocationService.agents_near(conn.cursor(), LAT, LON, RADIUS_KM)
+    assert len(agents) == 1 and agents[0]['distance_to_pickup'] == 0
+
+
+def test_trips_longer_than_the_radius_get_no_agents(db):
+    with sqlite3.connect(db) as conn:
+        add_user(conn, 'delivery', LAT, LON)
+
+    assert LocationService.find_delivery_agents_bulk([(CUSTOMER_ZIP, '75203')], max_radius_km=1.0) == [[]]
@@ -0,0 +1,43 @@
+# Market stats tests: full recompute versus one (city, cuisine) pair
+import sqlite3
+
+from conftest import add_user
+from utils.market_stats import compute_market_stats, get_market_stats
+
+
+def _add_dish(conn, chef_id, cuisine, price):
+    conn.execute(
+        "INSERT INTO dishes (chef_id, name, price, ingredients, cuisine_type) VALUES (?, ?, ?, '[]', ?)",
+        (chef_id, f"{cuisine} {price}", price, cuisine)
+    )
+
+
+def test_single_pair_only_touches_that_market(db):
+    with sqlite3.connect(db) as conn:
+        dallas = add_user(conn, 'chef', city='Dallas')
+        austin = add_user(conn, 'chef', city='Austin')
+        _add_dish(conn, dallas, 'Indian', 10.0)
+        _add_dish(conn, dallas, ' indian', 14.0)
+        _add_dish(conn, dallas, 'Mexican', 9.0)
+        _add_dish(conn, austin, 'Indian', 30.0)
+
+    assert compute_market_stats('Dallas, TX', 'INDIAN') == 1
+    row = get_market_stats('Dallas, TX', 'Indian')
+    assert row['dish_count'] == 2 and row['p75_price'] == 14.0
+    assert get_market_stats('Austin', 'Indian') is None
+    assert get_market_stats('Dallas', 'Mexican') is None
+
+    assert compute_market_stats() == 3
+    assert get_market_stats('Austin', 'Indian')['median_price'] == 30.0
+
+
+def test_single_pair_with_no_dishes_left_is_dropped(db):
+    with sqlite3.connect(db) as conn:
+        chef = add_user(conn, 'chef', city='Dallas')
+        _add_dish(conn, chef, 'Indian', 10.0)
+    compute_market_stats()
+
+    with sqlite3.connect(db) as conn:
+        conn.execute("UPDATE dishes SET is_available = 0")
+    assert compute_market_stats('Dallas', 'Indian') == 0
+    assert get_market_stats('Dallas', 'Indian') is None
@@ -0,0 +1,49 @@
+# Price model tests: currency-scoped fallback markets and reloading a retrained model file
+import sqlite3
+
+from conftest import add_user
+from config.database import DatabaseConnection
+from utils import price_model
+from utils.price_model import PriceModel, train_and_save
+
+
+def _add_dishes(conn, chef_id, price, count=5):
+    for i in range(count):
+        conn.execute(
+            "INSERT INTO dishes (chef_id, name, price, ingredients, cuisine_type, portion_size) "
+            "VALUES (?, ?, ?, '[]', 'Indian', 'Serves 1')",
+            (chef_id, f"Dish {chef_id}-{i}", price)
+        )
+
+
+def test_fallback_markets_do_not_pool_currencies(db):
+    with sqlite3.connect(db) as conn:
+        _add_dishes(conn, add_user(conn, 'chef', city='Dallas', state='TX'), 12.0)
+        _add_dishes(conn, add_user(conn, 'chef', city='Mumbai', state='MH'), 250.0)
+
+    with DatabaseConnection.get_db() as conn:
+        model = PriceModel.fit(conn)
+
+    # A new US city backs off to USD prices only, a new Indian city to INR prices only
+    austin = model.suggest({'cuisine': 'indian', 'location': 'Austin, TX', 'currency': 'USD'})
+    pune = model.suggest({'cuisine': 'indian', 'location': 'Pune, MH', 'currency': 'INR'})
+    assert austin['pricing']['market']['key'] == '*USD|indian|1'
+    assert austin['pricing']['max_price'] == 12.0
+    assert pune['pricing']['min_price'] == 250.0
+    assert model.suggest({'cuisine': 'indian', 'location': 'Lyon', 'currency': 'EUR'}) is None
+
+
+def test_get_price_model_reloads_a_retrained_file(db, tmp_path, monkeypatch):
+    path = str(tmp_path / 'price_model.json')
+    monkeypatch.setattr(price_model, 'MODEL_PATH', path)
+    monkeypatch.setattr(price_model, '_model', None)
+    assert price_model.get_price_model().markets == {}
+
+    with sqlite3.connect(db) as conn:
+        _add_dishes(conn, add_user(conn, 'chef', city='Dallas', state='TX'), 12.0)
+    with DatabaseConnection.get_db() as conn:
+        train_and_save(conn, path)
+
+    loaded = price_model.get_price_model()
+    assert 'dallas|indian|1' in loaded.markets
+    assert price_model.get_price_model() is loaded
@@ -0,0 +1,42 @@
+# Profile store tests: rotated per-process files are read back newest first
+import json
+
+from middleware import logging as request_logging
+from middleware.logging import ProfileStore
+
+
+def _write(path, timestamps):
+    with open(path, 'w') as f:
+        for timestamp in timestamps:
+            f.write(json.dumps({'timestamp': timestamp, 'path': f'/api/{timestamp}'}) + '\n')
+
+
+def _store(tmp_path):
+    # Process 1 rotated twice; process 2 has only its live file, plus a torn line
+    _write(tmp_path / 'requests-1.jsonl.2', [1, 2])
+    _write(tmp_path / 'requests-1.jsonl.1', [4, 6])
+    _write(tmp_path / 'requests-1.jsonl', [8, 9])
+    _write(tmp_path / 'requests-2.jsonl', [3, 5, 7, 10])
+    with open(tmp_path / 'requests-2.jsonl', 'a') as f:
+        f.write('{"timestamp": 11, "pa')
+    (tmp_path / 'other.log').write_text('ignored\n')
+    return ProfileStore(str(tmp_path))
+
+
+def test_read_merges_processes_newest_first(tmp_path):
+    records = _store(tmp_path).read()
+    assert [record['timestamp'] for record in records] == [10, 9, 8, 7, 6, 5, 4, 3, 2, 1]
+
+
+def test_read_stops_at_limit_and_since(tmp_path):
+    store = _store(tmp_path)
+    assert [record['timestamp'] for record in store.read(limit=3)] == [10, 9, 8]
+    assert [record['timestamp'] for record in store.read(since=6.5)] == [10, 9, 8, 7]
+
+
+def test_reversed_lines_across_block_boundaries(tmp_path):
+    path = tmp_path / 'lines.txt'
+    path.write_text('first line\nsecond\n\nthird, a longer one\n')
+    for block_size in (1, 3, 7, 64 * 1024):
+        lines = list(request_logging._reversed_lines(str(path), block_size=block_size))
+        assert lines == [b'third, a longer one', b'second', b'first line']
@@ -0,0 +1,36 @@
+# Route planner tests: carried orders ride together and never get a second pickup
+from services.route_planner import RoutePlanner, group_orders
+
+KITCHEN = (32.780, -96.800)
+OTHER_KITCHEN = (32.900, -96.600)
+
+
+def _order(order_id, pickup=KITCHEN, drop=(32.800, -96.790), picked_up=False, ready_in=0.0, chef_id=1):
+    return {'id': order_id, 'chef_id': chef_id, 'pickup': pickup, 'drop': drop,
+            'ready_in': ready_in, 'picked_up': picked_up}
+
+
+def test_carried_orders_form_their_own_first_batch():
+    orders = [
+        _order(1),
+        _order(2, pickup=OTHER_KITCHEN, drop=(32.700, -96.900), picked_up=True, chef_id=2),
+        _order(3, picked_up=True),
+        _order(4, drop=(32.801, -96.791)),
+    ]
+    batches = group_orders(orders)
+    assert [[order['id'] for order in batch] for batch in batches] == [[2, 3], [1, 4]]
+
+
+def test_plan_mixes_carried_and_uncarried_orders():
+    orders = [
+        _order(1, ready_in=5.0),
+        _order(2, drop=(32.790, -96.810), picked_up=True),
+    ]
+    plan = RoutePlanner(speed_mph=20).plan((32.785, -96.805), orders)
+
+    stops = [(stop['type'], stop['order_id']) for batch in plan['batches'] for stop in batch['stops']]
+    # The carried order is only dropped; the other is picked up before it is dropped
+    assert ('pickup', 2) not in stops and ('drop', 2) in stops
+    assert stops.index(('pickup', 1)) < stops.index(('drop', 1))
+    assert plan['batches'][0]['order_ids'] == [2]
+    assert plan['total_minutes'] > 0
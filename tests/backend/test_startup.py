@@ -0,0 +1,60 @@
+# Startup tests: importing the app must stay cheap
+import os
+import json
+import subprocess
+import sys
+
+BACKEND_DIR = os.path.join(os.path.dirname(__file__), '..', '..', 'backend')
+
+# Seconds allowed for `import app` (override on slow CI machines)
+IMPORT_BUDGET_SECONDS = float(os.getenv('STARTUP_IMPORT_BUDGET_SECONDS', '1.0'))
+
+# Loaded on first use, never at import
+DEFERRED_MODULES = ['anthropic']
+
+PROBE = """
+import json, sys, time
+started = time.perf_counter()
+import app
+elapsed = time.perf_counter() - started
+from utils.llm_client import llm_client
+print(json.dumps({
+    'elapsed': elapsed,
+    'loaded': [name for name in %r if name in sys.modules],
+    'llm_client_built': llm_client._client is not None
+}))
+""" % (DEFERRED_MODULES,)
+
+
+def _import_app(tmp_path):
+    env = dict(
+        os.environ,
+        POTLUCK_DB_PATH=str(tmp_path / 'startup.db'),
+        PROFILE_DIR=str(tmp_path / 'profiles'),
+        BACKGROUND_TASKS='false',
+        ANTHROPIC_API_KEY='test-key'
+    )
+    env.pop('METRICS_DIR', None)
+    result = subprocess.run(
+        [sys.executable, '-c', PROBE], cwd=BACKEND_DIR, env=env,
+        capture_output=True, text=True, timeout=60
+    )
+    assert result.returncode == 0, result.stderr
+    return result.stdout, json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def test_import_app_within_budget(tmp_path):
+    _, probe = _import_app(tmp_path)
+    assert probe['elapsed'] < IMPORT_BUDGET_SECONDS, f"import app took {probe['elapsed']:.2f}s"
+
+
+def test_heavy_clients_are_deferred(tmp_path):
+    _, probe = _import_app(tmp_path)
+    assert probe['loaded'] == []
+    assert not probe['llm_client_built']
+
+
+def test_services_are_built_once(tmp_path):
+    output, _ = _import_app(tmp_path)
+    assert output.count('AI Price Advisor') == 1
+    assert output.count('AI Translator initialized') == 1
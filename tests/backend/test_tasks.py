@@ -0,0 +1,62 @@
+# Background scheduler tests: leader lock and per-thread job isolation
+import threading
+import time
+
+from tasks import BackgroundScheduler
+
+
+def _wait_for(condition, timeout=5.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if condition():
+            return True
+        time.sleep(0.02)
+    return False
+
+
+def test_slow_job_does_not_hold_up_other_threads(tmp_path):
+    scheduler = BackgroundScheduler(tick_seconds=0.01, lock_path=str(tmp_path / 'scheduler.lock'))
+    release = threading.Event()
+    fast_runs = []
+
+    scheduler.add_job('rebuild', 60, release.wait, run_at_start=True)
+    scheduler.add_job('outbox', 0.02, lambda: fast_runs.append(time.time()), run_at_start=True,
+                      thread='outbox')
+    scheduler.start()
+    try:
+        assert scheduler.running()
+        # The rebuild is still blocked while the outbox keeps running
+        assert _wait_for(lambda: len(fast_runs) >= 5)
+        assert 'rebuild' not in scheduler.heartbeats
+    finally:
+        release.set()
+    assert _wait_for(lambda: 'rebuild' in scheduler.heartbeats)
+
+
+def test_only_the_lock_holder_runs_shared_jobs(tmp_path):
+    lock_path = str(tmp_path / 'scheduler.lock')
+    leader = BackgroundScheduler(tick_seconds=0.01, lock_path=lock_path)
+    follower = BackgroundScheduler(tick_seconds=0.01, lock_path=lock_path)
+    runs = {'leader': 0, 'follower': 0, 'follower-local': 0}
+
+    leader.add_job('shared', 0.02, lambda: runs.__setitem__('leader', runs['leader'] + 1), run_at_start=True)
+    follower.add_job('shared', 0.02, lambda: runs.__setitem__('follower', runs['follower'] + 1), run_at_start=True)
+    follower.add_job('local', 0.02, lambda: runs.__setitem__('follower-local', runs['follower-local'] + 1),
+                     run_at_start=True, per_process=True)
+
+    # flock is per open file, so two schedulers in one process contend like two workers
+    assert leader._try_lead()
+    follower.start()
+    assert _wait_for(lambda: runs['follower-local'] >= 3)
+    assert runs['follower'] == 0
+    assert not follower.is_leader()
+    assert set(follower.active_jobs()) == {'local'}
+
+
+def test_per_worker_caches_refresh_in_every_worker():
+    import tasks
+
+    # Each worker keeps its own location buffer and ETA cache
+    assert tasks.scheduler.jobs['location-flush']['per_process']
+    assert tasks.scheduler.jobs['eta-refresh']['per_process']
+    assert not tasks.scheduler.jobs['market-stats']['per_process']